@@ -10,6 +10,9 @@ if not api_key:
 genai.configure(api_key=api_key)
 model = genai.GenerativeModel("gemini-1.5-flash")
 
+# One keep-alive session: repeat calls to the same API reuse the TCP/TLS connection
+_session = requests.Session()
+
 def get_weather(lat=14.5995, lon=120.9842):
     """Fetch hourly temperature for Manila using Open-Meteo (no API key required)."""
     url = "https://api.open-meteo.com/v1/forecast"
@@ -18,7 +21,7 @@ def get_weather(lat=14.5995, lon=120.9842):
         "longitude": lon,
         "hourly": "temperature_2m"
     }
-    r = requests.get(url, params=params, timeout=20)
+    r = _session.get(url, params=params, timeout=20)
     r.raise_for_status()
     return r.json()
 
@@ -10,6 +10,9 @@ if not API_KEY:
 genai.configure(api_key=API_KEY)
 MODEL = genai.GenerativeModel("gemini-1.5-flash")
 
+# One keep-alive session: repeat calls to the same API reuse the TCP/TLS connection
+_session = requests.Session()
+
 # ==== Simple city coordinate map for weather lookups ====
 CITY_COORDS = {
     "manila": (14.5995, 120.9842),
@@ -41,7 +44,7 @@ def get_weather_for(city_name: str):
         "longitude": latlon[1],
         "hourly": "temperature_2m",
     }
-    r = requests.get(url, params=params, timeout=20)
+    r = _session.get(url, params=params, timeout=20)
     r.raise_for_status()
     data = r.json()
     temps = data.get("hourly", {}).get("temperature_2m", [])
@@ -61,7 +64,7 @@ def get_wikipedia_summaryNew(topic: str) -> str:
     headers = {
         "User-Agent": "AgenticAIWorkshop/1.0 (https://example.com/; contact@example.com)"
     }
-    resp = requests.get(url, headers=headers, timeout=10)
+    resp = _session.get(url, headers=headers, timeout=10)
     resp.raise_for_status()
     data = resp.json()
     return data.get("extract", "No summary available.")
@@ -72,7 +75,7 @@ def get_wikipedia_summary(topic: str):
     title = topic.strip().replace(" ", "_")
     url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{title}"
     #r = requests.get(url, timeout=20, headers={"Accept": "application/json"})
-    r = requests.get(url, timeout=20, headers={
+    r = _session.get(url, timeout=20, headers={
         "User-Agent": "AgenticAIWorkshop/1.0 (https://example.com/; contact@example.com)"
     })
     
@@ -3,6 +3,9 @@ import re
 import requests
 import json
 
+# One keep-alive session: repeat calls to the same API reuse the TCP/TLS connection
+_session = requests.Session()
+
 MEMORY_FILE = "memory.json"
 
 CITY_COORDS = {
@@ -45,7 +48,7 @@ def tool_weather(city: str = None):
     lat, lon = CITY_COORDS[chosen]
     url = "https://api.open-meteo.com/v1/forecast"
     params = {"latitude": lat, "longitude": lon, "hourly": "temperature_2m"}
-    r = requests.get(url, params=params, timeout=20)
+    r = _session.get(url, params=params, timeout=20)
     r.raise_for_status()
     data = r.json()
     temps = data.get("hourly", {}).get("temperature_2m", [])
@@ -65,7 +68,7 @@ def tool_wikipedia(topic: str):
         return {"topic": topic, "summary": None, "error": "empty topic"}
     title = topic.strip().replace(" ", "_")
     url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{title}"
-    r = requests.get(url, timeout=20, headers={"Accept": "application/json"})
+    r = _session.get(url, timeout=20, headers={"Accept": "application/json"})
     if r.status_code in (400, 404):
         return {"topic": topic, "summary": None, "error": "not found"}
     r.raise_for_status()
@@ -96,7 +99,7 @@ def tool_news(topic: str):
         return {"topic": topic, "error": "NEWSAPI_KEY not set (get one at https://newsapi.org/)"} 
     url = "https://newsapi.org/v2/everything"
     params = {"q": topic or "technology", "pageSize": 3, "apiKey": key, "language": "en", "sortBy": "relevancy"}
-    r = requests.get(url, params=params, timeout=20)
+    r = _session.get(url, params=params, timeout=20)
     r.raise_for_status()
     data = r.json()
     headlines = [a.get("title") for a in data.get("articles", [])]
@@ -1,6 +1,6 @@
 
-import os, re, json
-from typing import Dict, Any, List
+import os, re, json, time
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
 
 # ==== LLM (Gemini) for FINAL NARRATION ONLY ====
 import google.generativeai as genai
@@ -13,6 +13,9 @@ _model = genai.GenerativeModel("gemini-1.5-flash")
 # ==== Tools ====
 import requests
 
+# One keep-alive session: repeat calls to the same API reuse the TCP/TLS connection
+_session = requests.Session()
+
 CITY_COORDS = {
     "manila": (14.5995, 120.9842),
     "tokyo": (35.6762, 139.6503),
@@ -24,24 +27,75 @@ CITY_COORDS = {
     "osaka": (34.6937, 135.5023),
 }
 
-def tool_weather(city: str) -> Dict[str, Any]:
+WEATHER_URL = "https://api.open-meteo.com/v1/forecast"
+WEATHER_TTL_SEC = 600
+
+# city key -> (fetched_at, observation); filled per city by tool_weather_batch
+_weather_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+def _resolve_city(city: str) -> Optional[str]:
     target = (city or "").lower().strip()
     if target not in CITY_COORDS:
         for k in CITY_COORDS:
             if k in target:
                 target = k
                 break
-    if target not in CITY_COORDS:
+    return target if target in CITY_COORDS else None
+
+def tool_weather_batch(cities: List[str]) -> Dict[str, Any]:
+    """Current temperature for several cities in ONE Open-Meteo call.
+
+    Open-Meteo accepts comma-separated latitude/longitude lists and returns a
+    list of locations in the same order. Only `current=temperature_2m` is
+    requested (not the whole hourly series), and each city is cached on its own
+    so a later single-city lookup is free.
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    unknown: List[str] = []
+    missing: List[str] = []
+    now = time.time()
+    for c in cities:
+        key = _resolve_city(c)
+        if key is None:
+            unknown.append(c)
+        elif key not in results and key not in missing:
+            hit = _weather_cache.get(key)
+            if hit and now - hit[0] < WEATHER_TTL_SEC:
+                results[key] = hit[1]
+            else:
+                missing.append(key)
+
+    if missing:
+        params = {
+            "latitude": ",".join(str(CITY_COORDS[k][0]) for k in missing),
+            "longitude": ",".join(str(CITY_COORDS[k][1]) for k in missing),
+            "current": "temperature_2m",
+            "timezone": "UTC",
+        }
+        r = _session.get(WEATHER_URL, params=params, timeout=15)
+        r.raise_for_status()
+        data = r.json()
+        locations = data if isinstance(data, list) else [data]
+        for key, loc in zip(missing, locations):
+            obs = {
+                "city": key.title(),
+                "temp_now_c": (loc.get("current") or {}).get("temperature_2m"),
+                "source": "Open-Meteo current temperature_2m",
+            }
+            _weather_cache[key] = (now, obs)
+            results[key] = obs
+
+    ordered = [results[k] for k in dict.fromkeys(_resolve_city(c) for c in cities) if k in results]
+    out: Dict[str, Any] = {"results": ordered}
+    if unknown:
+        out["unknown"] = unknown
+    return out
+
+def tool_weather(city: str) -> Dict[str, Any]:
+    batch = tool_weather_batch([city])
+    if not batch["results"]:
         return {"error": f"Unknown city '{city}'"}
-    lat, lon = CITY_COORDS[target]
-    url = "https://api.open-meteo.com/v1/forecast"
-    params = {"latitude": lat, "longitude": lon, "hourly": "temperature_2m"}
-    r = requests.get(url, params=params, timeout=15)
-    r.raise_for_status()
-    data = r.json()
-    temps = data.get("hourly", {}).get("temperature_2m", [])
-    now_c = temps[0] if temps else None
-    return {"city": target.title(), "temp_now_c": now_c, "source": "Open-Meteo hourly temperature_2m"}
+    return batch["results"][0]
 
 def tool_wikipedia(topic: str) -> Dict[str, Any]:
     topic = (topic or "").strip()
@@ -50,7 +104,7 @@ def tool_wikipedia(topic: str) -> Dict[str, Any]:
     title = topic.replace(" ", "_")
     url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{title}"
     headers = {"User-Agent": "AgenticAIWorkshop/1.0 (https://example.com/; contact@example.com)"}
-    r = requests.get(url, headers=headers, timeout=15)
+    r = _session.get(url, headers=headers, timeout=15)
     if r.status_code in (400, 404):
         return {"topic": topic, "summary": None, "error": "not found"}
     r.raise_for_status()
@@ -69,37 +123,111 @@ def tool_calculator(expression: str) -> Dict[str, Any]:
         return {"expression": expression, "error": str(e)}
 
 # ==== Helpers / Intent ====
+# Every intent looks at the same things: which cities are named, which
+# numbers/years appear and a few keyword groups. features() finds them all in ONE
+# scan of the lower-cased query and returns a QueryFeatures tuple that the router
+# and the handlers share, instead of each predicate re-lowering the query and
+# re-running detect_cities/extract_numbers.
+# Matching is plain substring matching, as before ("add" also matches "address"),
+# except that matches do not overlap: run-together names like "tokyotokyo" count once.
+WEATHER_WORDS = ["weather", "temperature", "average"]
+WIKI_WORDS = ["who is", "who was", "what is", "tell me who", "tell me about", "wikipedia", "wiki"]
+SUM_WORDS = ["sum", "add", "plus", "+"]
+CALC_WORDS = ["-", "*", "/", "compute", "calculate"]  # on top of SUM_WORDS
+
+_TERM_KIND: Dict[str, str] = {}
+for _kind, _words in (("weather", WEATHER_WORDS), ("wiki", WIKI_WORDS), ("sum", SUM_WORDS), ("calc", CALC_WORDS)):
+    _TERM_KIND.update(dict.fromkeys(_words, _kind))
+_TERM_KIND.update(dict.fromkeys(CITY_COORDS, "city"))
+_CITY_RANK = {name: i for i, name in enumerate(CITY_COORDS)}
+
+def _trie_pattern(words: List[str]) -> List[str]:
+    """Alternatives matching any of `words`, one per first character, with shared prefixes factored out."""
+    trie: Dict[str, Any] = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def body(node: Dict[str, Any]) -> str:
+        alts = [re.escape(ch) + body(sub) for ch, sub in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        out = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return f"(?:{out})?" if "" in node else out
+
+    return [re.escape(ch) + body(sub) for ch, sub in sorted(trie.items())]
+
+# Numbers are [-+]?(?:\d+\.\d+|\d+) (as extract_numbers always matched, ASCII digits), spelled
+# so that every alternative starts with a literal character: `re` then skips
+# positions that cannot start a match instead of trying each alternative there.
+# Signed numbers come before the bare "+"/"-" keywords.
+_SCAN = re.compile("|".join(
+    [r"\+\d+(?:\.\d+)?", r"-\d+(?:\.\d+)?"]
+    + [rf"{d}\d*(?:\.\d+)?" for d in "0123456789"]
+    + _trie_pattern(sorted(_TERM_KIND))
+))
+_YEARS = re.compile(r"\b(1[5-9]\d{2}|20\d{2})\b")
+_YEARISH = re.compile(r"(?:1[5-9]|20)\d\d")
+
+class QueryFeatures(NamedTuple):
+    text: str
+    lower: str
+    cities: List[str]      # known cities, in CITY_COORDS order
+    numbers: List[float]
+    years: List[int]       # standalone 4-digit years 1500-2099, in query order
+    weather: bool          # weather / temperature / average
+    wiki: bool             # who is / what is / tell me about / wiki...
+    sum_op: bool           # sum / add / plus / +
+    calc_op: bool          # any arithmetic word or operator (includes sum_op)
+
+def features(query: str) -> QueryFeatures:
+    text = query or ""
+    ql = text.lower()
+    cities, numbers, kinds = [], [], set()
+    yearish = False
+    for token in _SCAN.findall(ql):
+        kind = _TERM_KIND.get(token)
+        if kind == "city":
+            if token not in cities:
+                cities.append(token)
+        elif kind:
+            kinds.add(kind)
+        else:
+            numbers.append(float(token))
+            if token[0] in "+-":  # the sign is also an operator keyword
+                kinds.add(_TERM_KIND[token[0]])
+            yearish = yearish or (len(token) >= 4 and _YEARISH.search(token) is not None)
+    if len(cities) > 1:
+        cities.sort(key=_CITY_RANK.get)
+    # only a query with a year-like number needs the whole-word check for years
+    years = [int(y) for y in _YEARS.findall(ql)] if yearish else []
+    sum_op = "sum" in kinds
+    return QueryFeatures(text, ql, cities, numbers, years,
+                         "weather" in kinds, "wiki" in kinds, sum_op, sum_op or "calc" in kinds)
+
 def detect_cities(query: str) -> List[str]:
-    q = (query or "").lower()
-    found = []
-    for name in CITY_COORDS:
-        if name in q:
-            found.append(name)
-    # preserve order
-    seen, ordered = set(), []
-    for n in found:
-        if n not in seen:
-            ordered.append(n); seen.add(n)
-    return ordered
+    return features(query).cities
 
 def extract_numbers(query: str) -> List[float]:
-    nums = re.findall(r'[-+]?(?:\d+\.\d+|\d+)', query)
-    out = []
-    for n in nums:
-        try:
-            out.append(float(n))
-        except:
-            pass
-    return out
+    return features(query).numbers
+
+def _weather_avg(f: QueryFeatures) -> bool:
+    return f.weather and len(f.cities) >= 2
+
+def _math_with_weather(f: QueryFeatures) -> bool:
+    return len(f.numbers) >= 1 and len(f.cities) == 1 and f.sum_op
+
+def _pure_calc(f: QueryFeatures) -> bool:
+    # if it looks like a math request without cities
+    return len(f.cities) == 0 and len(f.numbers) >= 1 and f.calc_op
 
 def is_weather_avg_intent(q: str) -> bool:
-    ql = q.lower()
-    city_count = len(detect_cities(q))
-    return ("weather" in ql or "temperature" in ql or "average" in ql) and city_count >= 2
+    return _weather_avg(features(q))
 
 def is_wiki_intent(q: str) -> bool:
-    ql = q.lower()
-    return any(k in ql for k in ["who is", "who was", "what is", "tell me who", "tell me about", "wikipedia", "wiki"])
+    return features(q).wiki
 
 def extract_topic_for_wiki(q: str) -> str:
     # normalize common phrasings
@@ -117,15 +245,13 @@ def extract_topic_for_wiki(q: str) -> str:
     return qq
 
 def find_years(q: str) -> List[int]:
-    years = [int(y) for y in re.findall(r"\b(1[5-9]\d{2}|20\d{2})\b", q)]
-    return years[:2]
+    return features(q).years[:2]
 
 def is_math_with_weather_intent(q: str) -> bool:
-    return (len(extract_numbers(q)) >= 1) and (len(detect_cities(q)) == 1) and any(k in q.lower() for k in ["sum", "add", "plus", "+"])
+    return _math_with_weather(features(q))
 
 def is_pure_calc_intent(q: str) -> bool:
-    # if it looks like a math request without cities
-    return (len(detect_cities(q)) == 0) and (len(extract_numbers(q)) >= 1) and any(k in q.lower() for k in ["sum", "add", "plus", "+", "-", "*", "/", "compute", "calculate"])
+    return _pure_calc(features(q))
 
 # ==== Narration ====
 def narrate_final(context: Dict[str, Any]) -> str:
@@ -138,20 +264,21 @@ def narrate_final(context: Dict[str, Any]) -> str:
     return (resp.text or "").strip()
 
 # ==== Controllers ====
-def handle_weather_average(query: str) -> str:
-    cities = detect_cities(query)
+def handle_weather_average(query: str, f: Optional[QueryFeatures] = None) -> str:
+    cities = (f or features(query)).cities
     temps: Dict[str, float] = {}
     print("")
     if len(cities) < 2:
         print('Planner: {"final": true, "answer": "Please include at least two cities for an average (e.g., Tokyo and London)."}')
         return "Please include at least two cities for an average (e.g., Tokyo and London)."
 
-    for c in cities:
-        decision = {"tool": "weather", "args": {"city": c}}
-        print(f"Planner: {json.dumps(decision, ensure_ascii=False)}")
-        obs = tool_weather(c)
-        print(f"Observation: {json.dumps(obs, ensure_ascii=False)}")
-        if "temp_now_c" in obs and isinstance(obs["temp_now_c"], (int, float)):
+    # one round-trip for every city instead of one per city
+    decision = {"tool": "weather_batch", "args": {"cities": cities}}
+    print(f"Planner: {json.dumps(decision, ensure_ascii=False)}")
+    obs_batch = tool_weather_batch(cities)
+    print(f"Observation: {json.dumps(obs_batch, ensure_ascii=False)}")
+    for obs in obs_batch["results"]:
+        if isinstance(obs.get("temp_now_c"), (int, float)):
             temps[obs["city"]] = float(obs["temp_now_c"])
 
     if not temps:
@@ -176,7 +303,7 @@ def handle_weather_average(query: str) -> str:
     print(f'Planner (final): {{"final": true, "answer": {json.dumps(final_text, ensure_ascii=False)}}}')
     return final_text
 
-def handle_wiki_plus_calc(query: str) -> str:
+def handle_wiki_plus_calc(query: str, f: Optional[QueryFeatures] = None) -> str:
     print("")
     topic = extract_topic_for_wiki(query)
     decision = {"tool": "wikipedia", "args": {"topic": topic}}
@@ -184,7 +311,7 @@ def handle_wiki_plus_calc(query: str) -> str:
     obs_wiki = tool_wikipedia(topic)
     print(f"Observation: {json.dumps(obs_wiki, ensure_ascii=False)}")
 
-    years = find_years(query)
+    years = (f or features(query)).years[:2]
     age = None
     if len(years) == 2:
         born, died = years[0], years[1]
@@ -207,10 +334,10 @@ def handle_wiki_plus_calc(query: str) -> str:
     print(f'Planner (final): {{"final": true, "answer": {json.dumps(final_text, ensure_ascii=False)}}}')
     return final_text
 
-def handle_math_with_weather(query: str) -> str:
+def handle_math_with_weather(query: str, f: Optional[QueryFeatures] = None) -> str:
     print("")
-    cities = detect_cities(query)
-    nums = extract_numbers(query)
+    f = f or features(query)
+    cities, nums = f.cities, f.numbers
     if len(cities) != 1 or len(nums) == 0:
         return "Please provide one city and at least one number (e.g., sum 23.45 and the temperature in Manila)."
     city = cities[0]
@@ -245,10 +372,11 @@ def handle_math_with_weather(query: str) -> str:
     print(f'Planner (final): {{"final": true, "answer": {json.dumps(final_text, ensure_ascii=False)}}}')
     return final_text
 
-def handle_pure_calc(query: str) -> str:
+def handle_pure_calc(query: str, f: Optional[QueryFeatures] = None) -> str:
     print("")
-    nums = extract_numbers(query)
-    if len(nums) >= 2 and any(k in query.lower() for k in ["sum", "add", "plus", "+"]):
+    f = f or features(query)
+    nums = f.numbers
+    if len(nums) >= 2 and f.sum_op:
         expr = "+".join(str(n) for n in nums)
     else:
         # attempt to extract a simple arithmetic expression from the text
@@ -271,15 +399,30 @@ def handle_pure_calc(query: str) -> str:
     print(f'Planner (final): {{"final": true, "answer": {json.dumps(final_text, ensure_ascii=False)}}}')
     return final_text
 
+def route(f: QueryFeatures) -> Optional[str]:
+    """Name of the first intent that matches, in priority order (None = no intent)."""
+    if _weather_avg(f):
+        return "weather_average"
+    if f.wiki:
+        return "wiki_plus_calc"
+    if _math_with_weather(f):
+        return "math_with_weather"
+    if _pure_calc(f):
+        return "pure_calc"
+    return None
+
+HANDLERS = {
+    "weather_average": handle_weather_average,
+    "wiki_plus_calc": handle_wiki_plus_calc,
+    "math_with_weather": handle_math_with_weather,
+    "pure_calc": handle_pure_calc,
+}
+
 def run_query(query: str) -> str:
-    if is_weather_avg_intent(query):
-        return handle_weather_average(query)
-    if is_wiki_intent(query):
-        return handle_wiki_plus_calc(query)
-    if is_math_with_weather_intent(query):
-        return handle_math_with_weather(query)
-    if is_pure_calc_intent(query):
-        return handle_pure_calc(query)
+    f = features(query)
+    intent = route(f)
+    if intent:
+        return HANDLERS[intent](query, f)
     return "I can help with multi-city weather averages, Wikipedia + simple math, math + one city's temperature, and pure calculator. Try asking about those!"
 
 def repl():
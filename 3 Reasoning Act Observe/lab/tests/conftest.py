@@ -0,0 +1,5 @@
+import os, sys
+
+# planner_agent.py is a standalone script that configures Gemini at import and refuses to load without a key
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
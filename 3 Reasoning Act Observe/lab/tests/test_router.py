@@ -0,0 +1,87 @@
+import random
+import re
+
+import pytest
+
+import planner_agent as agent
+
+
+# The predicates as they were before features(): each one re-lowers the query and rescans it
+def _old_cities(q):
+    return [name for name in agent.CITY_COORDS if name in q.lower()]
+
+
+def _old_numbers(q):
+    return [float(n) for n in re.findall(r"[-+]?(?:\d+\.\d+|\d+)", q)]
+
+
+def _old_route(q):
+    ql = q.lower()
+    cities, nums = _old_cities(q), _old_numbers(q)
+    if any(k in ql for k in ("weather", "temperature", "average")) and len(cities) >= 2:
+        return "weather_average"
+    if any(k in ql for k in ("who is", "who was", "what is", "tell me who", "tell me about", "wikipedia", "wiki")):
+        return "wiki_plus_calc"
+    if nums and len(cities) == 1 and any(k in ql for k in ("sum", "add", "plus", "+")):
+        return "math_with_weather"
+    if not cities and nums and any(k in ql for k in ("sum", "add", "plus", "+", "-", "*", "/", "compute",
+                                                     "calculate")):
+        return "pure_calc"
+    return None
+
+
+_WORDS = ["Weather", "temperature", "average", "in", "and", "Tokyo", "London", "new york", "Manila", "KYOTO",
+          "osaka", "Sydney", "singapore", "who is", "Who was", "what is", "tell me about", "wiki", "Wikipedia",
+          "sum", "add", "address", "plus", "+", "-", "*", "/", "compute", "calculate", "12", "-3", "+4.5", "2.75",
+          "1879", "1955", "2024", "12345", "Einstein", "the", "of", "?", ",", "summer", "hello"]
+
+
+def _queries(n, seed=7):
+    rnd = random.Random(seed)
+    for _ in range(n):
+        yield " ".join(rnd.choice(_WORDS) for _ in range(rnd.randint(1, 9)))
+
+
+def test_route_matches_the_old_predicates():
+    for q in _queries(20000):
+        f = agent.features(q)
+        assert agent.route(f) == _old_route(q), q
+        assert f.cities == _old_cities(q), q
+        assert f.numbers == _old_numbers(q), q
+        assert f.years == [int(y) for y in re.findall(r"\b(1[5-9]\d{2}|20\d{2})\b", q)], q
+
+
+@pytest.mark.parametrize("query, intent", [
+    ("What's the average temperature in Tokyo and London?", "weather_average"),
+    ("Who was Albert Einstein? He lived 1879-1955, how old was he?", "wiki_plus_calc"),
+    ("Sum 23.45 and the temperature in Manila", "math_with_weather"),
+    ("compute 12.5+8.75*2", "pure_calc"),
+    ("+5 please", "pure_calc"),
+    ("Weather in Tokyo", None),
+    ("hello there", None),
+])
+def test_route(query, intent):
+    assert agent.route(agent.features(query)) == intent
+
+
+def test_features_keep_city_order_and_find_years():
+    f = agent.features("London vs tokyo vs LONDON in 1879, then 2024 or 12345")
+    assert f.cities == ["tokyo", "london"]  # CITY_COORDS order, no repeats
+    assert f.years == [1879, 2024] and f.numbers == [1879.0, 2024.0, 12345.0]
+    assert agent.find_years("born 1879, died 1955, today 2024") == [1879, 1955]
+
+
+def test_run_together_names_do_not_overlap():
+    # the only known difference from the old substring checks: "tokyo" and "osaka" share the "o"
+    assert _old_cities("tokyosaka weather") == ["tokyo", "osaka"]
+    assert agent.detect_cities("tokyosaka weather") == ["tokyo"]
+    assert agent.detect_cities("tokyotokyo") == ["tokyo"]
+
+
+def test_trie_pattern_matches_each_word():
+    words = ["wiki", "wikipedia", "who is", "who was", "+"]
+    pattern = re.compile("|".join(agent._trie_pattern(words)))
+    for w in words:
+        assert pattern.fullmatch(w)
+    assert pattern.match("wikipedia").group() == "wikipedia"  # longest alternative first
+    assert not pattern.fullmatch("who")
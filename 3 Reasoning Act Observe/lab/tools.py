@@ -1,6 +1,9 @@
 import re
 import requests
 
+# One keep-alive session: repeat calls to the same API reuse the TCP/TLS connection
+_session = requests.Session()
+
 CITY_COORDS = {
     "manila": (14.5995, 120.9842),
     "tokyo": (35.6762, 139.6503),
@@ -22,7 +25,7 @@ def tool_weather(city: str):
     lat, lon = CITY_COORDS[chosen]
     url = "https://api.open-meteo.com/v1/forecast"
     params = {"latitude": lat, "longitude": lon, "hourly": "temperature_2m"}
-    r = requests.get(url, params=params, timeout=20)
+    r = _session.get(url, params=params, timeout=20)
     r.raise_for_status()
     data = r.json()
     temps = data.get("hourly", {}).get("temperature_2m", [])
@@ -34,7 +37,7 @@ def tool_wikipedia(topic: str):
         return {"topic": topic, "summary": None, "error": "empty topic"}
     title = topic.strip().replace(" ", "_")
     url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{title}"
-    r = requests.get(url, timeout=20, headers={"Accept": "application/json"})
+    r = _session.get(url, timeout=20, headers={"Accept": "application/json"})
     if r.status_code in (400, 404):
         return {"topic": topic, "summary": None, "error": "not found"}
     r.raise_for_status()
@@ -2,14 +2,17 @@
 # - Normalizes weather tool args (accepts 'location'/'city_name' -> 'city')
 # - Stronger JSON-only planner prompt
 # - Safe JSON parsing + visible loop logs
+# - arun(): asyncio variant of run() for serving many queries from one process
+# - One planner call per step (the old extra "finalize" call per observation is gone)
 
+import asyncio
 import json
 import re
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Callable, Optional
 from datetime import datetime
 
-from llm_client import generate_text  # must exist in your Module 4
-from tools import TOOL_REGISTRY       # patched tools.py in this folder
+from llm_client import agenerate_text, generate_text  # must exist in your Module 4
+from tools import ASYNC_TOOLS, TOOL_REGISTRY          # patched tools.py in this folder
 
 SYS = """
 You are a strict planner for a CLI agent. Reply with STRICT JSON ONLY.
@@ -23,6 +26,7 @@ Rules:
 - Respond with a SINGLE JSON object (one line), no markdown/prose.
 - If the user asks for weather, you MUST call {"tool":"weather","args":{"city":"Tokyo"}}.
   (do NOT use keys like "location" or "city_name").
+  It returns the temperature now and today's min/max; add "day":N for N days from today.
 - For tasks needing facts (Wikipedia) or math (calculator), call a tool before finalizing.
 - For multi-city weather, call weather once per city, then calculator to combine.
 - If parameters are missing, return a FINAL answer asking a concise clarification question.
@@ -53,7 +57,7 @@ def _reprompt_fix(msg: str) -> Dict[str, Any]:
     out = generate_text(f"Fix the structure. {msg}. Return ONE valid JSON object only.")
     return _extract_json(out)
 
-def call_tool(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+def _normalize_args(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
     # --- normalize common mistakes from the model ---
     if tool_name == "weather" and isinstance(args, dict):
         if "city" not in args:
@@ -61,7 +65,10 @@ def call_tool(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
                 args["city"] = args.pop("location")
             elif "city_name" in args:
                 args["city"] = args.pop("city_name")
-    # ------------------------------------------------
+    return args
+
+def call_tool(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    args = _normalize_args(tool_name, args)
     spec = TOOL_REGISTRY.get(tool_name)
     if not spec:
         return {"error": f"Unknown tool '{tool_name}'"}
@@ -73,23 +80,37 @@ def call_tool(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
     except Exception as e:
         return {"error": f"Tool {tool_name} failed: {e}"}
 
-def run(query: str, max_steps: int = 6) -> Dict[str, Any]:
+def _planner_prompt(context: str, has_obs: bool, last: bool) -> str:
+    if last:
+        ask = 'Step limit reached: return {"final":true,"answer":"..."} with the best answer you can give now.\n'
+    elif has_obs:
+        ask = 'If you can answer now, return {"final":true,"answer":"..."}\nOtherwise, return the next {"tool":...,"args":...}.\n'
+    else:
+        ask = ""
+    return f"""{SYS}
+
+Conversation so far:
+{context}
+{ask}Your JSON:"""
+
+def run(query: str, max_steps: int = 6,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """on_event gets every trace record as soon as it is added (service.py streams them)."""
     trace: List[Dict[str, Any]] = []
     context = f"User: {query}\n"
 
     def record(role: str, data: Dict[str, Any]):
         trace.append({"ts": datetime.utcnow().isoformat() + "Z", "role": role, "data": data})
+        if on_event:
+            on_event(trace[-1])
 
     record("user", {"query": query})
 
-    for step in range(1, max_steps + 1):
-        prompt = f"""{SYS}
-
-Conversation so far:
-{context}
-
-Your JSON:"""
-        out = generate_text(prompt)
+    # One planner call per step: it sees the latest observation and either finalizes
+    # or picks the next tool. After max_steps tool calls, one last call must finalize.
+    for step in range(1, max_steps + 2):
+        last = step > max_steps
+        out = generate_text(_planner_prompt(context, step > 1, last))
         decision = _extract_json(out)
         if not _valid(decision):
             decision = _reprompt_fix("Missing 'tool' or 'final'. Either choose a tool with args, or finalize with an answer.")
@@ -99,31 +120,71 @@ Your JSON:"""
             ans = decision.get("answer", "(no answer)")
             record("final", {"answer": ans})
             return {"answer": ans, "trace": trace}
+        if last:
+            break
 
         tool = decision.get("tool")
         args = decision.get("args", {}) or {}
         obs = call_tool(tool, args) if tool else {"error": "No tool specified"}
         record("observation", {"step": step, "tool": tool, "args": args, "observation": obs})
-        context += f"Planner: {json.dumps(decision)}\nObservation: {json.dumps(obs)}\n"
-
-        finalize = f"""{SYS}
-Latest observation: {json.dumps(obs, ensure_ascii=False)}
-If you can answer now, return {{"final":true,"answer":"..."}}
-Otherwise, return the next {{"tool":...,"args":...}}.
-Your JSON:"""
-        out2 = generate_text(finalize)
-        decision2 = _extract_json(out2)
-        if not _valid(decision2):
-            decision2 = _reprompt_fix("Finalize with answer or pick the next tool. JSON only.")
-        record("planner", {"step": step, "decision": decision2})
-
-        if decision2.get("final"):
-            ans = decision2.get("answer", "(no answer)")
-            record("final", {"answer": ans})
-            return {"answer": ans, "trace": trace}
-        else:
-            context += f"Planner: {json.dumps(decision2)}\n"
+        context += f"Planner: {json.dumps(decision)}\nObservation: {json.dumps(obs, ensure_ascii=False)}\n"
+
+    ans = "I reached the step limit. Try a more specific query."
+    record("final", {"answer": ans})
+    return {"answer": ans, "trace": trace}
+
+# ---------------------------------------------------------------------------
+# asyncio variant: same loop and trace as run(), with awaited LLM/tool calls.
+# Cancelling the task cancels the in-flight call; the trace records it.
+# ---------------------------------------------------------------------------
+async def _areprompt_fix(msg: str) -> Dict[str, Any]:
+    out = await agenerate_text(f"Fix the structure. {msg}. Return ONE valid JSON object only.")
+    return _extract_json(out)
+
+async def acall_tool(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    afn = ASYNC_TOOLS.get(tool_name)
+    if afn is None:
+        return call_tool(tool_name, args)  # unknown tool or CPU-only (calculator)
+    try:
+        return await afn(**_normalize_args(tool_name, args))
+    except TypeError as e:
+        return {"error": f"Bad args for {tool_name}: {e}"}
+    except Exception as e:
+        return {"error": f"Tool {tool_name} failed: {e}"}
+
+async def arun(query: str, max_steps: int = 6, trace: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+    trace = trace if trace is not None else []
+    context = f"User: {query}\n"
+
+    def record(role: str, data: Dict[str, Any]):
+        trace.append({"ts": datetime.utcnow().isoformat() + "Z", "role": role, "data": data})
+
+    record("user", {"query": query})
+
+    try:
+        for step in range(1, max_steps + 2):
+            last = step > max_steps
+            decision = _extract_json(await agenerate_text(_planner_prompt(context, step > 1, last)))
+            if not _valid(decision):
+                decision = await _areprompt_fix("Missing 'tool' or 'final'. Either choose a tool with args, or finalize with an answer.")
+            record("planner", {"step": step, "decision": decision})
+
+            if decision.get("final"):
+                ans = decision.get("answer", "(no answer)")
+                record("final", {"answer": ans})
+                return {"answer": ans, "trace": trace}
+            if last:
+                break
+
+            tool = decision.get("tool")
+            args = decision.get("args", {}) or {}
+            obs = await acall_tool(tool, args) if tool else {"error": "No tool specified"}
+            record("observation", {"step": step, "tool": tool, "args": args, "observation": obs})
+            context += f"Planner: {json.dumps(decision)}\nObservation: {json.dumps(obs, ensure_ascii=False)}\n"
+    except asyncio.CancelledError:
+        record("cancelled", {"query": query})
+        raise
 
     ans = "I reached the step limit. Try a more specific query."
     record("final", {"answer": ans})
-    return {"answer": ans, "trace": trace}
\ No newline at end of file
+    return {"answer": ans, "trace": trace}
@@ -10,6 +10,24 @@ LMSTUDIO_BASE_URL = os.getenv("LMSTUDIO_BASE_URL", "http://localhost:1234/v1")
 
 # Timeouts/limits
 HTTP_TIMEOUT = 20
+# Shared keep-alive HTTP client (http_client.py)
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))  # hosts with a cached pool
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))          # connections kept per host
+HTTP_HTTP2 = os.getenv("HTTP_HTTP2", "0") == "1"                       # needs: pip install httpx[http2]
 MAX_STEPS_DEFAULT = 4
+
 CACHE_FILE = "cache.json"
 CACHE_TTL_SEC = 600  # 10 minutes
+
+# service.py: plans run at once, and requests that may wait before the service answers 429
+SERVICE_HOST = os.getenv("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8080"))
+SERVICE_WORKERS = int(os.getenv("SERVICE_WORKERS", "4"))
+SERVICE_QUEUE_SIZE = int(os.getenv("SERVICE_QUEUE_SIZE", "16"))
+
+# Gazetteer (gazetteer.py): a GeoNames dump (e.g. cities15000.zip) compiled into GAZETTEER_INDEX
+# (memory-mapped) on first use; without it the tools know the built-in workshop cities only
+GAZETTEER_FILE = os.getenv("GAZETTEER_FILE", "")
+GAZETTEER_INDEX = os.getenv("GAZETTEER_INDEX", "gazetteer.idx")
+# "lat,lon" given as a city resolves to the nearest place at most this far away (else: unknown)
+GAZETTEER_SNAP_KM = float(os.getenv("GAZETTEER_SNAP_KM", "50"))
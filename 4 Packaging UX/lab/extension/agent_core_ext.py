@@ -1,15 +1,24 @@
+import asyncio
+import contextvars
 import json
 import re
-from typing import Dict, Any, List, Tuple, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 
-from llm_client import generate_text
-from tools_ext import TOOL_REGISTRY
+import fast_path
+from config import CONTEXT_BUDGET_TOKENS, CONTEXT_KEEP_RECENT, FAST_PATH, RUN_DEADLINE_SEC
+from context_manager import ConversationContext, estimate_tokens
+from answer_stream import AnswerStream
+from llm_client import agenerate_text, generate_text, registry, stream_text
+from resilience import deadline, error_observation
+from tools_ext import ASYNC_TOOLS, TOOL_REGISTRY
 
 SYS = """
 You are a planner for a small agent. Respond with STRICT JSON ONLY.
 Choose ONE of:
-- An action: {"tool":"<weather|wikipedia|calculator|news|translate>","args":{...}}
+- An action: {"tool":"<weather|weather_batch|wikipedia|calculator|news|translate|nearby>","args":{...}}
 - A final answer: {"final":true,"answer":"..."}
 
 Rules:
@@ -18,6 +27,11 @@ Rules:
 - If you already have enough info to answer, finalize.
 - For translate: args must include {"text":"...","target_lang":"<lang-code>"} (e.g., "tl","es","fr").
 - For news: args must include {"topic":"..."}.
+- For weather_batch: args must include {"cities":["...","..."]} (one request for all cities).
+- Weather gives the temperature now and today's min/max; add "day":N (days from today) or
+  "day":"YYYY-MM-DD" for another day, or "days":N for each of the next N days.
+- A city the tools do not know comes back with an error; if you know its coordinates, pass
+  "lat,lon" as the city, or {"tool":"nearby","args":{"lat":..,"lon":..,"radius_km":50}}.
 """
 
 def parse_json(s: str) -> Dict[str, Any]:
@@ -37,81 +51,222 @@ def call_tool(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
     except TypeError as e:
         return {"error": f"Bad args for {tool_name}: {e}"}
     except Exception as e:
-        return {"error": f"Tool {tool_name} failed: {e}"}
+        return error_observation(tool_name, e) or {"error": f"Tool {tool_name} failed: {e}"}
+
+def call_tools(actions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Run several {"tool","args"} actions concurrently; results keep the input order."""
+    if len(actions) <= 1:
+        return [call_tool(a["tool"], a["args"]) for a in actions]
+    with ThreadPoolExecutor(max_workers=len(actions)) as pool:
+        # each task gets a copy of the caller's context, so the run's deadline applies there too
+        futures = [pool.submit(contextvars.copy_context().run, call_tool, a["tool"], a["args"]) for a in actions]
+        return [f.result() for f in futures]
 
 def _record(trace: List[Dict[str, Any]], role: str, data: Dict[str, Any]):
     trace.append({"ts": datetime.utcnow().isoformat() + "Z", "role": role, "data": data})
 
-def run(user_query: str, max_steps: int = 5, verbose=False, transcript_file: Optional[str] = None) -> Tuple[str, List[Dict[str, Any]]]:
+def _decide(text: str, user_query: str, obs: Any) -> Dict[str, Any]:
+    try:
+        return parse_json(text)
+    except Exception:
+        if obs is not None:
+            return {"final": True, "answer": f"Based on the observation: {obs}. (Planner could not finalize.)"}
+        # Fallback: route to wikipedia by default
+        return {"tool": "wikipedia", "args": {"topic": user_query}}
+
+def _plan(prompt: str, on_token: Optional[Callable[[str], None]], role: str = "planner") -> str:
+    """One planner call; with on_token, stream it and pass on the answer text as it arrives."""
+    if on_token is None:
+        return generate_text(prompt, temperature=0.2, semantic_text=prompt[len(SYS):], role=role)
+    answer, parts = AnswerStream(), []
+    for piece in stream_text(prompt, temperature=0.2, semantic_text=prompt[len(SYS):], role=role):
+        parts.append(piece)
+        delta = answer.feed(piece)
+        if delta:
+            on_token(delta)
+    return "".join(parts)
+
+def _expired(ends: Optional[float]) -> bool:
+    return ends is not None and time.monotonic() >= ends
+
+def _narrates() -> bool:
+    """True when the final answer is routed to a different provider than the planner steps."""
+    return registry.resolve(role="narrator") != registry.resolve(role="planner")
+
+def run(user_query: str, max_steps: int = 5, verbose=False, transcript_file: Optional[str] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+        deadline_s: Optional[float] = RUN_DEADLINE_SEC, fast: bool = FAST_PATH) -> Tuple[str, List[Dict[str, Any]]]:
+    """on_token streams the final answer's text; on_event gets each trace record as it is added.
+    Tool calls share a deadline of deadline_s seconds (None = none); after it the planner must finalize.
+    With fast=True a query fast_path recognizes skips the planner steps (see fast_path.py)."""
     trace: List[Dict[str, Any]] = []
-    context = f"User: {user_query}\n"
-    _record(trace, "user", {"query": user_query})
+    ends = time.monotonic() + deadline_s if deadline_s else None
+    ctx = ConversationContext(SYS, user_query, CONTEXT_BUDGET_TOKENS, CONTEXT_KEEP_RECENT)
 
-    for step in range(1, max_steps + 1):
-        prompt = f"""{SYS}
+    def record(role: str, data: Dict[str, Any]):
+        _record(trace, role, data)
+        if on_event:
+            on_event(trace[-1])
 
-Conversation so far:
-{context}
+    record("user", {"query": user_query})
 
-Your JSON:
-"""
-        text = generate_text(prompt, temperature=0.2)
-        try:
-            decision = parse_json(text)
-        except Exception:
-            # Fallback: route to wikipedia by default
-            decision = {"tool": "wikipedia", "args": {"topic": user_query}}
-        _record(trace, "planner", {"step": step, "decision": decision})
+    obs = None
+    narrate = _narrates()
+    first = 1
+    plan = fast_path.match(user_query) if fast else None
+    if plan:
+        # Known plan: run its tools at once, then one call writes the final answer
+        record("fast_path", {"rule": plan.rule, "actions": plan.actions})
+        with deadline(ends):
+            results = call_tools(plan.actions)
+        for action, result in zip(plan.actions, results):
+            record("observation", {"step": 1, "tool": action["tool"], "args": action["args"], "observation": result})
+            _append_transcript(transcript_file, trace[-1])
+        obs = results[0] if len(results) == 1 else results
+        ctx.add({"tools": plan.actions}, obs)
+        prompt = ctx.planner_prompt(last=True)
+        decision = _decide(_plan(prompt, on_token, role="narrator"), user_query, None)
+        record("planner", {"step": 1, "decision": decision, "prompt_tokens": estimate_tokens(prompt),
+                           "fast_path": plan.rule})
+        if decision.get("final"):
+            answer = decision.get("answer", "(no answer)")
+            record("final", {"answer": answer})
+            _append_transcript(transcript_file, trace[-1])
+            return answer, trace
+        fast_path.fell_back(plan)
+        first = 2
 
+    # One planner call per step (it sees the latest observation and finalizes or picks
+    # the next tool); after max_steps tool calls, one last call may only finalize.
+    for step in range(first, max_steps + 2):
+        last = step > max_steps or _expired(ends)
+        prompt = ctx.planner_prompt(last=last)
+        text = _plan(prompt, None if narrate else on_token)
+        decision = _decide(text, user_query, obs)
+        record("planner", {"step": step, "decision": decision, "prompt_tokens": estimate_tokens(prompt)})
+
+        if decision.get("final") and narrate:
+            # Planner is done; the narrator provider writes the answer from the same context
+            prompt = ctx.planner_prompt(last=True)
+            narrated = _decide(_plan(prompt, on_token, role="narrator"), user_query, None)
+            record("narrator", {"step": step, "provider": registry.resolve(role="narrator"),
+                                "decision": narrated, "prompt_tokens": estimate_tokens(prompt)})
+            if narrated.get("final"):
+                decision = narrated
         if decision.get("final"):
             answer = decision.get("answer", "(no answer)")
-            _record(trace, "final", {"answer": answer})
-            if transcript_file:
-                with open(transcript_file, "a", encoding="utf-8") as f:
-                    f.write(json.dumps(trace[-1]) + "\n")
+            record("final", {"answer": answer})
+            _append_transcript(transcript_file, trace[-1])
             return answer, trace
+        if last:
+            break
 
         tool = decision.get("tool")
         args = decision.get("args", {})
-        obs = call_tool(tool, args) if tool else {"error": "No tool specified"}
-        _record(trace, "observation", {"step": step, "tool": tool, "args": args, "observation": obs})
-        context += f"Planner: {json.dumps(decision)}\nObservation: {json.dumps(obs)}\n"
-
-        finalize = f"""{SYS}
-Latest observation: {json.dumps(obs)}
-If you can answer now, return {{"final":true,"answer":"..."}}
-Otherwise, return the next {{"tool":...,"args":...}}.
-"""
-        text2 = generate_text(finalize, temperature=0.2)
-        try:
-            decision2 = parse_json(text2)
-        except Exception:
-            answer = f"Based on the observation: {obs}. (Planner could not finalize.)"
-            _record(trace, "final", {"answer": answer})
-            if transcript_file:
-                with open(transcript_file, "a", encoding="utf-8") as f:
-                    f.write(json.dumps(trace[-1]) + "\n")
-            return answer, trace
-        _record(trace, "planner", {"step": step, "decision": decision2})
-
-        if decision2.get("final"):
-            answer = decision2.get("answer", "(no answer)")
-            _record(trace, "final", {"answer": answer})
-            if transcript_file:
-                with open(transcript_file, "a", encoding="utf-8") as f:
-                    f.write(json.dumps(trace[-1]) + "\n")
-            return answer, trace
-        else:
-            context += f"Planner: {json.dumps(decision2)}\n"
-
-        if transcript_file:
-            with open(transcript_file, "a", encoding="utf-8") as f:
-                f.write(json.dumps(trace[-1]) + "\n")
+        with deadline(ends):
+            obs = call_tool(tool, args) if tool else {"error": "No tool specified"}
+        record("observation", {"step": step, "tool": tool, "args": args, "observation": obs})
+        ctx.add(decision, obs)
+        _append_transcript(transcript_file, trace[-1])
 
     # Step cap reached
     answer = "I reached the step limit. Try a more specific query."
-    _record(trace, "final", {"answer": answer})
+    record("final", {"answer": answer})
+    _append_transcript(transcript_file, trace[-1])
+    return answer, trace
+
+def _append_transcript(transcript_file: Optional[str], rec: Dict[str, Any]):
     if transcript_file:
         with open(transcript_file, "a", encoding="utf-8") as f:
-            f.write(json.dumps(trace[-1]) + "\n")
+            f.write(json.dumps(rec) + "\n")
+
+# ---------------------------------------------------------------------------
+# asyncio variant of run(): same loop, trace and transcript format, with
+# awaited LLM/tool calls. Cancelling the task cancels the in-flight call.
+# ---------------------------------------------------------------------------
+async def acall_tool(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    afn = ASYNC_TOOLS.get(tool_name)
+    if afn is None:
+        return call_tool(tool_name, args)  # unknown tool or CPU-only (calculator)
+    try:
+        return await afn(**args)
+    except TypeError as e:
+        return {"error": f"Bad args for {tool_name}: {e}"}
+    except Exception as e:
+        return error_observation(tool_name, e) or {"error": f"Tool {tool_name} failed: {e}"}
+
+async def arun(user_query: str, max_steps: int = 5, verbose=False, transcript_file: Optional[str] = None,
+               trace: Optional[List[Dict[str, Any]]] = None,
+               deadline_s: Optional[float] = RUN_DEADLINE_SEC, fast: bool = FAST_PATH) -> Tuple[str, List[Dict[str, Any]]]:
+    trace = trace if trace is not None else []
+    ends = time.monotonic() + deadline_s if deadline_s else None
+    ctx = ConversationContext(SYS, user_query, CONTEXT_BUDGET_TOKENS, CONTEXT_KEEP_RECENT)
+    _record(trace, "user", {"query": user_query})
+
+    obs = None
+    narrate = _narrates()
+    first = 1
+    plan = fast_path.match(user_query) if fast else None
+    try:
+        if plan:
+            _record(trace, "fast_path", {"rule": plan.rule, "actions": plan.actions})
+            with deadline(ends):
+                results = await asyncio.gather(*(acall_tool(a["tool"], a["args"]) for a in plan.actions))
+            for action, result in zip(plan.actions, results):
+                _record(trace, "observation", {"step": 1, "tool": action["tool"], "args": action["args"], "observation": result})
+                _append_transcript(transcript_file, trace[-1])
+            obs = results[0] if len(results) == 1 else list(results)
+            ctx.add({"tools": plan.actions}, obs)
+            prompt = ctx.planner_prompt(last=True)
+            text = await agenerate_text(prompt, temperature=0.2, semantic_text=prompt[len(SYS):], role="narrator")
+            decision = _decide(text, user_query, None)
+            _record(trace, "planner", {"step": 1, "decision": decision, "prompt_tokens": estimate_tokens(prompt),
+                                       "fast_path": plan.rule})
+            if decision.get("final"):
+                answer = decision.get("answer", "(no answer)")
+                _record(trace, "final", {"answer": answer})
+                _append_transcript(transcript_file, trace[-1])
+                return answer, trace
+            fast_path.fell_back(plan)
+            first = 2
+
+        for step in range(first, max_steps + 2):
+            last = step > max_steps or _expired(ends)
+            prompt = ctx.planner_prompt(last=last)
+            text = await agenerate_text(prompt, temperature=0.2, semantic_text=prompt[len(SYS):], role="planner")
+            decision = _decide(text, user_query, obs)
+            _record(trace, "planner", {"step": step, "decision": decision, "prompt_tokens": estimate_tokens(prompt)})
+
+            if decision.get("final") and narrate:
+                prompt = ctx.planner_prompt(last=True)
+                text = await agenerate_text(prompt, temperature=0.2, semantic_text=prompt[len(SYS):], role="narrator")
+                narrated = _decide(text, user_query, None)
+                _record(trace, "narrator", {"step": step, "provider": registry.resolve(role="narrator"),
+                                    "decision": narrated, "prompt_tokens": estimate_tokens(prompt)})
+                if narrated.get("final"):
+                    decision = narrated
+            if decision.get("final"):
+                answer = decision.get("answer", "(no answer)")
+                _record(trace, "final", {"answer": answer})
+                _append_transcript(transcript_file, trace[-1])
+                return answer, trace
+            if last:
+                break
+
+            tool = decision.get("tool")
+            args = decision.get("args", {})
+            with deadline(ends):
+                obs = await acall_tool(tool, args) if tool else {"error": "No tool specified"}
+            _record(trace, "observation", {"step": step, "tool": tool, "args": args, "observation": obs})
+            ctx.add(decision, obs)
+            _append_transcript(transcript_file, trace[-1])
+    except asyncio.CancelledError:
+        _record(trace, "cancelled", {"query": user_query})
+        _append_transcript(transcript_file, trace[-1])
+        raise
+
+    answer = "I reached the step limit. Try a more specific query."
+    _record(trace, "final", {"answer": answer})
+    _append_transcript(transcript_file, trace[-1])
     return answer, trace
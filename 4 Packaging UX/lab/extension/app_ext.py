@@ -1,38 +1,98 @@
 import argparse, json
-from rich.console import Console
-from rich.panel import Panel
-from rich.table import Table
 
-from agent_core_ext import run
 from config import MAX_STEPS_DEFAULT
+from llm_providers import PROVIDERS
+
+# Rich, the agent core (tools, HTTP client, cache) and the LLM SDK are imported
+# only where they are first needed, so --help and usage errors start fast.
+
+def stream_json(run_agent):
+    """--stream --json: one JSON object per line, flushed as soon as it happens."""
+    def emit(obj):
+        print(json.dumps(obj, ensure_ascii=False), flush=True)
+    run_agent(on_token=lambda text: emit({"event": "token", "text": text}),
+              on_event=lambda rec: emit({"event": rec["role"], "ts": rec["ts"], "data": rec["data"]}))
+
+def stream_panel(run_agent, console):
+    """--stream: live-updating panel; shows the current step until the answer starts arriving."""
+    from rich.live import Live
+    from rich.panel import Panel
+    from rich.text import Text
+
+    streamed = []
+    status = {"text": "thinking…"}
+
+    def panel():
+        body = Text("".join(streamed)) if streamed else Text(status["text"], style="dim")
+        return Panel(body, title="Agent Answer", border_style="bold green")
+
+    with Live(panel(), console=console, refresh_per_second=12, transient=False) as live:
+        def on_token(text):
+            streamed.append(text)
+            live.update(panel())
+
+        def on_event(rec):
+            data = rec.get("data", {})
+            if rec["role"] == "planner" and not data.get("decision", {}).get("final"):
+                streamed.clear()  # a tool step, not the answer
+                status["text"] = f"step {data.get('step')}: {json.dumps(data.get('decision'), ensure_ascii=False)[:120]}"
+            elif rec["role"] == "final":
+                streamed[:] = [data.get("answer", "")]  # translated / fallback answers replace the stream
+            live.update(panel())
+
+        return run_agent(on_token=on_token, on_event=on_event)
 
 def main():
     parser = argparse.ArgumentParser(description="Agentic AI – Module 4 Extensions")
     parser.add_argument("query", nargs="?", help="Your question for the agent")
     parser.add_argument("--max-steps", type=int, default=MAX_STEPS_DEFAULT, help="Max reasoning steps")
-    parser.add_argument("--provider", choices=["GEMINI","LMSTUDIO"], help="Override LLM provider for this run")
+    parser.add_argument("--provider", choices=PROVIDERS, help="Override LLM provider for this run")
+    parser.add_argument("--planner-provider", choices=PROVIDERS, help="Provider for planner steps (default: --provider)")
+    parser.add_argument("--narrator-provider", choices=PROVIDERS, help="Provider that writes the final answer (default: --provider)")
     parser.add_argument("--pretty", action="store_true", help="Pretty print the final answer")
     parser.add_argument("--json", action="store_true", help="Output a JSON object (answer + trace)")
     parser.add_argument("--verbose", action="store_true", help="Show step-by-step decisions and observations")
+    parser.add_argument("--stream", action="store_true", help="Stream the answer as it is generated (NDJSON events with --json)")
     parser.add_argument("--transcript", type=str, help="Write transcript JSONL to this file")
+    parser.add_argument("--no-fast-path", action="store_true", help="Always plan step by step (see fast_path.py)")
     args = parser.parse_args()
 
     if not args.query:
         parser.print_help()
         return
 
+    from agent_core_ext import run
+    from config import FAST_PATH
+    from llm_client import registry
+    fast = FAST_PATH and not args.no_fast_path
     if args.provider:
-        import os
-        os.environ["LLM_PROVIDER"] = args.provider
-
-    answer, trace = run(args.query, max_steps=args.max_steps, verbose=args.verbose, transcript_file=args.transcript)
+        registry.set_default(args.provider)
+    if args.planner_provider:
+        registry.route("planner", args.planner_provider)
+    if args.narrator_provider:
+        registry.route("narrator", args.narrator_provider)
 
-    console = Console()
+    if args.stream:
+        run_agent = lambda **hooks: run(args.query, max_steps=args.max_steps, verbose=args.verbose, transcript_file=args.transcript,
+                                        fast=fast, **hooks)
+        if args.json:
+            stream_json(run_agent)
+            return
+        from rich.console import Console
+        answer, trace = stream_panel(run_agent, Console())
+    else:
+        answer, trace = run(args.query, max_steps=args.max_steps, verbose=args.verbose, transcript_file=args.transcript,
+                            fast=fast)
 
     if args.json:
         print(json.dumps({"answer": answer, "trace": trace}, ensure_ascii=False, indent=2))
         return
 
+    from rich.console import Console
+    from rich.panel import Panel
+    from rich.table import Table
+    console = Console()
+
     if args.verbose:
         table = Table(title="Reason–Act–Observe Trace")
         table.add_column("Step/Role", style="bold cyan")
@@ -43,6 +103,8 @@ def main():
             table.add_row(role, json.dumps(data, ensure_ascii=False)[:2000])
         console.print(table)
 
+    if args.stream:
+        return  # the live panel already shows the answer
     if args.pretty:
         console.print(Panel.fit(answer, title="Agent Answer", border_style="bold green"))
     else:
@@ -0,0 +1,112 @@
+"""Planner context kept as structured turns instead of one growing string.
+
+Each prompt is   SYS + query/hints  (stable prefix)
+               + one rendered block per turn (append-only)
+               + a short instruction suffix,
+so consecutive prompts share everything but the tail and a local server's
+prompt KV-cache (LM Studio / llama.cpp) can reuse it. When the prompt would
+go over the token budget, the oldest turns (all but the last keep_recent)
+are compacted once: long strings in their observations are cut and lists
+shortened; if that is still too much, the oldest turns are dropped behind
+an "(N earlier steps omitted)" marker. Compacted turns stay compacted, so
+the prefix only changes when the budget forces it.
+"""
+import json
+from typing import Any, Dict, List
+
+_NO_OBS = object()
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English/JSON; good enough for budgeting
+    return (len(text) + 3) // 4
+
+
+def shrink(value: Any, max_chars: int = 160, max_items: int = 5) -> Any:
+    """Copy of an observation with long strings cut and long lists shortened."""
+    if isinstance(value, str):
+        return value if len(value) <= max_chars else value[:max_chars].rstrip() + "…"
+    if isinstance(value, dict):
+        return {k: shrink(v, max_chars, max_items) for k, v in value.items()}
+    if isinstance(value, list):
+        items = [shrink(v, max_chars, max_items) for v in value[:max_items]]
+        if len(value) > max_items:
+            items.append(f"(+{len(value) - max_items} more)")
+        return items
+    return value
+
+
+class _Turn:
+    __slots__ = ("decision", "obs", "text", "tokens", "compact")
+
+    def __init__(self, decision: Dict[str, Any], obs: Any):
+        self.decision = decision
+        self.obs = obs
+        self.compact = False
+        self.render()
+
+    def render(self, compact: bool = False):
+        self.compact = compact
+        text = f"Planner: {json.dumps(self.decision, ensure_ascii=False)}\n"
+        if self.obs is not _NO_OBS:
+            obs = shrink(self.obs) if compact else self.obs
+            text += f"Observation: {json.dumps(obs, ensure_ascii=False)}\n"
+        self.text = text
+        self.tokens = estimate_tokens(text)
+
+
+class ConversationContext:
+    SUFFIX_FIRST = "\nYour JSON:\n"
+    SUFFIX_NEXT = ('\nIf you can answer now, return {"final":true,"answer":"..."}\n'
+                   'Otherwise, return the next action.\nYour JSON:\n')
+    SUFFIX_LAST = ('\nStep limit reached: return {"final":true,"answer":"..."} with the best '
+                   'answer you can give from the observations above.\nYour JSON:\n')
+
+    def __init__(self, system: str, query: str, budget_tokens: int = 3000, keep_recent: int = 2):
+        self.system = system
+        self.budget_tokens = budget_tokens
+        self.keep_recent = keep_recent
+        self._head = f"{system}\n\nConversation so far:\nUser: {query}\n"
+        self._turns: List[_Turn] = []
+        self._omitted = 0
+        self.compactions = 0
+
+    def hint(self, text: str):
+        """Extra line for the stable prefix; call before the first turn."""
+        self._head += text.rstrip("\n") + "\n"
+
+    def add(self, decision: Dict[str, Any], obs: Any = _NO_OBS):
+        self._turns.append(_Turn(decision, obs))
+        self._fit()
+
+    def _marker(self) -> str:
+        return f"({self._omitted} earlier steps omitted)\n" if self._omitted else ""
+
+    def tokens(self) -> int:
+        return (estimate_tokens(self._head) + estimate_tokens(self._marker())
+                + sum(t.tokens for t in self._turns) + estimate_tokens(self.SUFFIX_LAST))
+
+    def _fit(self):
+        if self.tokens() <= self.budget_tokens:
+            return
+        self.compactions += 1
+        for turn in self._turns[:max(0, len(self._turns) - self.keep_recent)]:  # oldest first
+            if self.tokens() <= self.budget_tokens:
+                return
+            if not turn.compact:
+                turn.render(compact=True)
+        while self.tokens() > self.budget_tokens and len(self._turns) > self.keep_recent:
+            self._turns.pop(0)
+            self._omitted += 1
+
+    def planner_prompt(self, last: bool = False) -> str:
+        """Prompt for the next planner call; last=True asks for a final answer only."""
+        if last:
+            suffix = self.SUFFIX_LAST
+        else:
+            suffix = self.SUFFIX_NEXT if self._turns or self._omitted else self.SUFFIX_FIRST
+        return self._head + self._marker() + "".join(t.text for t in self._turns) + suffix
+
+    def stats(self) -> Dict[str, Any]:
+        return {"turns": len(self._turns), "omitted": self._omitted, "compactions": self.compactions,
+                "prompt_tokens": self.tokens(), "budget_tokens": self.budget_tokens}
@@ -0,0 +1,107 @@
+"""Deterministic pre-planner: skip the planning loop when the tool plan is obvious.
+
+Module 3's planner_agent routes recognized queries with plain rules before the
+LLM sees them; this does the same for the extension agent. match(query) runs
+the RULES in order. The first rule that recognizes the query returns the tool
+calls the planner would have asked for anyway: weather_batch for "weather in
+Tokyo and London", news for "latest news about solar power".
+
+run() prefetches those calls in parallel and makes ONE LLM call, for the final
+answer. If that call does not return a final answer, the normal planner loop
+takes over with the prefetched observations already in its context.
+stats() reports how many queries took the fast path (per rule) and how many
+fell back.
+"""
+import re
+import threading
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import gazetteer
+
+
+class FastPlan(NamedTuple):
+    rule: str
+    actions: List[Dict[str, Any]]  # {"tool", "args"} calls to run in parallel
+
+
+# Smaller places share their names with too many everyday words ("Nice", "Split", "Reading")
+MIN_POPULATION = 100_000
+_WEATHER_RE = re.compile(r"\b(weather|temperature|forecast)\b")
+_NEWS_RE = re.compile(r"\b(?:news|headlines)\s+(?:about|on|for)\s+(?P<topic>[^?.!]+)", re.I)
+# Asks the fixed plans do not cover (other tools, arithmetic): leave them to the planner
+_OTHER_RE = re.compile(r"\b(translate|wikipedia|who is|who was|calculate|average|sum|plus|difference)\b|[+*/=]")
+
+
+def cities_in(query: str) -> List[str]:
+    """Gazetteer cities named in the query, in the order they are mentioned."""
+    return [p.name for p in gazetteer.get().mentions(query, min_population=MIN_POPULATION)]
+
+
+def _weather(query: str) -> Optional[List[Dict[str, Any]]]:
+    """The weather in one or more known cities."""
+    cities = cities_in(query)
+    if not cities or not _WEATHER_RE.search(query.lower()):
+        return None
+    return [{"tool": "weather_batch", "args": {"cities": cities}}]
+
+
+def _news(query: str) -> Optional[List[Dict[str, Any]]]:
+    """Headlines about one topic ("news about X", "headlines on X")."""
+    m = _NEWS_RE.search(query)
+    if not m:
+        return None
+    return [{"tool": "news", "args": {"topic": m.group("topic").strip()}}]
+
+
+# First match wins; a rule returns the actions for the query or None
+RULES: List[Tuple[str, Callable[[str], Optional[List[Dict[str, Any]]]]]] = [
+    ("weather", _weather),
+    ("news", _news),
+]
+
+
+class _Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.hits: Dict[str, int] = {}
+        self.fallbacks: Dict[str, int] = {}
+
+    def seen(self):
+        with self._lock:
+            self.queries += 1
+
+    def add(self, table: Dict[str, int], rule: str):
+        with self._lock:
+            table[rule] = table.get(rule, 0) + 1
+
+
+_stats = _Stats()
+
+
+def match(query: str) -> Optional[FastPlan]:
+    """The fixed tool plan for a recognized query, or None (use the planner loop)."""
+    _stats.seen()
+    q = query or ""
+    if _OTHER_RE.search(q.lower()):
+        return None
+    for name, rule in RULES:
+        actions = rule(q)
+        if actions:
+            _stats.add(_stats.hits, name)
+            return FastPlan(name, actions)
+    return None
+
+
+def fell_back(plan: FastPlan):
+    """The one-call answer did not come back final; the planner loop takes over."""
+    _stats.add(_stats.fallbacks, plan.rule)
+
+
+def stats() -> Dict[str, Any]:
+    """hit_rate = share of queries answered on the fast path (hits that did not fall back)."""
+    hits, fallbacks = sum(_stats.hits.values()), sum(_stats.fallbacks.values())
+    return {"queries": _stats.queries, "hits": hits, "fallbacks": fallbacks,
+            "hit_rate": round((hits - fallbacks) / _stats.queries, 3) if _stats.queries else 0.0,
+            "by_rule": {name: {"hits": _stats.hits.get(name, 0), "fallbacks": _stats.fallbacks.get(name, 0)}
+                        for name, _ in RULES}}
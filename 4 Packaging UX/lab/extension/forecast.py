@@ -0,0 +1,116 @@
+"""Hourly forecast series per place: "now", one day of a trip and daily min/max without another request.
+
+Open-Meteo returns `hourly.temperature_2m` as one reading per hour starting at
+local midnight today (with timeformat=unixtime the hours come as unix times,
+and timezone=auto adds the place's utc_offset_seconds). Forecast keeps the whole
+series as
+- base: unix time of temps[0]; step: seconds between readings (3600)
+- offset: the place's UTC offset in seconds, so local day numbers are (t + offset) // 86400
+- temps: array('f'), 4 bytes a reading (NaN where the API had null)
+
+so any reading is temps[(t - base) // step]. A week is 168 readings (672 bytes,
+~900 characters of base64 in the cache entry, see to_value / from_value):
+- at(t) / now(): temperature at unix time t, interpolated between the two hours around it
+- day(i): min/max/mean of day i counted from today (local time), or of a datetime.date
+- daily(): the same for every whole day in the series
+"""
+import base64, datetime, functools, math, sys, time
+from array import array
+from typing import Any, Dict, List, Optional, Union
+
+DAY = 86400
+_EPOCH = datetime.date(1970, 1, 1)
+
+
+@functools.lru_cache(maxsize=512)
+def _decode(blob: str) -> array:
+    """float32 readings from the cached base64 (memoized: a hot place is decoded once)."""
+    temps = array("f")
+    temps.frombytes(base64.b64decode(blob))
+    if sys.byteorder != "little":
+        temps.byteswap()
+    return temps
+
+
+class Forecast:
+    __slots__ = ("base", "step", "offset", "temps")
+
+    def __init__(self, base: int, step: int, offset: int, temps: array):
+        self.base, self.step, self.offset, self.temps = int(base), int(step) or 3600, int(offset), temps
+
+    @classmethod
+    def from_open_meteo(cls, loc: Dict[str, Any]) -> Optional["Forecast"]:
+        """One location of an hourly=temperature_2m&timeformat=unixtime response (None without readings)."""
+        hourly = (loc or {}).get("hourly") or {}
+        times, values = hourly.get("time") or [], hourly.get("temperature_2m") or []
+        if not times or not values:
+            return None
+        step = times[1] - times[0] if len(times) > 1 else 3600
+        temps = array("f", (math.nan if v is None else v for v in values))
+        return cls(times[0], step, loc.get("utc_offset_seconds") or 0, temps)
+
+    def to_value(self) -> Dict[str, Any]:
+        """JSON-ready cache value (readings as little-endian float32, base64)."""
+        temps = self.temps
+        if sys.byteorder != "little":
+            temps = array("f", temps)
+            temps.byteswap()
+        return {"base": self.base, "step": self.step, "offset": self.offset,
+                "temps": base64.b64encode(temps.tobytes()).decode("ascii")}
+
+    @classmethod
+    def from_value(cls, value: Any) -> Optional["Forecast"]:
+        """The Forecast in a cache value; None for anything else (e.g. entries from before the series)."""
+        if not isinstance(value, dict) or not isinstance(value.get("temps"), str):
+            return None
+        try:
+            return cls(value["base"], value["step"], value.get("offset", 0), _decode(value["temps"]))
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    @property
+    def end(self) -> int:
+        """Unix time just past the last reading."""
+        return self.base + len(self.temps) * self.step
+
+    def at(self, t: float) -> Optional[float]:
+        """Temperature at unix time t (linear between readings); None outside the series."""
+        pos = (t - self.base) / self.step
+        i = int(pos)
+        if pos < 0 or i >= len(self.temps):
+            return None
+        a = self.temps[i]
+        b = self.temps[i + 1] if i + 1 < len(self.temps) else a
+        if math.isnan(a) or math.isnan(b):
+            return None if math.isnan(a) else round(a, 1)
+        return round(a + (b - a) * (pos - i), 1)
+
+    def now(self) -> Optional[float]:
+        return self.at(time.time())
+
+    def today(self, t: Optional[float] = None) -> int:
+        """Local day number (days since 1970-01-01 at the place) of unix time t, default now."""
+        return int((time.time() if t is None else t) + self.offset) // DAY
+
+    def _summary(self, day: int) -> Optional[Dict[str, Any]]:
+        start = day * DAY - self.offset  # local midnight, as unix time
+        lo = max(0, -(-(start - self.base) // self.step))
+        hi = min(len(self.temps), -(-(start + DAY - self.base) // self.step))
+        vals = [v for v in self.temps[lo:hi] if not math.isnan(v)] if lo < hi else []
+        if not vals:
+            return None
+        return {"date": (_EPOCH + datetime.timedelta(days=day)).isoformat(), "min_c": round(min(vals), 1),
+                "max_c": round(max(vals), 1), "mean_c": round(sum(vals) / len(vals), 1)}
+
+    def day(self, which: Union[int, datetime.date] = 0) -> Optional[Dict[str, Any]]:
+        """Min/max/mean for day `which` from today (0 = today), or for a date; None outside the series."""
+        if isinstance(which, datetime.date):
+            return self._summary((which - _EPOCH).days)
+        return self._summary(self.today() + int(which))
+
+    def daily(self, days: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Summaries from today through the end of the series (at most `days` of them)."""
+        first, last = self.today(), self.today(self.end - 1)
+        if days is not None:
+            last = min(last, first + max(0, int(days)) - 1)
+        return [s for s in (self._summary(d) for d in range(first, last + 1)) if s]
@@ -0,0 +1,425 @@
+"""Shared HTTP client for every tool module.
+
+One pooled, keep-alive client per process instead of a fresh connection
+(TCP + TLS handshake) per requests.get/post call:
+
+- sync: a requests.Session whose adapter keeps up to HTTP_POOL_MAXSIZE
+  connections per host, or an httpx.Client speaking HTTP/2 when
+  HTTP_HTTP2=1 and the `h2` package is installed;
+- async: an httpx.AsyncClient with the same limits, one per event loop (its
+  connections belong to the loop that opened them, so a second asyncio.run
+  gets a client of its own).
+
+Every call is timed per host; stats() returns count/errors/p50/p95/max
+latency so slow upstreams are easy to spot.
+
+Calls to a known upstream (UPSTREAM_HOSTS: open-meteo, wikipedia, newsapi,
+translate) first wait for its token bucket and adaptive concurrency slot in
+`limits`, and report the outcome back, so bursts from batch or service mode
+slow down before the upstream starts answering 429.
+
+Every host also has a circuit breaker (`breakers`), and timeouts are clipped
+to the caller's deadline (resilience.py). GETs to HEDGE_UPSTREAMS are hedged:
+if there is no reply after the host's recent p95 latency, a second copy is
+sent and the first answer wins.
+"""
+import asyncio
+import contextvars
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, Optional
+from urllib.parse import urlsplit
+
+from config import (HEDGE_MIN_MS, HEDGE_MIN_SAMPLES, HEDGE_UPSTREAMS, HTTP_HTTP2, HTTP_POOL_CONNECTIONS,
+                    HTTP_POOL_MAXSIZE, HTTP_TIMEOUT, UPSTREAM_CONCURRENCY, UPSTREAM_HOSTS, UPSTREAM_LATENCY_MS,
+                    UPSTREAM_RPM)
+from rate_limit import RateLimits, is_overload
+from resilience import Breakers, DeadlineExceeded, clip_timeout, remaining
+
+USER_AGENT = "AgenticAIWorkshop/1.0 (https://example.com/; contact@example.com)"
+
+_lock = threading.Lock()
+_client = None
+_aclients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+_metrics: Dict[str, Dict[str, Any]] = {}
+limits = RateLimits(UPSTREAM_RPM, concurrency=UPSTREAM_CONCURRENCY, latency_ms=UPSTREAM_LATENCY_MS)
+breakers = Breakers()
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _http2_available() -> bool:
+    if not HTTP_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+        import httpx  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def client():
+    """The process-wide sync client (requests.Session or httpx.Client)."""
+    global _client
+    with _lock:
+        if _client is None:
+            if _http2_available():
+                import httpx
+                _client = httpx.Client(
+                    http2=True, timeout=HTTP_TIMEOUT, headers={"User-Agent": USER_AGENT},
+                    limits=httpx.Limits(max_connections=HTTP_POOL_CONNECTIONS * HTTP_POOL_MAXSIZE,
+                                        max_keepalive_connections=HTTP_POOL_MAXSIZE))
+            else:
+                import requests
+                from requests.adapters import HTTPAdapter
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                s.headers["User-Agent"] = USER_AGENT
+                _client = s
+        return _client
+
+
+def async_client():
+    """The running event loop's httpx.AsyncClient (created on first use in that loop)."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        c = _aclients.get(loop)
+        if c is None:
+            import httpx
+            for other in [other for other in _aclients if other.is_closed()]:
+                del _aclients[other]  # its connections went with the loop
+            c = _aclients[loop] = httpx.AsyncClient(
+                http2=_http2_available(), timeout=HTTP_TIMEOUT, headers={"User-Agent": USER_AGENT},
+                limits=httpx.Limits(max_connections=HTTP_POOL_CONNECTIONS * HTTP_POOL_MAXSIZE,
+                                    max_keepalive_connections=HTTP_POOL_MAXSIZE))
+        return c
+
+
+def http_errors() -> tuple:
+    """Exception types raised by the active transports (for `except http_errors():`)."""
+    errors = []
+    try:
+        import requests
+        errors.append(requests.RequestException)
+    except ImportError:
+        pass
+    try:
+        import httpx
+        errors.append(httpx.HTTPError)
+    except ImportError:
+        pass
+    return tuple(errors) or (OSError,)
+
+
+# ---- per-host latency metrics ----
+def _observe(url: str, started: float, status: Optional[int]):
+    host = urlsplit(url).hostname or url
+    ms = (time.perf_counter() - started) * 1000
+    with _lock:
+        m = _metrics.get(host)
+        if m is None:
+            m = _metrics[host] = {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                  "hedged": 0, "hedge_wins": 0, "recent": deque(maxlen=512)}
+        m["count"] += 1
+        if status is None or status >= 500 or status == 429:
+            m["errors"] += 1
+        m["total_ms"] += ms
+        m["max_ms"] = max(m["max_ms"], ms)
+        m["recent"].append(ms)
+
+
+def _pct(samples, q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def latency_ms(host: str, q: float = 0.95) -> Optional[float]:
+    """Recent latency percentile for host, or None before any samples."""
+    with _lock:
+        m = _metrics.get(host)
+        return round(_pct(list(m["recent"]), q), 1) if m and m["recent"] else None
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    with _lock:
+        snapshot = {h: (dict(m), list(m["recent"])) for h, m in _metrics.items()}
+    out = {}
+    for host, (m, recent) in snapshot.items():
+        out[host] = {
+            "count": m["count"],
+            "errors": m["errors"],
+            "avg_ms": round(m["total_ms"] / m["count"], 1) if m["count"] else 0.0,
+            "p50_ms": round(_pct(recent, 0.50), 1),
+            "p95_ms": round(_pct(recent, 0.95), 1),
+            "max_ms": round(m["max_ms"], 1),
+            "hedged": m["hedged"],
+            "hedge_wins": m["hedge_wins"],
+        }
+    return out
+
+
+# ---- upstream rate limits ----
+def upstream_for(url: str) -> Optional[str]:
+    """Upstream name for url's host (or a parent domain) in UPSTREAM_HOSTS, else None."""
+    host = urlsplit(url).hostname or ""
+    while host:
+        name = UPSTREAM_HOSTS.get(host)
+        if name:
+            return name
+        host = host.partition(".")[2]
+    return None
+
+
+def _retry_after(r) -> Optional[float]:
+    if r is None or r.status_code not in (429, 503):
+        return None
+    try:
+        return min(float(r.headers.get("Retry-After", "")), 60.0)
+    except ValueError:
+        return None
+
+
+def _finish(finish, breaker, r, error: Optional[BaseException], clipped: bool):
+    status = r.status_code if r is not None else None
+    if clipped and error is not None and is_overload(None, error):
+        # timed out on our own deadline, not the upstream's fault
+        breaker.record(None)
+        if finish is not None:
+            finish()
+        raise DeadlineExceeded(f"deadline reached waiting for {breaker.name}") from error
+    breaker.record(error is None and not is_overload(status))
+    if finish is not None:
+        finish(status, error, _retry_after(r))
+
+
+def _timeout(timeout: Optional[float]):
+    """(timeout clipped to the deadline, whether it was clipped)."""
+    full = timeout or HTTP_TIMEOUT
+    clipped = clip_timeout(full)
+    return clipped, clipped < full
+
+
+# ---- request helpers ----
+def request(method: str, url: str, timeout: Optional[float] = None, on_sent=None, **kwargs):
+    """on_sent() is called once the request is past the breaker and rate limiter (used for hedging)."""
+    upstream = upstream_for(url)
+    breaker = breakers.get(upstream or urlsplit(url).hostname or url)
+    _timeout(timeout)  # past the deadline: fail before touching the breaker
+    breaker.before()
+    finish = None
+    try:
+        if upstream:
+            finish = limits.begin(upstream, max_wait=remaining())
+            if finish is None:
+                raise DeadlineExceeded(f"deadline reached waiting for the {upstream} rate limit")
+        timeout, clipped = _timeout(timeout)  # waiting for the rate limiter used up some of it
+    except BaseException:
+        breaker.record(None)
+        if finish is not None:
+            finish()
+        raise
+    if on_sent is not None:
+        on_sent()
+    started = time.perf_counter()
+    r = error = None
+    try:
+        r = client().request(method, url, timeout=timeout, **kwargs)
+        return r
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        _observe(url, started, r.status_code if r is not None else None)
+        _finish(finish, breaker, r, error, clipped)
+
+
+def _hedge_delay(url: str, hedge: Optional[bool]) -> Optional[float]:
+    """Seconds to wait before a second copy of this GET, or None to send only one."""
+    if hedge is None:
+        hedge = upstream_for(url) in HEDGE_UPSTREAMS
+    if not hedge:
+        return None
+    with _lock:
+        m = _metrics.get(urlsplit(url).hostname or url)
+        recent = list(m["recent"]) if m else []
+    if len(recent) < HEDGE_MIN_SAMPLES:
+        return None
+    return max(HEDGE_MIN_MS, _pct(recent, 0.95)) / 1000
+
+
+def _count_hedge(url: str, won: bool):
+    with _lock:
+        m = _metrics.get(urlsplit(url).hostname or url)
+        if m is not None:
+            m["hedge_wins" if won else "hedged"] += 1
+
+
+def _hedged(url: str, delay: float, send):
+    """send(on_sent) now, and again if no answer `delay` after it went out; first success wins."""
+    global _hedge_pool
+    with _lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge")
+    sent = threading.Event()
+    futures = [_hedge_pool.submit(contextvars.copy_context().run, send, sent.set)]
+    futures[0].add_done_callback(lambda _: sent.set())
+    sent.wait()  # time spent in the rate limiter is not upstream latency
+    done, _ = wait(futures, timeout=delay)
+    if not done:
+        futures.append(_hedge_pool.submit(contextvars.copy_context().run, send, None))
+        _count_hedge(url, False)
+    pending, error = set(futures), None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for f in done:
+            if f.exception() is None:
+                if len(futures) > 1 and f is futures[1]:
+                    _count_hedge(url, True)
+                return f.result()  # a slower copy still finishes in the background
+            error = f.exception()
+    raise error
+
+
+def get(url: str, params=None, headers=None, timeout: Optional[float] = None, hedge: Optional[bool] = None):
+    """hedge: None = hedge if the upstream is in HEDGE_UPSTREAMS (only for idempotent requests)."""
+    delay = _hedge_delay(url, hedge)
+    if delay is None:
+        return request("GET", url, params=params, headers=headers, timeout=timeout)
+    return _hedged(url, delay, lambda on_sent: request("GET", url, params=params, headers=headers, timeout=timeout,
+                                                       on_sent=on_sent))
+
+
+def post(url: str, json=None, headers=None, timeout: Optional[float] = None):
+    return request("POST", url, json=json, headers=headers, timeout=timeout)
+
+
+def stream_lines(method: str, url: str, timeout: Optional[float] = None, **kwargs) -> Iterator[str]:
+    """Yield the response body line by line as it arrives (NDJSON / SSE APIs); raises on HTTP errors."""
+    started = time.perf_counter()
+    status = None
+    c = client()
+    try:
+        if type(c).__module__.startswith("httpx"):
+            with c.stream(method, url, timeout=timeout or HTTP_TIMEOUT, **kwargs) as r:
+                status = r.status_code
+                if r.status_code >= 400:
+                    r.read()
+                r.raise_for_status()
+                yield from r.iter_lines()
+        else:  # requests
+            with c.request(method, url, timeout=timeout or HTTP_TIMEOUT, stream=True, **kwargs) as r:
+                status = r.status_code
+                r.raise_for_status()
+                r.encoding = r.encoding or "utf-8"
+                yield from r.iter_lines(decode_unicode=True)
+    finally:
+        _observe(url, started, status)
+
+
+async def arequest(method: str, url: str, timeout: Optional[float] = None, on_sent=None, **kwargs):
+    upstream = upstream_for(url)
+    breaker = breakers.get(upstream or urlsplit(url).hostname or url)
+    _timeout(timeout)  # past the deadline: fail before touching the breaker
+    breaker.before()
+    finish = None
+    try:
+        if upstream:
+            finish = await limits.abegin(upstream, max_wait=remaining())
+            if finish is None:
+                raise DeadlineExceeded(f"deadline reached waiting for the {upstream} rate limit")
+        timeout, clipped = _timeout(timeout)  # waiting for the rate limiter used up some of it
+    except BaseException:
+        breaker.record(None)
+        if finish is not None:
+            finish()
+        raise
+    if on_sent is not None:
+        on_sent()
+    started = time.perf_counter()
+    r = error = None
+    try:
+        r = await async_client().request(method, url, timeout=timeout, **kwargs)
+        return r
+    except asyncio.CancelledError:
+        breaker.record(None)  # e.g. the slower copy of a hedged GET: says nothing about the upstream
+        if finish is not None:
+            finish()
+        raise
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        if r is not None or error is not None:
+            _observe(url, started, r.status_code if r is not None else None)
+            _finish(finish, breaker, r, error, clipped)
+
+
+async def _ahedged(url: str, delay: float, send):
+    sent = asyncio.Event()
+    tasks = [asyncio.ensure_future(send(sent.set))]
+    tasks[0].add_done_callback(lambda _: sent.set())
+    try:
+        await sent.wait()
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            tasks.append(asyncio.ensure_future(send(None)))
+            _count_hedge(url, False)
+        pending, error = set(tasks), None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                if t.exception() is None:
+                    if len(tasks) > 1 and t is tasks[1]:
+                        _count_hedge(url, True)
+                    return t.result()
+                error = t.exception()
+        raise error
+    finally:
+        for t in tasks:
+            if not t.done():
+                t.cancel()  # the slower copy is not needed any more
+
+
+async def aget(url: str, params=None, headers=None, timeout: Optional[float] = None, hedge: Optional[bool] = None):
+    delay = _hedge_delay(url, hedge)
+    if delay is None:
+        return await arequest("GET", url, params=params, headers=headers, timeout=timeout)
+    return await _ahedged(url, delay, lambda on_sent: arequest("GET", url, params=params, headers=headers,
+                                                               timeout=timeout, on_sent=on_sent))
+
+
+async def apost(url: str, json=None, headers=None, timeout: Optional[float] = None):
+    return await arequest("POST", url, json=json, headers=headers, timeout=timeout)
+
+
+async def aclose():
+    """Close the running loop's async client (call before the loop ends, e.g. at the end of asyncio.run)."""
+    with _lock:
+        c = _aclients.pop(asyncio.get_running_loop(), None)
+    if c is not None:
+        await c.aclose()
+
+
+def close():
+    """Close the sync client and every async client whose loop is still open."""
+    global _client
+    with _lock:
+        sync, _client = _client, None
+        clients = list(_aclients.items())
+        _aclients.clear()
+    if sync is not None:
+        sync.close()
+    for loop, c in clients:
+        if loop.is_closed():
+            continue
+        if loop.is_running():
+            loop.call_soon_threadsafe(lambda c=c, loop=loop: loop.create_task(c.aclose()))
+        else:
+            loop.run_until_complete(c.aclose())
@@ -0,0 +1,241 @@
+"""LLM backends by name, built on first use and reused for the rest of the process.
+
+The five Hello-World backends from module 1 are available:
+GEMINI, LMSTUDIO, OPENAI, OLLAMA and HUGGINGFACE. Each loader imports its SDK
+only when that provider is first asked for and returns an object with
+  name, model, generate(prompt, temperature), agenerate(...), stream(...).
+
+The provider is picked per call: an explicit name wins, then the route for
+the call's role (e.g. PLANNER_PROVIDER for planner steps, NARRATOR_PROVIDER
+for the final answer), then the default (LLM_PROVIDER / --provider). So one
+process can plan on a local model and narrate with a remote one.
+
+Async SDK clients (AsyncOpenAI, AsyncInferenceClient) keep connections that
+belong to the event loop that opened them, so they are built once per
+running loop (PerLoop) instead of once per process.
+"""
+import asyncio
+import json
+import threading
+import weakref
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from config import (GEMINI_MODEL, GOOGLE_API_KEY, HUGGINGFACE_API_KEY, HUGGINGFACE_MODEL, LMSTUDIO_BASE_URL,
+                    LMSTUDIO_MODEL, OLLAMA_BASE_URL, OLLAMA_KEEP_ALIVE, OLLAMA_MODEL, OLLAMA_TIMEOUT, OPENAI_API_KEY,
+                    OPENAI_MODEL)
+
+
+class PerLoop:
+    """One object from factory() per running event loop (dropped once that loop is closed)."""
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._objects: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self) -> Any:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            obj = self._objects.get(loop)
+            if obj is None:
+                for other in [other for other in self._objects if other.is_closed()]:
+                    del self._objects[other]
+                obj = self._objects[loop] = self._factory()
+        return obj
+
+
+def _openai_compatible(name: str, model: str, base_url: Optional[str], api_key: str) -> SimpleNamespace:
+    from openai import AsyncOpenAI, OpenAI
+    client = OpenAI(base_url=base_url, api_key=api_key)
+    aclients = PerLoop(lambda: AsyncOpenAI(base_url=base_url, api_key=api_key))
+
+    def generate(prompt: str, temperature: float) -> str:
+        resp = client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+        )
+        return resp.choices[0].message.content
+
+    async def agenerate(prompt: str, temperature: float) -> str:
+        resp = await aclients.get().chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+        )
+        return resp.choices[0].message.content
+
+    def stream(prompt: str, temperature: float) -> Iterator[str]:
+        chunks = client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            stream=True,
+        )
+        for chunk in chunks:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    return SimpleNamespace(name=name, model=model, generate=generate, agenerate=agenerate, stream=stream)
+
+
+def _load_lmstudio() -> SimpleNamespace:
+    return _openai_compatible("LMSTUDIO", LMSTUDIO_MODEL, LMSTUDIO_BASE_URL, "lm-studio")
+
+
+def _load_openai() -> SimpleNamespace:
+    if not OPENAI_API_KEY:
+        raise ValueError("OPENAI_API_KEY is not set. Put it in .env or export it.")
+    return _openai_compatible("OPENAI", OPENAI_MODEL, None, OPENAI_API_KEY)
+
+
+def _load_ollama() -> SimpleNamespace:
+    """Native Ollama HTTP API (/api/generate) over the shared keep-alive pool in http_client.
+
+    Every request carries keep_alive=OLLAMA_KEEP_ALIVE, so the model stays loaded in
+    the server between calls instead of being reloaded (as `ollama run` per prompt did).
+    Concurrent requests are served in parallel up to the server's OLLAMA_NUM_PARALLEL.
+    """
+    import http_client
+    url = OLLAMA_BASE_URL.rstrip("/") + "/api/generate"
+
+    def body(prompt: str, temperature: float, stream: bool) -> Dict[str, Any]:
+        return {"model": OLLAMA_MODEL, "prompt": prompt, "stream": stream, "keep_alive": OLLAMA_KEEP_ALIVE,
+                "options": {"temperature": temperature}}
+
+    def result(r) -> str:
+        try:
+            data = r.json()
+        except ValueError:
+            data = {"error": r.text[:200]}
+        if r.status_code >= 400 or "error" in data:
+            raise RuntimeError(f"Ollama ({OLLAMA_MODEL}): {data.get('error', r.status_code)}")
+        return data.get("response", "")
+
+    def generate(prompt: str, temperature: float) -> str:
+        return result(http_client.post(url, json=body(prompt, temperature, False), timeout=OLLAMA_TIMEOUT))
+
+    async def agenerate(prompt: str, temperature: float) -> str:
+        return result(await http_client.apost(url, json=body(prompt, temperature, False), timeout=OLLAMA_TIMEOUT))
+
+    def stream(prompt: str, temperature: float) -> Iterator[str]:
+        for line in http_client.stream_lines("POST", url, json=body(prompt, temperature, True), timeout=OLLAMA_TIMEOUT):
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if "error" in chunk:
+                raise RuntimeError(f"Ollama ({OLLAMA_MODEL}): {chunk['error']}")
+            if chunk.get("response"):
+                yield chunk["response"]
+            if chunk.get("done"):
+                break
+
+    def preload():
+        """Load the model now (a request without a prompt) so the first real call does not wait for it."""
+        http_client.post(url, json={"model": OLLAMA_MODEL, "keep_alive": OLLAMA_KEEP_ALIVE}, timeout=OLLAMA_TIMEOUT)
+
+    return SimpleNamespace(name="OLLAMA", model=OLLAMA_MODEL, generate=generate, agenerate=agenerate, stream=stream,
+                           preload=preload)
+
+
+def _load_gemini() -> SimpleNamespace:
+    import google.generativeai as genai
+    if not GOOGLE_API_KEY:
+        raise ValueError("GOOGLE_API_KEY is not set. Put it in .env or export it.")
+    genai.configure(api_key=GOOGLE_API_KEY)
+    model = genai.GenerativeModel(GEMINI_MODEL)
+
+    def generate(prompt: str, temperature: float) -> str:
+        return model.generate_content(prompt).text
+
+    async def agenerate(prompt: str, temperature: float) -> str:
+        return (await model.generate_content_async(prompt)).text
+
+    def stream(prompt: str, temperature: float) -> Iterator[str]:
+        for chunk in model.generate_content(prompt, stream=True):
+            try:
+                text = chunk.text
+            except ValueError:  # chunk without text parts (e.g. safety metadata only)
+                continue
+            if text:
+                yield text
+
+    return SimpleNamespace(name="GEMINI", model=GEMINI_MODEL, generate=generate, agenerate=agenerate, stream=stream)
+
+
+def _load_huggingface() -> SimpleNamespace:
+    from huggingface_hub import AsyncInferenceClient, InferenceClient
+    if not HUGGINGFACE_API_KEY:
+        raise ValueError("HUGGINGFACE_API_KEY is not set. Create one at https://huggingface.co/settings/tokens")
+    client = InferenceClient(model=HUGGINGFACE_MODEL, token=HUGGINGFACE_API_KEY)
+    aclients = PerLoop(lambda: AsyncInferenceClient(model=HUGGINGFACE_MODEL, token=HUGGINGFACE_API_KEY))
+    max_new_tokens = 1024  # the endpoint default is far too short for an itinerary
+
+    def generate(prompt: str, temperature: float) -> str:
+        return client.text_generation(prompt, max_new_tokens=max_new_tokens, temperature=temperature or None)
+
+    async def agenerate(prompt: str, temperature: float) -> str:
+        return await aclients.get().text_generation(prompt, max_new_tokens=max_new_tokens, temperature=temperature or None)
+
+    def stream(prompt: str, temperature: float) -> Iterator[str]:
+        yield from client.text_generation(prompt, max_new_tokens=max_new_tokens,
+                                          temperature=temperature or None, stream=True)
+
+    return SimpleNamespace(name="HUGGINGFACE", model=HUGGINGFACE_MODEL, generate=generate, agenerate=agenerate,
+                           stream=stream)
+
+
+LOADERS: Dict[str, Callable[[], SimpleNamespace]] = {
+    "GEMINI": _load_gemini,
+    "LMSTUDIO": _load_lmstudio,
+    "OPENAI": _load_openai,
+    "OLLAMA": _load_ollama,
+    "HUGGINGFACE": _load_huggingface,
+}
+PROVIDERS: List[str] = list(LOADERS)
+
+
+class ProviderRegistry:
+    def __init__(self, default: str, routes: Optional[Dict[str, str]] = None):
+        self._lock = threading.Lock()
+        self._clients: Dict[str, SimpleNamespace] = {}
+        self.default = self._check(default)
+        self.routes: Dict[str, str] = {}
+        for role, name in (routes or {}).items():
+            self.route(role, name)
+
+    @staticmethod
+    def _check(name: str) -> str:
+        name = (name or "").upper()
+        if name not in LOADERS:
+            raise ValueError(f"Unknown LLM provider {name!r}; choose one of {', '.join(PROVIDERS)}")
+        return name
+
+    def set_default(self, name: str):
+        self.default = self._check(name)
+
+    def route(self, role: str, name: Optional[str]):
+        """Send calls made for `role` to provider `name` (None or "" removes the route)."""
+        if name:
+            self.routes[role] = self._check(name)
+        else:
+            self.routes.pop(role, None)
+
+    def resolve(self, provider: Optional[str] = None, role: Optional[str] = None) -> str:
+        if provider:
+            return self._check(provider)
+        return self.routes.get(role, self.default) if role else self.default
+
+    def get(self, provider: Optional[str] = None, role: Optional[str] = None) -> SimpleNamespace:
+        name = self.resolve(provider, role)
+        client = self._clients.get(name)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(name)
+                if client is None:
+                    client = self._clients[name] = LOADERS[name]()
+        return client
+
+    def loaded(self) -> List[str]:
+        return list(self._clients)
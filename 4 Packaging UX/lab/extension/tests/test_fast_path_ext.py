@@ -0,0 +1,29 @@
+import fast_path
+
+
+def test_weather_rule():
+    plan = fast_path.match("Weather in Tokyo and London today?")
+    assert plan.rule == "weather"
+    assert plan.actions == [{"tool": "weather_batch", "args": {"cities": ["Tokyo", "London"]}}]
+
+
+def test_news_rule():
+    plan = fast_path.match("Latest news about solar power?")
+    assert plan.rule == "news" and plan.actions == [{"tool": "news", "args": {"topic": "solar power"}}]
+    assert fast_path.match("headlines on Kyoto").actions[0]["args"] == {"topic": "Kyoto"}
+
+
+def test_other_asks_go_to_the_planner():
+    assert fast_path.match("Average temperature in Tokyo and London") is None
+    assert fast_path.match("weather in Manila plus 3") is None
+    assert fast_path.match("Who is the mayor of Tokyo? weather too") is None
+    assert fast_path.match("Tell me about Paris") is None
+
+
+def test_stats(monkeypatch):
+    monkeypatch.setattr(fast_path, "_stats", fast_path._Stats())
+    fast_path.fell_back(fast_path.match("news about rain"))
+    fast_path.match("weather in Paris")
+    stats = fast_path.stats()
+    assert (stats["queries"], stats["hits"], stats["fallbacks"], stats["hit_rate"]) == (2, 2, 1, 0.5)
+    assert set(stats["by_rule"]) == {"weather", "news"}
@@ -1,74 +1,261 @@
+import datetime
 import re
-import requests
-from tenacity import retry, stop_after_attempt, wait_exponential
+import threading
+from typing import Any, Dict, Optional
+from tenacity import retry, retry_if_not_exception_type, stop_after_attempt, stop_any, wait_exponential
 
-from cache import JsonCache
-from config import CACHE_FILE, CACHE_TTL_SEC, HTTP_TIMEOUT, NEWSAPI_KEY, TRANSLATE_BASE_URL
+import forecast
+import gazetteer
+import http_client
+import resilience
+from config import CACHE_BACKEND, CACHE_FILE, CACHE_MAX_ENTRIES, CACHE_STALE_SEC, CACHE_SWEEP_SEC, CACHE_TTL_BY_NS, CACHE_TTL_SEC, FORECAST_DAYS, GAZETTEER_SNAP_KM, NEWSAPI_KEY, TRANSLATE_BASE_URL
 
-cache = JsonCache(CACHE_FILE, ttl_sec=CACHE_TTL_SEC)
+# Opened on the first tool call, so importing this module does not replay the log or start the sweeper
+_cache = None
+_cache_lock = threading.Lock()
 
-CITY_COORDS = {
-    "manila": (14.5995, 120.9842),
-    "tokyo": (35.6762, 139.6503),
-    "singapore": (1.3521, 103.8198),
-    "new york": (40.7128, -74.0060),
-    "london": (51.5074, -0.1278),
-    "sydney": (-33.8688, 151.2093),
-}
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                from cache import JsonCache
+                _cache = JsonCache(CACHE_FILE, ttl_sec=CACHE_TTL_SEC, backend=CACHE_BACKEND, max_entries=CACHE_MAX_ENTRIES,
+                                   ttl_by_ns=CACHE_TTL_BY_NS, sweep_sec=CACHE_SWEEP_SEC, stale_sec=CACHE_STALE_SEC)
+    return _cache
+
+def _out_of_time(retry_state) -> bool:
+    left = resilience.remaining()
+    return left is not None and left < 1  # not worth another backoff + attempt
+
+# All calls go through the shared pooled client (keep-alive, per-host metrics, circuit
+# breakers, deadline). Open circuits and spent deadlines fail at once instead of retrying.
+_retry = retry(stop=stop_any(stop_after_attempt(3), _out_of_time), wait=wait_exponential(min=1, max=8),
+               retry=retry_if_not_exception_type((resilience.UpstreamUnavailable, resilience.DeadlineExceeded)),
+               reraise=True)
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=8))
+@_retry
 def _http_get(url, params=None, headers=None):
-    return requests.get(url, params=params, headers=headers, timeout=HTTP_TIMEOUT)
+    return http_client.get(url, params=params, headers=headers)
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=8))
+@_retry
 def _http_post(url, json_data=None, headers=None):
-    return requests.post(url, json=json_data, headers=headers, timeout=HTTP_TIMEOUT)
-
-def tool_weather(city: str):
-    target = (city or "manila").lower().strip()
-    chosen = None
-    for name in CITY_COORDS:
-        if name in target:
-            chosen = name
-            break
-    if not chosen:
-        chosen = "manila"
-    lat, lon = CITY_COORDS[chosen]
-    cache_key = f"weather:{chosen}"
-    cached = cache.get(cache_key)
-    if cached:
-        return {"city": chosen.title(), **cached, "cached": True}
-    url = "https://api.open-meteo.com/v1/forecast"
-    params = {"latitude": lat, "longitude": lon, "hourly": "temperature_2m"}
-    r = _http_get(url, params=params)
+    return http_client.post(url, json=json_data, headers=headers)
+
+@_retry
+async def _ahttp_get(url, params=None, headers=None):
+    return await http_client.aget(url, params=params, headers=headers)
+
+@_retry
+async def _ahttp_post(url, json_data=None, headers=None):
+    return await http_client.apost(url, json=json_data, headers=headers)
+
+WEATHER_URL = "https://api.open-meteo.com/v1/forecast"
+
+def _match_city(city: str) -> Optional[gazetteer.Place]:
+    # "lat,lon" (nearest place), exact name/alias, "Name, CC", a place named in the text, then fuzzy
+    return gazetteer.resolve(city or "")
+
+def _unknown_city(city) -> Dict[str, Any]:
+    if not (city or "").strip():
+        return {"city": city, "error": "no city given"}
+    if gazetteer.parse_lat_lon(city):
+        return {"city": city, "error": f"no known place within {GAZETTEER_SNAP_KM:g} km (the nearby tool lists the closest)"}
+    return {"city": city, "error": f"unknown place '{city}': pass \"lat,lon\" or use the nearby tool"}
+
+def _weather_params(places):
+    # Open-Meteo takes comma-separated coordinate lists and answers with one
+    # location per pair, so N cities cost one request. The whole hourly series
+    # is kept (forecast.py): "now", a later trip day and daily min/max all
+    # come from the cached entry
+    return {
+        "latitude": ",".join(str(p.lat) for p in places),
+        "longitude": ",".join(str(p.lon) for p in places),
+        "hourly": "temperature_2m",
+        "timeformat": "unixtime",
+        "timezone": "auto",
+        "forecast_days": FORECAST_DAYS,
+    }
+
+def _weather_value(loc):
+    series = forecast.Forecast.from_open_meteo(loc)
+    return series.to_value() if series else None
+
+def _trip_day(day):
+    """Day offset from today (int or "2"), or a datetime.date for "YYYY-MM-DD"; None if unreadable."""
+    if isinstance(day, str) and "-" in day.strip()[1:]:
+        try:
+            return datetime.date.fromisoformat(day.strip())
+        except ValueError:
+            return None
+    try:
+        return int(day)
+    except (TypeError, ValueError):
+        return None
+
+def _weather_result(place, value, cached, day=None, days=None):
+    series = forecast.Forecast.from_value(value)
+    if series is None:
+        return {"city": place.name, "error": "no forecast for this place"}
+    out = {"city": place.name, "temp_now_c": series.now(), "today": series.day(0)}
+    if day is not None:
+        which = _trip_day(day)
+        out["day"] = series.day(which) if which is not None else None
+        if out["day"] is None:
+            out["day_error"] = f"day {day!r} is not in the {FORECAST_DAYS}-day forecast"
+    if days:
+        out["daily"] = series.daily(_trip_day(days) or 1)
+    out["source"] = "Open-Meteo hourly temperature_2m"
+    out["cached"] = cached
+    return out
+
+def _weather_plan(cities):
+    """Resolve city names and split them into cached (fresh or stale) and to-fetch.
+
+    order keeps the input order: a Place per distinct city (repeats collapse
+    into the first) and an error dict where a name did not resolve.
+    """
+    if isinstance(cities, str):
+        cities = gazetteer.split_names(cities)
+    order, places = [], {}
+    for city in cities or [None]:
+        place = _match_city(city)
+        if place is None:
+            order.append(_unknown_city(city))
+        elif place not in places:
+            places[place] = None
+            order.append(place)
+    places = list(places)
+    values, missing, stale = {}, [], []
+    for place in places:
+        hit = get_cache().lookup(f"weather:{place.key}")
+        if hit is None or forecast.Forecast.from_value(hit[0]) is None:  # also entries from before the series
+            missing.append(place)
+            continue
+        values[place] = hit[0]
+        if not hit[1]:
+            stale.append(place)
+    return order, values, missing, stale
+
+def _flight_key(places):
+    # same key as the cache entry for one city, so identical fetches coalesce
+    return "weather:" + ";".join(sorted(p.key for p in places))
+
+def _weather_store(places, data):
+    locations = data if isinstance(data, list) else [data]
+    values = {}
+    for place, loc in zip(places, locations):
+        values[place] = _weather_value(loc)
+        if values[place] is not None:
+            get_cache().set(f"weather:{place.key}", values[place])
+    return values
+
+def _fetch_weather(places):
+    r = _http_get(WEATHER_URL, params=_weather_params(places))
+    r.raise_for_status()
+    return _weather_store(places, r.json())
+
+async def _afetch_weather(places):
+    r = await _ahttp_get(WEATHER_URL, params=_weather_params(places))
+    r.raise_for_status()
+    return _weather_store(places, r.json())
+
+def _weather_results(order, values, fetched, shared, day, days):
+    results = []
+    for entry in order:
+        if isinstance(entry, dict):
+            results.append(entry)
+        elif entry in values:
+            results.append(_weather_result(entry, values[entry], True, day, days))
+        else:
+            results.append(_weather_result(entry, fetched.get(entry), shared, day, days))
+    return {"results": results}
+
+def tool_weather_batch(cities, day=None, days=None):
+    """Now and today's min/max per city; `day` (0 = today, or "YYYY-MM-DD") or `days` (the next N) for a trip."""
+    order, values, missing, stale = _weather_plan(cities)
+    if stale:  # served as-is, refreshed by one background fetch
+        get_cache().revalidate(_flight_key(stale), lambda: _fetch_weather(stale))
+    fetched, shared = {}, False
+    if missing:  # concurrent callers for the same cities share one request
+        fetched, shared = get_cache().shared_load(_flight_key(missing), lambda: _fetch_weather(missing))
+    return _weather_results(order, values, fetched, shared, day, days)
+
+async def atool_weather_batch(cities, day=None, days=None):
+    order, values, missing, stale = _weather_plan(cities)
+    if stale:
+        get_cache().arevalidate(_flight_key(stale), lambda: _afetch_weather(stale))
+    fetched, shared = {}, False
+    if missing:
+        fetched, shared = await get_cache().ashared_load(_flight_key(missing), lambda: _afetch_weather(missing))
+    return _weather_results(order, values, fetched, shared, day, days)
+
+def tool_weather(city: str, day=None, days=None):
+    return tool_weather_batch([city], day=day, days=days)["results"][0]
+
+async def atool_weather(city: str, day=None, days=None):
+    return (await atool_weather_batch([city], day=day, days=days))["results"][0]
+
+def _wiki_url(title: str) -> str:
+    return f"https://en.wikipedia.org/api/rest_v1/page/summary/{title}"
+
+def _wiki_value(r):
+    if r.status_code in (400, 404):
+        return None  # not cached
     r.raise_for_status()
-    data = r.json()
-    temps = data.get("hourly", {}).get("temperature_2m", [])
-    now_c = temps[0] if temps else None
-    value = {"temp_now_c": now_c, "source": "Open-Meteo hourly temperature_2m"}
-    cache.set(cache_key, value)
-    return {"city": chosen.title(), **value, "cached": False}
+    return {"summary": r.json().get("extract")}
+
+def _wiki_result(topic: str, value, cached: bool):
+    if value is None:
+        return {"topic": topic, "summary": None, "error": "not found"}
+    return {"topic": topic, **value, "cached": cached}
 
 def tool_wikipedia(topic: str):
     topic = (topic or "").strip()
     if not topic:
         return {"topic": topic, "summary": None, "error": "empty topic"}
     title = topic.replace(" ", "_")
-    cache_key = f"wiki:{title.lower()}"
-    cached = cache.get(cache_key)
-    if cached:
-        return {"topic": topic, **cached, "cached": True}
-    url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{title}"
-    r = _http_get(url, headers={"Accept": "application/json"})
-    if r.status_code in (400, 404):
-        return {"topic": topic, "summary": None, "error": "not found"}
-    r.raise_for_status()
-    data = r.json()
-    value = {"summary": data.get("extract")}
-    cache.set(cache_key, value)
-    return {"topic": topic, **value, "cached": False}
+    value, cached = get_cache().get_or_load(
+        f"wiki:{title.lower()}",
+        lambda: _wiki_value(_http_get(_wiki_url(title), headers={"Accept": "application/json"})))
+    return _wiki_result(topic, value, cached)
+
+async def atool_wikipedia(topic: str):
+    topic = (topic or "").strip()
+    if not topic:
+        return {"topic": topic, "summary": None, "error": "empty topic"}
+    title = topic.replace(" ", "_")
+
+    async def load():
+        return _wiki_value(await _ahttp_get(_wiki_url(title), headers={"Accept": "application/json"}))
+
+    value, cached = await get_cache().aget_or_load(f"wiki:{title.lower()}", load)
+    return _wiki_result(topic, value, cached)
 
 _ARITH_PATTERN = re.compile(r'^[0-9\.\s\+\-\*\/\(\)]+$')
+def tool_nearby(city: str = None, lat: float = None, lon: float = None, radius_km: float = 50, limit: int = 10):
+    """Known places within radius_km of a place or coordinates (or, if none, the closest few)."""
+    if lat is None or lon is None:
+        point = gazetteer.parse_lat_lon(city or "")
+        if point is None:
+            place = gazetteer.resolve(city or "")
+            if place is None:
+                return {"center": city, "error": "unknown place: pass lat and lon"}
+            point = (place.lat, place.lon)
+        lat, lon = point
+    try:
+        lat, lon, radius_km, limit = float(lat), float(lon), float(radius_km), max(1, min(int(limit), 50))
+    except (TypeError, ValueError):
+        return {"center": city, "error": "lat, lon and radius_km must be numbers"}
+    gaz = gazetteer.get()
+    hits = gaz.within(lat, lon, radius_km, limit=limit)
+    out = {"center": {"lat": lat, "lon": lon}, "radius_km": radius_km}
+    if not hits:
+        hits = gaz.nearest(lat, lon, k=min(limit, 3))
+        out["note"] = f"nothing within {radius_km:g} km; closest places instead"
+    out["places"] = [{"name": p.name, "country": p.country, "km": km, "lat": p.lat, "lon": p.lon} for p, km in hits]
+    return out
+
 def tool_calculator(expression: str):
     expr = (expression or "").strip()
     if not expr or not _ARITH_PATTERN.match(expr):
@@ -81,35 +268,65 @@ def tool_calculator(expression: str):
     except Exception as e:
         return {"expression": expression, "error": str(e)}
 
-def tool_news(topic: str, page_size: int = 3):
-    if not NEWSAPI_KEY:
-        return {"topic": topic, "error": "NEWSAPI_KEY not set (get one at https://newsapi.org/)"} 
-    url = "https://newsapi.org/v2/everything"
-    params = {"q": topic or "technology", "pageSize": page_size, "apiKey": NEWSAPI_KEY, "language": "en", "sortBy": "relevancy"}
-    r = _http_get(url, params=params)
-    r.raise_for_status()
-    data = r.json()
+NEWS_URL = "https://newsapi.org/v2/everything"
+
+def _news_params(topic: str, page_size: int):
+    return {"q": topic or "technology", "pageSize": page_size, "apiKey": NEWSAPI_KEY, "language": "en", "sortBy": "relevancy"}
+
+def _news_result(topic: str, data):
     headlines = [a.get("title") for a in data.get("articles", []) if a.get("title")]
     if not headlines:
         return {"topic": topic, "headlines": [], "note": "no headlines found"}
     return {"topic": topic, "headlines": headlines, "source": "NewsAPI"}
 
-def tool_translate(text: str, target_lang: str):
-    base = TRANSLATE_BASE_URL.rstrip("/")
-    url = f"{base}/translate"
+def tool_news(topic: str, page_size: int = 3):
+    if not NEWSAPI_KEY:
+        return {"topic": topic, "error": "NEWSAPI_KEY not set (get one at https://newsapi.org/)"} 
+    r = _http_get(NEWS_URL, params=_news_params(topic, page_size))
+    r.raise_for_status()
+    return _news_result(topic, r.json())
+
+async def atool_news(topic: str, page_size: int = 3):
+    if not NEWSAPI_KEY:
+        return {"topic": topic, "error": "NEWSAPI_KEY not set (get one at https://newsapi.org/)"}
+    r = await _ahttp_get(NEWS_URL, params=_news_params(topic, page_size))
+    r.raise_for_status()
+    return _news_result(topic, r.json())
+
+def _translate_payload(text: str, target_lang: str):
     # LibreTranslate expects: q, source, target, format
     # We'll let server auto-detect source by passing 'auto'
-    payload = {"q": text or "", "source": "auto", "target": (target_lang or "en"), "format": "text"}
-    r = _http_post(url, json_data=payload, headers={"Accept": "application/json"})
+    return {"q": text or "", "source": "auto", "target": (target_lang or "en"), "format": "text"}
+
+def tool_translate(text: str, target_lang: str):
+    url = f"{TRANSLATE_BASE_URL.rstrip('/')}/translate"
+    r = _http_post(url, json_data=_translate_payload(text, target_lang), headers={"Accept": "application/json"})
+    r.raise_for_status()
+    translated = r.json().get("translatedText")
+    return {"text": text, "target_lang": target_lang, "translated": translated, "source": "LibreTranslate-compatible"}
+
+async def atool_translate(text: str, target_lang: str):
+    url = f"{TRANSLATE_BASE_URL.rstrip('/')}/translate"
+    r = await _ahttp_post(url, json_data=_translate_payload(text, target_lang), headers={"Accept": "application/json"})
     r.raise_for_status()
-    data = r.json()
-    translated = data.get("translatedText")
+    translated = r.json().get("translatedText")
     return {"text": text, "target_lang": target_lang, "translated": translated, "source": "LibreTranslate-compatible"}
 
 TOOL_REGISTRY = {
-    "weather": {"fn": tool_weather, "args": {"city": "str"}},
+    "weather": {"fn": tool_weather, "args": {"city": "str", "day": "int|str", "days": "int"}},
+    "weather_batch": {"fn": tool_weather_batch, "args": {"cities": "list[str]", "day": "int|str", "days": "int"}},
     "wikipedia": {"fn": tool_wikipedia, "args": {"topic": "str"}},
     "calculator": {"fn": tool_calculator, "args": {"expression": "str"}},
+    "nearby": {"fn": tool_nearby, "args": {"city": "str", "lat": "float", "lon": "float", "radius_km": "float"}},
     "news": {"fn": tool_news, "args": {"topic": "str"}},
     "translate": {"fn": tool_translate, "args": {"text": "str", "target_lang": "str"}},
 }
+
+# Coroutine versions of the network tools; calculator and nearby are reused as-is
+ASYNC_TOOLS = {
+    "weather": atool_weather,
+    "weather_batch": atool_weather_batch,
+    "wikipedia": atool_wikipedia,
+    "news": atool_news,
+    "translate": atool_translate,
+}
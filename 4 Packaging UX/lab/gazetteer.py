@@ -0,0 +1,560 @@
+"""Local gazetteer: place names -> coordinates for every tool, worldwide.
+
+    python gazetteer.py build cities15000.zip       # compile a GeoNames dump into GAZETTEER_INDEX
+    python gazetteer.py lookup "sao paulo" paris,us  # resolve names (with timings)
+    python gazetteer.py near 48.85 2.35 [radius_km]  # nearest places / places within a radius
+
+The source is a GeoNames "geoname" table (cities500/1000/5000/15000 or
+allCountries, .txt or .zip, from https://download.geonames.org/export/dump/)
+named by GAZETTEER_FILE. Only populated places (feature class P) are kept.
+Without a dump, the built-in SEED list of the workshop cities is used, so the
+tools behave as before.
+
+The compiled index is one flat file that is memory-mapped, not parsed, so
+loading it is instant and several processes share the pages:
+- places: lat/lon (float32), population, country code and display name,
+  in arrays indexed by place id
+- keys: every normalized name and alias in one sorted blob (with offsets and
+  the place each names). Exact and alias lookups are a binary search over it,
+  prefix lookups a range scan
+- trigrams: for every 3-byte gram of the main names, the places containing
+  it. Fuzzy lookup takes the places sharing the query's rarest grams and
+  ranks them by trigram similarity (Dice)
+- spatial: an implicit KD-tree over the places as points on the unit sphere
+  (x, y, z), so there is no seam at the date line or the poles. The tree is
+  just the places in tree order: each range [lo, hi) splits at its middle
+  element on axis depth % 3. nearest() and within() walk it in O(log n)
+  (straight-line distance on the sphere orders places like great-circle km)
+
+Names are normalized (accents stripped, lower case, punctuation -> space), so
+"São Paulo", "sao-paulo" and "SAO PAULO" are one key. Places with the same key
+are ordered by population: "paris" is Paris, FR; "Paris, US" or "paris us"
+picks by country code. "14.6,121.0" (lat,lon) resolves to the nearest place
+within GAZETTEER_SNAP_KM; an unknown name resolves to None, not a guess.
+"""
+import bisect
+import collections
+import heapq
+import io
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import unicodedata
+import zipfile
+from array import array
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from config import GAZETTEER_FILE, GAZETTEER_INDEX, GAZETTEER_SNAP_KM
+
+MAGIC = b"GAZ1"
+VERSION = 2
+EARTH_RADIUS_KM = 6371.0
+FUZZY_MIN_SCORE = 0.4
+_FUZZY_GRAMS = 6        # rarest query grams used to collect candidates
+_FUZZY_POSTINGS = 3000  # ... while their place lists add up to at most this many
+_FUZZY_SHORTLIST = 24   # candidates scored in full
+_PREFIX_SCAN = 5000     # keys ranked for one prefix query
+_FUZZY_MAX_GROWTH = 4 / 3  # resolve(): a fuzzy match may be at most this much longer than the query
+_KD_LEAF = 8            # KD-tree ranges this small are scanned, not split
+
+# (name, aliases, lat, lon, country code, population): the cities the tools knew before the gazetteer
+SEED = [
+    ("Manila", ["Metro Manila", "Maynila"], 14.5995, 120.9842, "PH", 1_780_000),
+    ("Cebu City", ["Cebu"], 10.3157, 123.8854, "PH", 960_000),
+    ("Baguio", ["Baguio City"], 16.4023, 120.5960, "PH", 370_000),
+    ("Tokyo", ["Tokyo-to", "Tōkyō"], 35.6762, 139.6503, "JP", 8_340_000),
+    ("Kyoto", ["Kyōto"], 35.0116, 135.7681, "JP", 1_460_000),
+    ("Osaka", ["Ōsaka"], 34.6937, 135.5023, "JP", 2_590_000),
+    ("Singapore", ["Singapura"], 1.3521, 103.8198, "SG", 5_640_000),
+    ("London", ["City of London"], 51.5074, -0.1278, "GB", 8_960_000),
+    ("Paris", [], 48.8566, 2.3522, "FR", 2_140_000),
+    ("New York", ["New York City", "NYC"], 40.7128, -74.0060, "US", 8_800_000),
+    ("Sydney", [], -33.8688, 151.2093, "AU", 5_310_000),
+]
+
+# Everyday words that are also place names somewhere; see mentions()
+STOPWORDS = frozenset("""a an and as at be best budget by day days do for from go how in is it me most my nice
+no of on or plan so the this to tour trip us visit we weather weekend what when who why""".split())
+
+_NON_WORD = re.compile(r"[\W_]+")
+_LAT_LON = re.compile(r"^\s*(-?\d{1,2}(?:\.\d+)?)\s*[,; ]\s*(-?\d{1,3}(?:\.\d+)?)\s*$")
+_COUNTRY_SUFFIX = re.compile(r",\s*[A-Za-z]{2}\s*$")
+# A comma between names, except the one before a country code: "Kyoto, JP, Paris" is two places
+_NAME_SEP = re.compile(r",(?!\s*[A-Za-z]{2}\s*(?:,|$))")
+
+
+class Place(NamedTuple):
+    id: int
+    name: str
+    lat: float
+    lon: float
+    country: str
+    population: int
+
+    @property
+    def key(self) -> str:
+        """Stable id for caches: normalized name + country, e.g. "new york,us"."""
+        return f"{normalize(self.name)},{self.country.lower()}"
+
+
+def normalize(name: str) -> str:
+    text = unicodedata.normalize("NFKD", name or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return " ".join(filter(None, _NON_WORD.split(text)))
+
+
+def _grams(key: bytes) -> set:
+    padded = b" " + key + b" "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _code(gram: bytes) -> int:
+    return int.from_bytes(gram.ljust(3), "big")
+
+
+def _xyz(lat: float, lon: float) -> Tuple[float, float, float]:
+    la, lo = math.radians(lat), math.radians(lon)
+    return math.cos(la) * math.cos(lo), math.cos(la) * math.sin(lo), math.sin(la)
+
+
+def _chord2(km: float) -> float:
+    """Squared straight-line distance on the unit sphere for a great-circle distance."""
+    return (2 * math.sin(min(km / EARTH_RADIUS_KM, math.pi) / 2)) ** 2
+
+
+def _km(chord2: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(chord2) / 2))
+
+
+def parse_lat_lon(text: str) -> Optional[Tuple[float, float]]:
+    """(lat, lon) from "14.6,121.0" / "14.6 121.0", or None."""
+    m = _LAT_LON.match(text or "")
+    if not m:
+        return None
+    lat, lon = float(m.group(1)), float(m.group(2))
+    return (lat, lon) if -90 <= lat <= 90 and -180 <= lon <= 180 else None
+
+
+def split_names(text: str) -> List[str]:
+    """Place names in a comma-separated string ("Tokyo, Kyoto, JP" -> ["Tokyo", "Kyoto, JP"]);
+    a single "lat,lon" stays whole."""
+    if parse_lat_lon(text):
+        return [text]
+    return [name.strip() for name in _NAME_SEP.split(text or "")]
+
+
+def _kd_order(points: List[Tuple[float, float, float]]) -> List[int]:
+    """Place ids in implicit KD-tree order (see the module docstring)."""
+    order = list(range(len(points)))
+    stack = [(0, len(order), 0)]
+    while stack:
+        lo, hi, depth = stack.pop()
+        if hi - lo <= _KD_LEAF:
+            continue
+        axis = depth % 3
+        order[lo:hi] = sorted(order[lo:hi], key=lambda pid: points[pid][axis])
+        mid = (lo + hi) // 2
+        stack.append((lo, mid, depth + 1))
+        stack.append((mid + 1, hi, depth + 1))
+    return order
+
+
+# ---- building ----
+Row = Tuple[str, Sequence[str], float, float, str, int]
+
+
+def read_geonames(path: str) -> Iterator[Row]:
+    """Populated places from a GeoNames geoname table (.txt, or the .zip it is published in)."""
+    if path.endswith(".zip"):
+        with zipfile.ZipFile(path) as z:
+            member = next(n for n in z.namelist() if n.endswith(".txt") and not n.startswith("readme"))
+            with z.open(member) as raw:
+                yield from _geoname_rows(io.TextIOWrapper(raw, encoding="utf-8"))
+    else:
+        with open(path, encoding="utf-8") as f:
+            yield from _geoname_rows(f)
+
+
+def _geoname_rows(lines: Iterable[str]) -> Iterator[Row]:
+    for line in lines:
+        cols = line.rstrip("\n").split("\t")
+        if len(cols) < 15 or cols[6] != "P":
+            continue
+        aliases = [cols[2]] + [a for a in cols[3].split(",") if a and len(a) <= 64]
+        yield cols[1], aliases, float(cols[4]), float(cols[5]), cols[8], int(cols[14] or 0)
+
+
+def _pack(sections: List[Tuple[str, str, bytes]], meta: Dict) -> bytes:
+    header = {"version": VERSION, "byteorder": sys.byteorder, "sections": {}, **meta}
+    body = bytearray()
+    for name, typecode, data in sections:
+        body += b"\0" * (-len(body) % 8)
+        header["sections"][name] = [typecode, len(body), len(data)]
+        body += data
+    head = json.dumps(header).encode()
+    head += b" " * (-(len(head) + 8) % 8)  # body starts 8-byte aligned
+    return MAGIC + struct.pack("<I", len(head)) + head + bytes(body)
+
+
+def build(rows: Iterable[Row]) -> bytes:
+    """Compile places into the index format (see the module docstring)."""
+    lat, lon, pop = array("f"), array("f"), array("I")
+    cc, names, name_off = bytearray(), bytearray(), array("I", [0])
+    keys: List[Tuple[bytes, int, int]] = []  # (key, -population, place id)
+    mains: List[bytes] = []
+    points: List[Tuple[float, float, float]] = []
+    postings: Dict[int, List[int]] = {}
+    for pid, (name, aliases, la, lo, country, population) in enumerate(rows):
+        lat.append(la)
+        lon.append(lo)
+        points.append(_xyz(la, lo))
+        pop.append(min(max(int(population), 0), 2 ** 32 - 1))
+        cc += (country or "").upper().encode("ascii", "replace")[:2].ljust(2)
+        names += name.encode("utf-8")
+        name_off.append(len(names))
+        main = normalize(name).encode("utf-8")
+        mains.append(main)
+        for key in {main} | {normalize(a).encode("utf-8") for a in aliases}:
+            if key:
+                keys.append((key, -population, pid))
+        for g in _grams(main):
+            postings.setdefault(_code(g), []).append(pid)
+    keys.sort()
+
+    key_blob, key_off, key_place = bytearray(), array("I", [0]), array("I")
+    main_key = array("I", [0] * len(mains))  # place -> index of its main name in the key table
+    for i, (key, _, pid) in enumerate(keys):
+        key_blob += key
+        key_off.append(len(key_blob))
+        key_place.append(pid)
+        if key == mains[pid]:
+            main_key[pid] = i
+    codes = array("I", sorted(postings))
+    gram_off, gram_places = array("I", [0]), array("I")
+    for g in codes:
+        gram_places.extend(postings[g])
+        gram_off.append(len(gram_places))
+    kd_place = array("I", _kd_order(points))
+    kd = [array("f", (points[pid][axis] for pid in kd_place)) for axis in range(3)]
+
+    return _pack([
+        ("lat", "f", lat.tobytes()), ("lon", "f", lon.tobytes()), ("pop", "I", pop.tobytes()),
+        ("cc", "blob", bytes(cc)), ("name_off", "I", name_off.tobytes()), ("names", "blob", bytes(names)),
+        ("key_off", "I", key_off.tobytes()), ("keys", "blob", bytes(key_blob)), ("key_place", "I", key_place.tobytes()),
+        ("main_key", "I", main_key.tobytes()),
+        ("gram_codes", "I", codes.tobytes()), ("gram_off", "I", gram_off.tobytes()),
+        ("gram_places", "I", gram_places.tobytes()),
+        ("kd_place", "I", kd_place.tobytes()),
+        ("kd_x", "f", kd[0].tobytes()), ("kd_y", "f", kd[1].tobytes()), ("kd_z", "f", kd[2].tobytes()),
+    ], {"places": len(lat), "keys": len(key_place)})
+
+
+# ---- lookups ----
+class Gazetteer:
+    def __init__(self, buf):
+        """buf: bytes or a read-only mmap holding an index made by build()."""
+        if buf[:4] != MAGIC:
+            raise ValueError("not a gazetteer index")
+        head_len = struct.unpack("<I", buf[4:8])[0]
+        header = json.loads(bytes(buf[8:8 + head_len]))
+        if header.get("version") != VERSION or header.get("byteorder") != sys.byteorder:
+            raise ValueError("gazetteer index from another version or platform; rebuild it")
+        self._buf = buf
+        base = 8 + head_len
+        view = memoryview(buf)
+        self._blob: Dict[str, int] = {}
+        arrays = {}
+        for name, (typecode, offset, length) in header["sections"].items():
+            start = base + offset
+            if typecode == "blob":
+                self._blob[name] = start
+            else:
+                arrays[name] = view[start:start + length].cast(typecode)
+        self._lat, self._lon, self._pop = arrays["lat"], arrays["lon"], arrays["pop"]
+        self._name_off, self._key_off, self._key_place = arrays["name_off"], arrays["key_off"], arrays["key_place"]
+        self._main_key = arrays["main_key"]
+        self._codes, self._gram_off = arrays["gram_codes"], arrays["gram_off"]
+        self._gram_places = arrays["gram_places"]
+        self._kd_place, self._kd_xyz = arrays["kd_place"], (arrays["kd_x"], arrays["kd_y"], arrays["kd_z"])
+        self.places = header["places"]
+        self.keys = header["keys"]
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Row]) -> "Gazetteer":
+        return cls(build(rows))
+
+    @classmethod
+    def open(cls, path: str) -> "Gazetteer":
+        """Memory-map an index file; pages are read on first touch and shared between processes."""
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    # -- raw access --
+    def place(self, pid: int) -> Place:
+        names, cc = self._blob["names"], self._blob["cc"] + 2 * pid
+        name = self._buf[names + self._name_off[pid]:names + self._name_off[pid + 1]].decode("utf-8")
+        return Place(pid, name, round(self._lat[pid], 4), round(self._lon[pid], 4),
+                     self._buf[cc:cc + 2].decode("ascii").strip(), self._pop[pid])
+
+    def _key(self, i: int) -> bytes:
+        base = self._blob["keys"]
+        return self._buf[base + self._key_off[i]:base + self._key_off[i + 1]]
+
+    def _lower_bound(self, key: bytes, lo: int = 0) -> int:
+        hi = self.keys
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _exact_ids(self, key: str) -> List[int]:
+        k = key.encode("utf-8")
+        i, out = self._lower_bound(k), []
+        while i < self.keys and self._key(i) == k:
+            out.append(self._key_place[i])
+            i += 1
+        return out  # most populous first
+
+    # -- queries --
+    def exact(self, name: str, country: Optional[str] = None) -> List[Place]:
+        """Places whose name or alias normalizes to `name`, most populous first."""
+        places = [self.place(pid) for pid in self._exact_ids(normalize(name))]
+        return [p for p in places if p.country == country.upper()] if country else places
+
+    def prefix(self, text: str, limit: int = 10) -> List[Place]:
+        """Most populous places with a name or alias starting with `text` (autocomplete)."""
+        k = normalize(text).encode("utf-8")
+        if not k:
+            return []
+        lo = self._lower_bound(k)
+        hi = self._lower_bound(k + b"\xff", lo)  # 0xff never occurs in UTF-8: the end of the range
+        ranked = heapq.nlargest(limit * 4, self._key_place[lo:min(hi, lo + _PREFIX_SCAN)], key=self._pop.__getitem__)
+        return [self.place(pid) for pid in list(dict.fromkeys(ranked))[:limit]]
+
+    def fuzzy(self, text: str, limit: int = 5, min_score: float = FUZZY_MIN_SCORE) -> List[Tuple[Place, float]]:
+        """Places whose main name is most similar to `text` (trigram Dice score >= min_score)."""
+        k = normalize(text).encode("utf-8")
+        grams = _grams(k) if k else set()
+        found = []
+        for g in grams:
+            code = _code(g)
+            j = bisect.bisect_left(self._codes, code)
+            if j < len(self._codes) and self._codes[j] == code:
+                found.append((self._gram_off[j + 1] - self._gram_off[j], j))
+        counts: collections.Counter = collections.Counter()
+        total = 0
+        for size, j in sorted(found)[:_FUZZY_GRAMS]:
+            total += size
+            if counts and total > _FUZZY_POSTINGS:
+                break
+            counts.update(self._gram_places[self._gram_off[j]:self._gram_off[j + 1]])
+        if not counts:
+            return []
+        best = max(counts.values())
+        shortlist = [pid for pid, n in counts.items() if n >= best - 1]
+        if len(shortlist) > _FUZZY_SHORTLIST:
+            shortlist = heapq.nlargest(_FUZZY_SHORTLIST, shortlist, key=counts.__getitem__)
+        scored = []
+        for pid in shortlist:
+            other = _grams(self._key(self._main_key[pid]))
+            score = 2 * len(grams & other) / (len(grams) + len(other))
+            if score >= min_score:
+                scored.append((round(score, 3), self._pop[pid], pid))
+        scored.sort(reverse=True)
+        return [(self.place(pid), score) for score, _, pid in scored[:limit]]
+
+    def mentions(self, text: str, min_population: int = 0, limit: int = 10) -> List[Place]:
+        """Places named in free text ("3 days in Kyoto and New York"), in order, longest names first.
+        A single word in STOPWORDS only counts capitalized mid-sentence ("fly to Nice"), and a
+        word of 1-3 letters only capitalized ("Ulm")."""
+        words = re.findall(r"[^\W_]+", text or "")
+        tokens = [normalize(w) for w in words]
+        found: List[Place] = []
+        i = 0
+        while i < len(tokens) and len(found) < limit:
+            for n in (3, 2, 1):
+                if i + n > len(tokens):
+                    continue
+                if n == 1:
+                    upper = words[i][:1].isupper()
+                    if (tokens[i] in STOPWORDS and not (upper and i > 0)) or (len(tokens[i]) < 4 and not upper):
+                        continue
+                ids = self._exact_ids(" ".join(tokens[i:i + n]))
+                if ids and self._pop[ids[0]] >= min_population:
+                    if all(p.id != ids[0] for p in found):
+                        found.append(self.place(ids[0]))
+                    i += n
+                    break
+            else:
+                i += 1
+        return found
+
+    def _kd_search(self, lat: float, lon: float, k: Optional[int], max_km: Optional[float],
+                   min_population: int) -> List[Tuple[int, float]]:
+        """(place id, squared chord) of the k nearest places (k=None: all) within max_km, nearest first."""
+        q = _xyz(lat, lon)
+        xs, ys, zs = self._kd_xyz
+        place, pop = self._kd_place, self._pop
+        limit = _chord2(max_km) if max_km is not None else 4.0  # 4 = antipode
+        found: List[Tuple[float, int]] = []  # k mode: max-heap as (-d2, i); radius mode: (d2, i)
+        worst = limit
+
+        def consider(i: int):
+            nonlocal worst
+            d2 = (xs[i] - q[0]) ** 2 + (ys[i] - q[1]) ** 2 + (zs[i] - q[2]) ** 2
+            if d2 > worst or pop[place[i]] < min_population:
+                return
+            if k is None:
+                found.append((d2, i))
+            elif len(found) < k:
+                heapq.heappush(found, (-d2, i))
+                if len(found) == k:
+                    worst = -found[0][0]
+            else:
+                heapq.heapreplace(found, (-d2, i))
+                worst = -found[0][0]
+
+        stack = [(0, self.places, 0, 0.0)]  # range, depth, lower bound on its squared distance
+        while stack:
+            lo, hi, depth, gap2 = stack.pop()
+            if gap2 > worst:
+                continue
+            if hi - lo <= _KD_LEAF:
+                for i in range(lo, hi):
+                    consider(i)
+                continue
+            mid = (lo + hi) // 2
+            consider(mid)
+            diff = q[depth % 3] - self._kd_xyz[depth % 3][mid]
+            near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+            stack.append((far[0], far[1], depth + 1, max(gap2, diff * diff)))
+            stack.append((near[0], near[1], depth + 1, gap2))
+        pairs = [(abs(d2), i) for d2, i in found]
+        pairs.sort()
+        return [(place[i], d2) for d2, i in pairs]
+
+    def nearest(self, lat: float, lon: float, k: int = 1, max_km: Optional[float] = None,
+                min_population: int = 0) -> List[Tuple[Place, float]]:
+        """The k places closest to (lat, lon), as (place, km), nearest first."""
+        return [(self.place(pid), round(_km(d2), 1))
+                for pid, d2 in self._kd_search(lat, lon, max(1, k), max_km, min_population)]
+
+    def within(self, lat: float, lon: float, radius_km: float, limit: int = 50,
+               min_population: int = 0) -> List[Tuple[Place, float]]:
+        """Places within radius_km of (lat, lon), as (place, km), nearest first."""
+        hits = self._kd_search(lat, lon, None, radius_km, min_population)
+        return [(self.place(pid), round(_km(d2), 1)) for pid, d2 in hits[:limit]]
+
+    def resolve(self, text: str) -> Optional[Place]:
+        """Best single place for a name from a user or an LLM: "lat,lon" (the nearest place
+        within GAZETTEER_SNAP_KM), exact name or alias, "name, CC" / "name CC", the first
+        place named in the text, then fuzzy (typos only, not partial names). None when nothing
+        matches, also for a name qualified with a country code it is not in."""
+        point = parse_lat_lon(text)
+        if point:
+            hit = self.nearest(point[0], point[1], max_km=GAZETTEER_SNAP_KM)
+            return hit[0][0] if hit else None
+        key = normalize(text)
+        if not key:
+            return None
+        ids = self._exact_ids(key)
+        if ids:
+            return self.place(ids[0])
+        head, _, tail = key.rpartition(" ")
+        if head and len(tail) == 2:
+            hits = self.exact(head, country=tail)
+            if hits:
+                return hits[0]
+            if _COUNTRY_SUFFIX.search(text) or self._exact_ids(head):
+                return None  # qualified with a country it is not in: not some other country's place
+        named = self.mentions(text, limit=1)
+        if named:
+            return named[0]
+        # a typo, not part of a longer name ("York" is not New York)
+        for place, _ in self.fuzzy(text, limit=1):
+            other = normalize(place.name)
+            if key not in other and len(other) <= _FUZZY_MAX_GROWTH * len(key):
+                return place
+        return None
+
+    def coords(self, text: str) -> Optional[Tuple[float, float]]:
+        place = self.resolve(text)
+        return (place.lat, place.lon) if place else None
+
+
+# ---- the process-wide gazetteer ----
+_default: Optional[Gazetteer] = None
+_default_lock = threading.Lock()
+
+
+def compile_file(source: str, index: str) -> Gazetteer:
+    """Build `index` from the dump at `source` (atomic replace) and open it."""
+    data = build(read_geonames(source))
+    tmp = f"{index}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, index)
+    return Gazetteer.open(index)
+
+
+def get() -> Gazetteer:
+    """The shared gazetteer: GAZETTEER_INDEX (rebuilt when GAZETTEER_FILE is newer), else SEED."""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                if GAZETTEER_FILE and os.path.exists(GAZETTEER_FILE):
+                    fresh = (os.path.exists(GAZETTEER_INDEX)
+                             and os.path.getmtime(GAZETTEER_INDEX) >= os.path.getmtime(GAZETTEER_FILE))
+                    try:
+                        _default = Gazetteer.open(GAZETTEER_INDEX) if fresh else None
+                    except ValueError:
+                        _default = None
+                    if _default is None:
+                        _default = compile_file(GAZETTEER_FILE, GAZETTEER_INDEX)
+                elif os.path.exists(GAZETTEER_INDEX):
+                    _default = Gazetteer.open(GAZETTEER_INDEX)
+                else:
+                    _default = Gazetteer.from_rows(SEED)
+    return _default
+
+
+def resolve(text: str) -> Optional[Place]:
+    return get().resolve(text)
+
+
+def main(argv: List[str]):
+    import time
+    if len(argv) >= 2 and argv[0] == "build":
+        started = time.perf_counter()
+        gaz = compile_file(argv[1], argv[2] if len(argv) > 2 else GAZETTEER_INDEX)
+        print(f"{gaz.places} places, {gaz.keys} names in {time.perf_counter() - started:.1f}s "
+              f"-> {argv[2] if len(argv) > 2 else GAZETTEER_INDEX}")
+    elif len(argv) >= 3 and argv[0] == "near":
+        gaz, lat, lon = get(), float(argv[1]), float(argv[2])
+        started = time.perf_counter()
+        hits = gaz.within(lat, lon, float(argv[3]), limit=20) if len(argv) > 3 else gaz.nearest(lat, lon, k=5)
+        elapsed = (time.perf_counter() - started) * 1e6
+        for place, km in hits:
+            print(f"{km:8.1f} km  {place.name}, {place.country} (pop {place.population})")
+        print(f"({elapsed:.0f} us)")
+    elif len(argv) >= 2 and argv[0] == "lookup":
+        gaz = get()
+        for text in argv[1:]:
+            started = time.perf_counter()
+            place = gaz.resolve(text)
+            print(f"{text!r}: {place} ({(time.perf_counter() - started) * 1e6:.0f} us)")
+    else:
+        print(__doc__.split("\n\n")[0])
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
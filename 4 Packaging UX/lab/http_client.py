@@ -0,0 +1,209 @@
+"""Shared HTTP client for every tool module.
+
+One pooled, keep-alive client per process instead of a fresh connection
+(TCP + TLS handshake) per requests.get/post call:
+
+- sync: a requests.Session whose adapter keeps up to HTTP_POOL_MAXSIZE
+  connections per host, or an httpx.Client speaking HTTP/2 when
+  HTTP_HTTP2=1 and the `h2` package is installed;
+- async: an httpx.AsyncClient with the same limits, one per event loop (its
+  connections belong to the loop that opened them, so a second asyncio.run
+  gets a client of its own).
+
+Every call is timed per host; stats() returns count/errors/p50/p95/max
+latency so slow upstreams are easy to spot.
+"""
+import asyncio
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+from config import HTTP_HTTP2, HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, HTTP_TIMEOUT
+
+USER_AGENT = "AgenticAIWorkshop/1.0 (https://example.com/; contact@example.com)"
+
+_lock = threading.Lock()
+_client = None
+_aclients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+_metrics: Dict[str, Dict[str, Any]] = {}
+
+
+def _http2_available() -> bool:
+    if not HTTP_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+        import httpx  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def client():
+    """The process-wide sync client (requests.Session or httpx.Client)."""
+    global _client
+    with _lock:
+        if _client is None:
+            if _http2_available():
+                import httpx
+                _client = httpx.Client(
+                    http2=True, timeout=HTTP_TIMEOUT, headers={"User-Agent": USER_AGENT},
+                    limits=httpx.Limits(max_connections=HTTP_POOL_CONNECTIONS * HTTP_POOL_MAXSIZE,
+                                        max_keepalive_connections=HTTP_POOL_MAXSIZE))
+            else:
+                import requests
+                from requests.adapters import HTTPAdapter
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                s.headers["User-Agent"] = USER_AGENT
+                _client = s
+        return _client
+
+
+def async_client():
+    """The running event loop's httpx.AsyncClient (created on first use in that loop)."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        c = _aclients.get(loop)
+        if c is None:
+            import httpx
+            for other in [other for other in _aclients if other.is_closed()]:
+                del _aclients[other]  # its connections went with the loop
+            c = _aclients[loop] = httpx.AsyncClient(
+                http2=_http2_available(), timeout=HTTP_TIMEOUT, headers={"User-Agent": USER_AGENT},
+                limits=httpx.Limits(max_connections=HTTP_POOL_CONNECTIONS * HTTP_POOL_MAXSIZE,
+                                    max_keepalive_connections=HTTP_POOL_MAXSIZE))
+        return c
+
+
+def http_errors() -> tuple:
+    """Exception types raised by the active transports (for `except http_errors():`)."""
+    errors = []
+    try:
+        import requests
+        errors.append(requests.RequestException)
+    except ImportError:
+        pass
+    try:
+        import httpx
+        errors.append(httpx.HTTPError)
+    except ImportError:
+        pass
+    return tuple(errors) or (OSError,)
+
+
+# ---- per-host latency metrics ----
+def _observe(url: str, started: float, status: Optional[int]):
+    host = urlsplit(url).hostname or url
+    ms = (time.perf_counter() - started) * 1000
+    with _lock:
+        m = _metrics.get(host)
+        if m is None:
+            m = _metrics[host] = {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                  "recent": deque(maxlen=512)}
+        m["count"] += 1
+        if status is None or status >= 500 or status == 429:
+            m["errors"] += 1
+        m["total_ms"] += ms
+        m["max_ms"] = max(m["max_ms"], ms)
+        m["recent"].append(ms)
+
+
+def _pct(samples, q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def latency_ms(host: str, q: float = 0.95) -> Optional[float]:
+    """Recent latency percentile for host, or None before any samples."""
+    with _lock:
+        m = _metrics.get(host)
+        return round(_pct(list(m["recent"]), q), 1) if m and m["recent"] else None
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    with _lock:
+        snapshot = {h: (dict(m), list(m["recent"])) for h, m in _metrics.items()}
+    out = {}
+    for host, (m, recent) in snapshot.items():
+        out[host] = {
+            "count": m["count"],
+            "errors": m["errors"],
+            "avg_ms": round(m["total_ms"] / m["count"], 1) if m["count"] else 0.0,
+            "p50_ms": round(_pct(recent, 0.50), 1),
+            "p95_ms": round(_pct(recent, 0.95), 1),
+            "max_ms": round(m["max_ms"], 1),
+        }
+    return out
+
+
+# ---- request helpers ----
+def request(method: str, url: str, timeout: Optional[float] = None, **kwargs):
+    started = time.perf_counter()
+    status = None
+    try:
+        r = client().request(method, url, timeout=timeout or HTTP_TIMEOUT, **kwargs)
+        status = r.status_code
+        return r
+    finally:
+        _observe(url, started, status)
+
+
+def get(url: str, params=None, headers=None, timeout: Optional[float] = None):
+    return request("GET", url, params=params, headers=headers, timeout=timeout)
+
+
+def post(url: str, json=None, headers=None, timeout: Optional[float] = None):
+    return request("POST", url, json=json, headers=headers, timeout=timeout)
+
+
+async def arequest(method: str, url: str, timeout: Optional[float] = None, **kwargs):
+    started = time.perf_counter()
+    status = None
+    try:
+        r = await async_client().request(method, url, timeout=timeout or HTTP_TIMEOUT, **kwargs)
+        status = r.status_code
+        return r
+    finally:
+        _observe(url, started, status)
+
+
+async def aget(url: str, params=None, headers=None, timeout: Optional[float] = None):
+    return await arequest("GET", url, params=params, headers=headers, timeout=timeout)
+
+
+async def apost(url: str, json=None, headers=None, timeout: Optional[float] = None):
+    return await arequest("POST", url, json=json, headers=headers, timeout=timeout)
+
+
+async def aclose():
+    """Close the running loop's async client (call before the loop ends, e.g. at the end of asyncio.run)."""
+    with _lock:
+        c = _aclients.pop(asyncio.get_running_loop(), None)
+    if c is not None:
+        await c.aclose()
+
+
+def close():
+    """Close the sync client and every async client whose loop is still open."""
+    global _client
+    with _lock:
+        sync, _client = _client, None
+        clients = list(_aclients.items())
+        _aclients.clear()
+    if sync is not None:
+        sync.close()
+    for loop, c in clients:
+        if loop.is_closed():
+            continue
+        if loop.is_running():
+            loop.call_soon_threadsafe(lambda c=c, loop=loop: loop.create_task(c.aclose()))
+        else:
+            loop.run_until_complete(c.aclose())
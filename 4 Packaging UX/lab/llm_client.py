@@ -2,8 +2,9 @@ from config import GOOGLE_API_KEY, LLM_PROVIDER, LMSTUDIO_BASE_URL, LMSTUDIO_MOD
 
 if LLM_PROVIDER == "LMSTUDIO":
     # OpenAI-compatible local server
-    from openai import OpenAI
+    from openai import AsyncOpenAI, OpenAI
     _client = OpenAI(base_url=LMSTUDIO_BASE_URL, api_key="lm-studio")
+    _aclient = AsyncOpenAI(base_url=LMSTUDIO_BASE_URL, api_key="lm-studio")
 
     def generate_text(prompt: str, temperature: float = 0.2) -> str:
         resp = _client.chat.completions.create(
@@ -12,6 +13,14 @@ if LLM_PROVIDER == "LMSTUDIO":
             temperature=temperature,
         )
         return resp.choices[0].message.content
+
+    async def agenerate_text(prompt: str, temperature: float = 0.2) -> str:
+        resp = await _aclient.chat.completions.create(
+            model=LMSTUDIO_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+        )
+        return resp.choices[0].message.content
 else:
     import google.generativeai as genai
     if not GOOGLE_API_KEY:
@@ -22,3 +31,7 @@ else:
     def generate_text(prompt: str, temperature: float = 0.2) -> str:
         resp = _model.generate_content(prompt)
         return resp.text
+
+    async def agenerate_text(prompt: str, temperature: float = 0.2) -> str:
+        resp = await _model.generate_content_async(prompt)
+        return resp.text
@@ -0,0 +1,5 @@
+import os, sys
+
+# The lab modules import each other by bare name; llm_client wants a key at import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
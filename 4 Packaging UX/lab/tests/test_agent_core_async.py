@@ -0,0 +1,36 @@
+import asyncio, json
+
+import agent_core
+
+
+def test_arun_matches_run_with_the_same_replies(monkeypatch):
+    replies = [json.dumps({"tool": "calculator", "args": {"expression": "2*21"}}),
+               json.dumps({"final": True, "answer": "42"})]
+
+    it = iter(replies)
+    monkeypatch.setattr(agent_core, "generate_text", lambda prompt, **kw: next(it))
+    sync = agent_core.run("what is 2*21?")
+
+    ait = iter(replies)
+
+    async def agenerate_text(prompt, **kw):
+        return next(ait)
+
+    monkeypatch.setattr(agent_core, "agenerate_text", agenerate_text)
+    result = asyncio.run(agent_core.arun("what is 2*21?"))
+    assert result["answer"] == sync["answer"] == "42"
+    assert [t["role"] for t in result["trace"]] == [t["role"] for t in sync["trace"]]
+    obs = [t["data"]["observation"] for t in result["trace"] if t["role"] == "observation"]
+    assert obs == [agent_core.call_tool("calculator", {"expression": "2*21"})]
+
+
+def test_acall_tool_normalizes_weather_args(monkeypatch):
+    seen = {}
+
+    async def weather(city=None, **kw):
+        seen["city"] = city
+        return {"city": city}
+
+    monkeypatch.setitem(agent_core.ASYNC_TOOLS, "weather", weather)
+    asyncio.run(agent_core.acall_tool("weather", {"location": "Tokyo"}))
+    assert seen == {"city": "Tokyo"}
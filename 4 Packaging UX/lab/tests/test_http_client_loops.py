@@ -0,0 +1,52 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import http_client
+
+
+class _Ok(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Ok)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_each_event_loop_gets_its_own_async_client(server):
+    async def fetch():
+        return (await http_client.aget(server)).status_code, http_client.async_client()
+
+    (status1, first), (status2, second) = asyncio.run(fetch()), asyncio.run(fetch())
+    assert status1 == status2 == 200 and first is not second
+
+
+def test_close_closes_async_clients_of_open_loops(server):
+    loop = asyncio.new_event_loop()
+    try:
+        async def fetch():
+            await http_client.aget(server)
+            return http_client.async_client()
+
+        c = loop.run_until_complete(fetch())
+        http_client.close()
+        assert c.is_closed and not http_client._aclients
+    finally:
+        loop.close()
@@ -0,0 +1,81 @@
+import time
+from collections import OrderedDict
+
+import pytest
+
+import gazetteer
+import tools
+from forecast import Forecast
+
+
+class _Clock:
+    now = 0.0
+
+    @classmethod
+    def time(cls):
+        return cls.now
+
+
+class _Response:
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+
+@pytest.fixture
+def forecasts(monkeypatch):
+    _Clock.now = time.time()  # the series themselves read the real clock for "today"
+    monkeypatch.setattr(tools, "time", _Clock)
+    monkeypatch.setattr(tools, "_forecasts", OrderedDict())
+    return tools._forecasts
+
+
+def _series():
+    start = int(_Clock.now) // 86400 * 86400
+    return Forecast.from_open_meteo({"hourly": {"time": [start + 3600 * h for h in range(48)],
+                                                "temperature_2m": [20.0 + h % 24 for h in range(48)]}})
+
+
+def _place(name):
+    return gazetteer.resolve(name)
+
+
+def test_expired_series_are_dropped_on_read(forecasts):
+    tokyo = _place("Tokyo")
+    tools._store_forecast(tokyo, _series())
+    assert tools._cached_forecast(tokyo) is not None
+    _Clock.now += tools._FORECAST_TTL_SEC
+    assert tools._cached_forecast(tokyo) is None and tokyo.key not in forecasts
+
+
+def test_size_is_capped_least_recently_used_first(forecasts, monkeypatch):
+    monkeypatch.setattr(tools, "_FORECAST_MAX", 2)
+    tokyo, kyoto, paris = _place("Tokyo"), _place("Kyoto"), _place("Paris")
+    tools._store_forecast(tokyo, _series())
+    tools._store_forecast(kyoto, _series())
+    tools._cached_forecast(tokyo)  # Kyoto is now the least recently used
+    tools._store_forecast(paris, _series())
+    assert list(forecasts) == [tokyo.key, paris.key]
+
+
+def test_tool_weather_fetches_once_per_ttl(forecasts, monkeypatch):
+    calls = []
+
+    def fake_get(url, params=None, timeout=None):
+        calls.append(params)
+        start = int(_Clock.now) // 86400 * 86400
+        return _Response({"utc_offset_seconds": 0, "hourly": {"time": [start + 3600 * h for h in range(48)],
+                                                              "temperature_2m": [10.0] * 48}})
+
+    monkeypatch.setattr(tools.http_client, "get", fake_get)
+    assert tools.tool_weather("Tokyo")["today"]["max_c"] == 10.0
+    assert tools.tool_weather(city_name="Tokyo", day=1)["day"]["min_c"] == 10.0
+    assert len(calls) == 1
+    _Clock.now += tools._FORECAST_TTL_SEC
+    tools.tool_weather("Tokyo")
+    assert len(calls) == 2 and len(forecasts) == 1
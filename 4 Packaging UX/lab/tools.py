@@ -1,73 +1,145 @@
 # Module 4 Tools (Patched)
-# - weather: flexible args (city/location/city_name), Open-Meteo
+# - weather: flexible args (city/location/city_name), Open-Meteo; cities resolved by gazetteer.py;
+#   now / today / `day` read from the place's hourly series (forecast.py), kept for an hour
+# - all HTTP goes through http_client (pooled keep-alive session, per-host metrics)
 # - wikipedia: adds proper User-Agent header
 # - calculator: safe arithmetic
-# - TOOL_REGISTRY map
+# - TOOL_REGISTRY map (+ ASYNC_TOOLS: httpx coroutine versions for agent_core.arun)
 
 import re
-import requests
-from typing import Dict, Any
-
-CITY_COORDS = {
-    "manila": (14.5995, 120.9842),
-    "tokyo": (35.6762, 139.6503),
-    "singapore": (1.3521, 103.8198),
-    "new york": (40.7128, -74.0060),
-    "london": (51.5074, -0.1278),
-    "sydney": (-33.8688, 151.2093),
-    "kyoto": (35.0116, 135.7681),
-    "osaka": (34.6937, 135.5023),
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import forecast
+import gazetteer
+import http_client
+
+WEATHER_URL = "https://api.open-meteo.com/v1/forecast"
+WIKI_HEADERS = {
+    "User-Agent": "AgenticAIWorkshop/1.0 (https://example.com/; contact@example.com)"
 }
 
-def tool_weather(city: str = None, **kwargs) -> Dict[str, Any]:
+def _weather_target(city: str = None, **kwargs):
+    """Resolve the model's args to a gazetteer place -> (place, None) or (None, error dict)."""
     # Accept common aliases from the model
     if not city:
         city = kwargs.get("location") or kwargs.get("city_name")
 
     if not city:
-        return {"error": "Missing 'city' argument for weather."}
-
-    target = city.lower().strip()
-    # naive fuzzy match
-    chosen = None
-    for name in CITY_COORDS:
-        if name in target:
-            chosen = name
-            break
-    if not chosen:
-        return {"error": f"Unknown city '{city}'"}
-
-    lat, lon = CITY_COORDS[chosen]
-    url = "https://api.open-meteo.com/v1/forecast"
-    params = {"latitude": lat, "longitude": lon, "hourly": "temperature_2m"}
+        return None, {"error": "Missing 'city' argument for weather."}
+
+    # "lat,lon" (nearest place), exact name/alias, "Name, CC", a place named in the text, then fuzzy
+    place = gazetteer.resolve(city)
+    if place is None:
+        return None, {"error": f"Unknown city '{city}'"}
+    return place, None
+
+# Hourly series per place (forecast.py), reused for the next hour: "now" moves along the
+# series with the clock, and other days of the same forecast need no new request.
+# Expired series are dropped when read; past _FORECAST_MAX places the least recently used goes.
+_FORECAST_TTL_SEC = 3600
+_FORECAST_MAX = 256
+_forecasts: "OrderedDict[str, Tuple[float, forecast.Forecast]]" = OrderedDict()
+_forecasts_lock = threading.Lock()
+
+def _weather_params(chosen: gazetteer.Place) -> Dict[str, Any]:
+    return {"latitude": chosen.lat, "longitude": chosen.lon, "hourly": "temperature_2m",
+            "timeformat": "unixtime", "timezone": "auto"}
+
+def _cached_forecast(chosen: gazetteer.Place) -> Optional[forecast.Forecast]:
+    with _forecasts_lock:
+        hit = _forecasts.get(chosen.key)
+        if hit is None:
+            return None
+        if time.time() - hit[0] < _FORECAST_TTL_SEC:
+            _forecasts.move_to_end(chosen.key)
+            return hit[1]
+        del _forecasts[chosen.key]
+    return None
 
+def _store_forecast(chosen: gazetteer.Place, series: forecast.Forecast):
+    with _forecasts_lock:
+        _forecasts[chosen.key] = (time.time(), series)
+        _forecasts.move_to_end(chosen.key)
+        while len(_forecasts) > _FORECAST_MAX:
+            _forecasts.popitem(last=False)
+
+def _weather_result(chosen: gazetteer.Place, series: Optional[forecast.Forecast], day=None) -> Dict[str, Any]:
+    if series is None:
+        return {"city": chosen.name, "error": "no forecast for this place"}
+    out = {"city": chosen.name, "temp_now_c": series.now(), "today": series.day(0)}
+    if day is not None:
+        try:
+            out["day"] = series.day(int(day))  # days from today
+        except (TypeError, ValueError):
+            out["day"] = None
+    out["source"] = "Open-Meteo hourly temperature_2m"
+    return out
+
+def tool_weather(city: str = None, day=None, **kwargs) -> Dict[str, Any]:
+    chosen, err = _weather_target(city, **kwargs)
+    if err:
+        return err
+    series = _cached_forecast(chosen)
+    if series is None:
+        try:
+            r = http_client.get(WEATHER_URL, params=_weather_params(chosen), timeout=15)
+            r.raise_for_status()
+            series = forecast.Forecast.from_open_meteo(r.json())
+            if series is not None:
+                _store_forecast(chosen, series)
+        except http_client.http_errors() as e:
+            return {"error": f"weather request failed: {e}"}
+    return _weather_result(chosen, series, day)
+
+def tool_wikipedia(topic: str) -> Dict[str, Any]:
+    topic = (topic or "").strip()
+    if not topic:
+        return {"topic": topic, "summary": None, "error": "empty topic"}
+    title = topic.replace(" ", "_")
+    url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{title}"
     try:
-        r = requests.get(url, params=params, timeout=15)
+        r = http_client.get(url, headers=WIKI_HEADERS, timeout=15)
+        if r.status_code in (400, 404):
+            return {"topic": topic, "summary": None, "error": "not found"}
         r.raise_for_status()
         data = r.json()
-    except requests.RequestException as e:
-        return {"error": f"weather request failed: {e}"}
+    except http_client.http_errors() as e:
+        return {"topic": topic, "summary": None, "error": f"wiki request failed: {e}"}
+    return {"topic": topic, "summary": data.get("extract")}
 
-    temps = data.get("hourly", {}).get("temperature_2m", [])
-    now_c = temps[0] if temps else None
-    return {"city": chosen.title(), "temp_now_c": now_c, "source": "Open-Meteo hourly temperature_2m"}
+# ---- async versions (shared httpx.AsyncClient) ----
+async def atool_weather(city: str = None, day=None, **kwargs) -> Dict[str, Any]:
+    chosen, err = _weather_target(city, **kwargs)
+    if err:
+        return err
+    series = _cached_forecast(chosen)
+    if series is None:
+        try:
+            r = await http_client.aget(WEATHER_URL, params=_weather_params(chosen), timeout=15)
+            r.raise_for_status()
+            series = forecast.Forecast.from_open_meteo(r.json())
+            if series is not None:
+                _store_forecast(chosen, series)
+        except http_client.http_errors() as e:
+            return {"error": f"weather request failed: {e}"}
+    return _weather_result(chosen, series, day)
 
-def tool_wikipedia(topic: str) -> Dict[str, Any]:
+async def atool_wikipedia(topic: str) -> Dict[str, Any]:
     topic = (topic or "").strip()
     if not topic:
         return {"topic": topic, "summary": None, "error": "empty topic"}
     title = topic.replace(" ", "_")
     url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{title}"
-    headers = {
-        "User-Agent": "AgenticAIWorkshop/1.0 (https://example.com/; contact@example.com)"
-    }
     try:
-        r = requests.get(url, headers=headers, timeout=15)
+        r = await http_client.aget(url, headers=WIKI_HEADERS, timeout=15)
         if r.status_code in (400, 404):
             return {"topic": topic, "summary": None, "error": "not found"}
         r.raise_for_status()
         data = r.json()
-    except requests.RequestException as e:
+    except http_client.http_errors() as e:
         return {"topic": topic, "summary": None, "error": f"wiki request failed: {e}"}
     return {"topic": topic, "summary": data.get("extract")}
 
@@ -85,7 +157,12 @@ def tool_calculator(expression: str) -> Dict[str, Any]:
         return {"expression": expression, "error": str(e)}
 
 TOOL_REGISTRY = {
-    "weather": {"fn": tool_weather, "args": {"city": "str"}},
+    "weather": {"fn": tool_weather, "args": {"city": "str", "day": "int"}},
     "wikipedia": {"fn": tool_wikipedia, "args": {"topic": "str"}},
     "calculator": {"fn": tool_calculator, "args": {"expression": "str"}},
-}
\ No newline at end of file
+}
+
+ASYNC_TOOLS = {
+    "weather": atool_weather,
+    "wikipedia": atool_wikipedia,
+}
@@ -0,0 +1,120 @@
+"""Pull the "answer" string out of a planner reply while it is still streaming.
+
+The planner answers with one JSON object, e.g. {"final":true,"answer":"Day 1 ..."}.
+AnswerStream.feed() takes raw chunks as they arrive and returns the newly
+decoded characters of the answer value (JSON escapes resolved), so the CLI can
+show the itinerary token by token instead of after json.loads on the full reply.
+Only the top-level "answer" key counts: replies without one (tool actions,
+even with an "answer" inside their args) produce nothing.
+"""
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class AnswerStream:
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._state = "seek"  # seek -> string -> done
+        self.text = ""
+        # seek state: where the scan is in the JSON around the answer
+        self._depth = 0
+        self._in_str = self._esc = False
+        self._want_key = False  # the next string at depth 1 is a key
+        self._key = None  # top-level key being read / last one read
+        self._answer_next = False  # after "answer": at depth 1
+
+    @property
+    def done(self) -> bool:
+        return self._state == "done"
+
+    def _unicode(self, i: int):
+        """(char, next index) for a \\uXXXX escape at i, or None if it is not complete yet."""
+        buf = self._buf
+        if i + 6 > len(buf):
+            return None
+        try:
+            code = int(buf[i + 2:i + 6], 16)
+        except ValueError:
+            return buf[i:i + 6], i + 6
+        if 0xD800 <= code < 0xDC00:  # high surrogate: needs the low half too
+            if i + 12 > len(buf):
+                return None
+            if buf[i + 6:i + 8] == "\\u":
+                try:
+                    low = int(buf[i + 8:i + 12], 16)
+                    return chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)), i + 12
+                except ValueError:
+                    pass
+        return chr(code), i + 6
+
+    def _seek(self) -> bool:
+        """Scan on from _pos; True (with _pos inside the string) once the top-level "answer" value starts."""
+        buf, i = self._buf, self._pos
+        while i < len(buf):
+            c = buf[i]
+            i += 1
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif c == "\\":
+                    self._esc = True
+                elif c == '"':
+                    self._in_str = False
+                elif self._key is not None:
+                    self._key += c
+                continue
+            if c == '"' and self._answer_next:
+                self._pos = i
+                return True
+            if not c.isspace():
+                self._answer_next = False
+            if c == '"':
+                self._in_str = True
+                self._key = "" if self._depth == 1 and self._want_key else None
+                self._want_key = False
+            elif c in "{[":
+                self._depth += 1
+                self._want_key = c == "{" and self._depth == 1
+            elif c in "}]":
+                self._depth -= 1
+            elif c == "," and self._depth == 1:
+                self._want_key = True
+            elif c == ":" and self._depth == 1:
+                self._answer_next = self._key == "answer"
+        self._pos = i
+        return False
+
+    def feed(self, chunk: str) -> str:
+        self._buf += chunk
+        if self._state == "seek":
+            if not self._seek():
+                return ""
+            self._state = "string"
+        if self._state != "string":
+            return ""
+        buf, i, out = self._buf, self._pos, []
+        while i < len(buf):
+            c = buf[i]
+            if c == '"':
+                self._state = "done"
+                i += 1
+                break
+            if c == "\\":
+                if i + 1 >= len(buf):
+                    break  # escape split across chunks
+                if buf[i + 1] == "u":
+                    decoded = self._unicode(i)
+                    if decoded is None:
+                        break
+                    out.append(decoded[0])
+                    i = decoded[1]
+                    continue
+                out.append(_ESCAPES.get(buf[i + 1], buf[i + 1]))
+                i += 2
+                continue
+            out.append(c)
+            i += 1
+        self._pos = i
+        piece = "".join(out)
+        self.text += piece
+        return piece
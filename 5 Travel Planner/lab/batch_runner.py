@@ -0,0 +1,155 @@
+"""Batch mode: many travel queries in one warm process (app_travel.py --batch).
+
+Input is JSONL, one query per line, either a JSON string or an object:
+    {"id": "tokyo-kyoto-5d", "query": "Plan 5 days across Tokyo and Kyoto", "translate": "tl", "max_steps": 6}
+"id" is optional (defaults to a hash of query + translate, so it is stable
+across runs). All queries share one event loop, tool cache, HTTP pool and
+LLM client; up to `workers` plans run at once through arun_travel. LLM and
+upstream API calls are paced by the token buckets and adaptive concurrency
+limits in llm_client / http_client (LLM_RPM, UPSTREAM_RPM, ...), so a large
+batch runs at the rate the upstreams sustain instead of collecting 429s.
+
+Each finished query is appended to the output JSONL immediately (flushed).
+Re-running with the same output file skips ids already recorded as "ok",
+so a crashed or interrupted batch resumes where it stopped; failed queries
+are retried.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from travel_agent_core import arun_travel
+
+
+def _job_id(query: str, translate: Optional[str]) -> str:
+    return hashlib.sha1(f"{query}\n{translate or ''}".encode("utf-8")).hexdigest()[:12]
+
+
+def read_jobs(path: str, translate: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Jobs from a JSONL file; `translate` is the default for lines without one."""
+    jobs, seen = [], set()
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{lineno}: not valid JSON ({e})") from None
+            job = {"query": item} if isinstance(item, str) else dict(item)
+            if not job.get("query"):
+                raise ValueError(f"{path}:{lineno}: missing \"query\"")
+            job.setdefault("translate", translate)
+            job["id"] = str(job.get("id") or _job_id(job["query"], job.get("translate")))
+            if job["id"] in seen:
+                continue  # duplicate line
+            seen.add(job["id"])
+            jobs.append(job)
+    return jobs
+
+
+def completed_ids(path: str) -> Set[str]:
+    """Ids with an "ok" result in an existing output file (a torn last line is ignored)."""
+    done: Set[str] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if rec.get("status") == "ok":
+                done.add(rec.get("id"))
+    return done
+
+
+class _ResultWriter:
+    def __init__(self, path: str):
+        # A crash can leave a half-written last line: start on a fresh line
+        needs_newline = False
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+        self._f = open(path, "a", encoding="utf-8")
+        if needs_newline:
+            self._f.write("\n")
+
+    def write(self, rec: Dict[str, Any]):
+        self._f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+
+async def _run_jobs(jobs: List[Dict[str, Any]], writer: _ResultWriter, workers: int, max_steps: int,
+                    with_trace: bool, fast: bool) -> Dict[str, int]:
+    sem = asyncio.Semaphore(workers)
+    counts = {"ok": 0, "error": 0}
+    total = len(jobs)
+
+    async def one(job: Dict[str, Any]):
+        async with sem:
+            started = time.perf_counter()
+            trace: List[Dict[str, Any]] = []
+            rec: Dict[str, Any] = {"id": job["id"], "query": job["query"]}
+            try:
+                answer, _ = await arun_travel(job["query"], max_steps=int(job.get("max_steps") or max_steps),
+                                              translate_lang=job.get("translate"), trace=trace, fast=fast)
+                rec.update(status="ok", answer=answer)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                rec.update(status="error", error=f"{type(e).__name__}: {e}")
+            rec["steps"] = sum(1 for r in trace if r["role"] == "planner")
+            rec["elapsed_s"] = round(time.perf_counter() - started, 2)
+            rec["ts"] = datetime.utcnow().isoformat() + "Z"
+            if with_trace:
+                rec["trace"] = trace
+            writer.write(rec)
+            counts[rec["status"]] += 1
+            print(f"[{counts['ok'] + counts['error']}/{total}] {rec['status']:5} {job['id']} "
+                  f"({rec['elapsed_s']}s)", file=sys.stderr, flush=True)
+
+    try:
+        await asyncio.gather(*(one(job) for job in jobs))
+    finally:
+        import http_client
+        await http_client.aclose()  # its connections belong to this loop, which asyncio.run closes next
+    return counts
+
+
+def run_batch(in_path: str, out_path: Optional[str] = None, workers: int = 4, max_steps: int = 6,
+              translate_lang: Optional[str] = None, with_trace: bool = False, fast: bool = True) -> Dict[str, Any]:
+    """Run every query in in_path not yet "ok" in out_path; returns a summary dict."""
+    out_path = out_path or os.path.splitext(in_path)[0] + ".results.jsonl"
+    jobs = read_jobs(in_path, translate_lang)
+    done = completed_ids(out_path)
+    todo = [job for job in jobs if job["id"] not in done]
+    print(f"batch: {len(jobs)} queries, {len(jobs) - len(todo)} already done, {len(todo)} to run "
+          f"with {workers} workers -> {out_path}", file=sys.stderr, flush=True)
+
+    started = time.perf_counter()
+    writer = _ResultWriter(out_path)
+    try:
+        counts = asyncio.run(_run_jobs(todo, writer, max(1, workers), max_steps, with_trace, fast))
+    finally:
+        writer.close()
+
+    import fast_path, http_client, llm_client
+    cache = llm_client.response_cache()
+    return {"output": out_path, "queries": len(jobs), "skipped": len(jobs) - len(todo), **counts,
+            "wall_s": round(time.perf_counter() - started, 2),
+            "llm_cache": cache.stats() if cache else None,
+            "fast_path": fast_path.stats(),
+            "rate_limits": llm_client.limits.stats(),
+            "upstream_limits": http_client.limits.stats(),
+            "http": http_client.stats()}
@@ -0,0 +1,84 @@
+"""Per-op latency of JsonCache at growing sizes.
+
+    python bench_cache.py                    # 10k, 100k, 1M entries
+    python bench_cache.py --sizes 10000 --legacy
+
+--legacy also times the old rewrite-the-whole-file set() for comparison
+(only practical at small sizes: it is O(cache size) per insert).
+"""
+import argparse, json, os, random, shutil, tempfile, time
+
+from cache import JsonCache
+
+VALUE = {"temp_now_c": 27.4, "source": "Open-Meteo hourly temperature_2m"}
+
+
+def _us(seconds: float, n: int) -> float:
+    return seconds / max(n, 1) * 1e6
+
+
+def bench_size(n: int, workdir: str) -> dict:
+    path = os.path.join(workdir, f"cache_{n}.json")
+    cache = JsonCache(path, ttl_sec=3600)
+
+    t0 = time.perf_counter()
+    for i in range(n):
+        cache.set(f"weather:city{i}", VALUE)
+    t_set = time.perf_counter() - t0
+
+    keys = [f"weather:city{random.randrange(n)}" for _ in range(min(n, 100_000))]
+    t0 = time.perf_counter()
+    for k in keys:
+        cache.get(k)
+    t_get = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    cache.close()
+    t_flush = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    reopened = JsonCache(path, ttl_sec=3600)
+    t_load = time.perf_counter() - t0
+    assert reopened.get("weather:city0") == VALUE
+    reopened.close()
+
+    return {
+        "entries": n,
+        "set_us": round(_us(t_set, n), 2),
+        "get_us": round(_us(t_get, len(keys)), 2),
+        "final_flush_ms": round(t_flush * 1e3, 1),
+        "reload_s": round(t_load, 2),
+        "log_mb": round(os.path.getsize(reopened.storage.path) / 1e6, 1),
+    }
+
+
+def bench_legacy(n: int, workdir: str, samples: int = 50) -> dict:
+    """The pre-log behaviour: json.dump(indent=2) of the whole cache on every set()."""
+    path = os.path.join(workdir, f"legacy_{n}.json")
+    data = {f"weather:city{i}": {"_ts": time.time(), "value": VALUE} for i in range(n)}
+    t0 = time.perf_counter()
+    for i in range(samples):
+        data[f"weather:new{i}"] = {"_ts": time.time(), "value": VALUE}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    return {"entries": n, "legacy_set_us": round(_us(time.perf_counter() - t0, samples), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JsonCache storage benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--legacy", action="store_true", help="Also time the old whole-file rewrite")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_cache_")
+    try:
+        for n in args.sizes:
+            print(json.dumps(bench_size(n, workdir)))
+            if args.legacy:
+                print(json.dumps(bench_legacy(n, workdir)))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Cost of the distance_matrix / route_order tools at 10, 100 and 1000 cities.
+
+    python bench_distance.py                 # NumPy if installed, else pure Python
+    python bench_distance.py --no-numpy      # force the pure-Python fallback
+    python bench_distance.py --sizes 10 50
+
+Cities are random points (no network, no gazetteer lookups). For each size:
+- pairwise_ms: N*(N-1)/2 scalar haversine_km calls, i.e. what asking the
+  distance tool pair by pair computes (each of those was a planner step)
+- matrix_math_ms: the same distances as one routing.distance_matrix call;
+  matrix_ms: the whole distance_matrix observation (rounded, JSON-ready)
+- route_ms, greedy_km, route_km: nearest-neighbour + 2-opt through every city
+- observation_chars: size of the route_order JSON the planner reads
+"""
+import argparse, json, random, time
+
+import gazetteer
+import routing
+from travel_tools import haversine_km, matrix_result, route_result
+
+
+def _cities(n: int, rng: random.Random):
+    return [gazetteer.Place(i, f"City{i}", round(rng.uniform(-50, 60), 4), round(rng.uniform(-170, 170), 4), "XX", 0)
+            for i in range(n)]
+
+
+def bench_size(n: int, rng: random.Random) -> dict:
+    places = _cities(n, rng)
+
+    t0 = time.perf_counter()
+    for i in range(n):
+        for j in range(i + 1, n):
+            haversine_km((places[i].lat, places[i].lon), (places[j].lat, places[j].lon))
+    t_pairwise = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    routing.distance_matrix([p.lat for p in places], [p.lon for p in places])
+    t_math = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    matrix = matrix_result(places)
+    t_matrix = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    route = route_result(places)
+    t_route = time.perf_counter() - t0
+
+    return {
+        "cities": n,
+        "numpy": routing._np() is not None,
+        "pairwise_calls": n * (n - 1) // 2,
+        "pairwise_ms": round(t_pairwise * 1e3, 2),
+        "matrix_math_ms": round(t_math * 1e3, 2),
+        "matrix_ms": round(t_matrix * 1e3, 2),
+        "route_ms": round(t_route * 1e3, 1),
+        "greedy_km": route["total_km"] + route["saved_km"],
+        "route_km": route["total_km"],
+        "matrix_chars": len(json.dumps(matrix)),
+        "observation_chars": len(json.dumps(route)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="distance_matrix / route_order benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--no-numpy", action="store_true", help="Use the pure-Python fallback")
+    args = parser.parse_args()
+    if args.no_numpy:
+        routing._numpy = False
+    routing._np()  # import NumPy before timing
+    rng = random.Random(7)
+    for n in args.sizes:
+        print(json.dumps(bench_size(n, rng)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Lookup latency of the gazetteer index at GeoNames scale (synthetic places).
+
+    python bench_gazetteer.py                     # 20k, 150k places
+    python bench_gazetteer.py --sizes 500000 --legacy
+
+Places get random pronounceable names, an ASCII/alias variant and a power-law
+population, written as a GeoNames geoname table so the parser is timed too.
+nearest/within time the KD-tree (nearest place, places within 50 km of a
+random point). --legacy also times the old CITY_COORDS lookup (a `name in target` scan over
+every city) at the same size.
+"""
+import argparse, json, os, random, shutil, statistics, tempfile, time
+
+import gazetteer
+
+# onset + vowel + optional coda: ~2k syllables, about as many distinct trigrams as real place names
+ONSETS = ["", "b", "c", "d", "f", "g", "h", "j", "k", "l", "m", "n", "p", "qu", "r", "s", "t", "v", "w", "z",
+          "br", "ch", "gr", "kr", "sh", "st", "th", "tr", "pl", "sl"]
+VOWELS = ["a", "e", "i", "o", "u", "y", "ai", "ou", "ea"]
+CODAS = ["", "", "", "n", "r", "s", "l", "m", "ng", "t", "k"]
+COUNTRIES = ["PH", "JP", "US", "FR", "GB", "DE", "BR", "IN", "AU", "MX", "ES", "IT", "CN", "NG", "CA"]
+
+
+def _name(rng: random.Random) -> str:
+    return "".join(rng.choice(ONSETS) + rng.choice(VOWELS) + rng.choice(CODAS)
+                   for _ in range(rng.randint(2, 3))).title()
+
+
+def _typo(rng: random.Random, name: str) -> str:
+    i = rng.randrange(1, len(name))
+    return name[:i] + rng.choice("aeiou") + name[i + 1:]
+
+
+def write_dump(n: int, path: str, rng: random.Random) -> list:
+    names = []
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            name = _name(rng)
+            if rng.random() < 0.3:
+                name += " " + _name(rng)
+            aliases = [name + " City", name.replace("a", "á", 1)]
+            pop = int(1000 * rng.paretovariate(1.1))
+            cols = [str(i), name, name, ",".join(aliases), f"{rng.uniform(-60, 70):.4f}",
+                    f"{rng.uniform(-180, 180):.4f}", "P", "PPL", rng.choice(COUNTRIES), "", "", "", "", "", str(pop)]
+            f.write("\t".join(cols + ["0", "0", "Etc/UTC", "2024-01-01"]) + "\n")
+            names.append(name)
+    return names
+
+
+def _timed(fn, queries) -> dict:
+    times = []
+    for q in queries:
+        t0 = time.perf_counter()
+        fn(q)
+        times.append((time.perf_counter() - t0) * 1e6)
+    times.sort()
+    return {"p50_us": round(statistics.median(times), 1), "p99_us": round(times[int(len(times) * 0.99)], 1)}
+
+
+def bench_size(n: int, workdir: str, legacy: bool, samples: int = 2000) -> dict:
+    rng = random.Random(n)
+    dump, index = os.path.join(workdir, f"places_{n}.txt"), os.path.join(workdir, f"places_{n}.idx")
+    names = write_dump(n, dump, rng)
+
+    t0 = time.perf_counter()
+    gazetteer.compile_file(dump, index)
+    t_build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    gaz = gazetteer.Gazetteer.open(index)
+    t_open = time.perf_counter() - t0
+
+    picked = [rng.choice(names) for _ in range(samples)]
+    points = [(rng.uniform(-60, 70), rng.uniform(-180, 180)) for _ in range(samples)]
+    assert gaz.exact(picked[0])[0].name == picked[0]
+    out = {
+        "places": gaz.places, "names": gaz.keys, "build_s": round(t_build, 1),
+        "open_ms": round(t_open * 1e3, 2), "index_mb": round(os.path.getsize(index) / 1e6, 1),
+        "exact": _timed(gaz.exact, picked),
+        "alias": _timed(gaz.exact, [p + " city" for p in picked]),
+        "prefix": _timed(lambda q: gaz.prefix(q, limit=10), [p[:3] for p in picked]),
+        "fuzzy": _timed(lambda q: gaz.fuzzy(q, limit=5), [_typo(rng, p) for p in picked]),
+        "resolve_typo": _timed(gaz.resolve, [_typo(rng, p) for p in picked[:500]]),
+        "mentions": _timed(gaz.mentions, [f"Plan 4 days in {a} and {b} on a budget" for a, b in zip(picked, picked[1:])]),
+        "nearest": _timed(lambda p: gaz.nearest(*p), points),
+        "within_50km": _timed(lambda p: gaz.within(p[0], p[1], 50), points),
+    }
+    hits = sum(1 for p in picked[:500] if (gaz.resolve(_typo(rng, p)) or gazetteer.Place(0, "", 0, 0, "", 0)).name == p)
+    out["typo_recall"] = round(hits / 500, 3)
+    if legacy:
+        coords = {name.lower(): (0.0, 0.0) for name in names}
+
+        def scan(target):
+            for name in coords:
+                if name in target:
+                    return name
+
+        out["legacy_scan"] = _timed(scan, [p.lower() for p in picked[:50]])
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gazetteer lookup benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20_000, 150_000])
+    parser.add_argument("--legacy", action="store_true", help="Also time the old linear CITY_COORDS scan")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_gazetteer_")
+    try:
+        for n in args.sizes:
+            print(json.dumps(bench_size(n, workdir, args.legacy)))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
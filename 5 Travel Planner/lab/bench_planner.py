@@ -0,0 +1,131 @@
+"""LLM calls and wall time per query: run_travel vs the old two-calls-per-step loop.
+
+    python bench_planner.py                          # 20 queries, 3 tool steps each
+    python bench_planner.py --queries 50 --llm-ms 400 --tool-ms 80 --steps 4
+
+Runs offline: the LLM and the tools are simulated with fixed latencies so the
+numbers only reflect the loop structure. The simulated planner needs --steps
+tool results before it can answer; whenever it is asked before that, it names
+the next tool (in the old loop, that second decision was discarded).
+"""
+import argparse, json, sys, time, types
+from datetime import datetime
+
+from llm_providers import ProviderRegistry
+
+
+class FakeWorld:
+    """Planner + tools for one query: finalizes once `steps` tools have run."""
+
+    def __init__(self, steps: int, llm_s: float, tool_s: float):
+        self.steps = steps
+        self.llm_s = llm_s
+        self.tool_s = tool_s
+        self.tools_done = 0
+        self.llm_calls = 0
+
+    def generate_text(self, prompt: str, temperature: float = 0.3, **kwargs) -> str:
+        self.llm_calls += 1
+        time.sleep(self.llm_s)
+        if self.tools_done >= self.steps:
+            return json.dumps({"final": True, "answer": f"plan after {self.tools_done} observations"})
+        return json.dumps({"tool": "wikipedia", "args": {"topic": f"Kyoto {self.tools_done}"}})
+
+    def wikipedia(self, topic: str):
+        time.sleep(self.tool_s)
+        self.tools_done += 1
+        return {"topic": topic, "summary": "Kyoto is a city in Japan. " * 20}
+
+
+def legacy_run(world: FakeWorld, call_tool, parse_json, SYS: str, query: str, max_steps: int = 6):
+    """The loop as it was before the single-call planner (one extra finalize call per step)."""
+    trace = []
+    context = f"User: {query}\n"
+
+    def record(role, data):
+        trace.append({"ts": datetime.utcnow().isoformat() + "Z", "role": role, "data": data})
+
+    record("user", {"query": query})
+    for step in range(1, max_steps + 1):
+        prompt = f"{SYS}\n\nConversation so far:\n{context}\n\nYour JSON:\n"
+        decision = parse_json(world.generate_text(prompt))
+        record("planner", {"step": step, "decision": decision})
+        if decision.get("final"):
+            record("final", {"answer": decision["answer"]})
+            return decision["answer"], trace
+        obs = call_tool(decision["tool"], decision.get("args", {}))
+        record("observation", {"step": step, "tool": decision["tool"], "args": decision.get("args", {}), "observation": obs})
+        context += f"Planner: {json.dumps(decision)}\nObservation: {json.dumps(obs)}\n"
+        finalize = (f"{SYS}\nLatest observation: {json.dumps(obs)}\n"
+                    "If you can answer now, return {\"final\":true,\"answer\":\"...\"}\n"
+                    "Otherwise, return the next {\"tool\":...,\"args\":...}.\n")
+        decision2 = parse_json(world.generate_text(finalize))
+        record("planner", {"step": step, "decision": decision2})
+        if decision2.get("final"):
+            record("final", {"answer": decision2["answer"]})
+            return decision2["answer"], trace
+        context += f"Planner: {json.dumps(decision2)}\n"
+    return "step limit", trace
+
+
+def load_core():
+    # Simulated llm_client/travel_tools so the benchmark needs no API key or network
+    current = {}
+    llm = types.ModuleType("llm_client")
+    llm.generate_text = lambda prompt, temperature=0.3, **kwargs: current["world"].generate_text(prompt)
+    async def agenerate_text(prompt, temperature=0.3, **kwargs):
+        return current["world"].generate_text(prompt)
+    llm.agenerate_text = agenerate_text
+    llm.stream_text = lambda prompt, temperature=0.3, **kwargs: iter([current["world"].generate_text(prompt)])
+    llm.registry = ProviderRegistry("GEMINI")  # nothing is loaded; only used to resolve roles
+    tools = types.ModuleType("travel_tools")
+    tools.TOOL_REGISTRY = {"wikipedia": {"fn": lambda topic: current["world"].wikipedia(topic)}}
+    tools.ASYNC_TOOLS = {}
+    tools.parse_days_and_budget = lambda query: (None, None)  # imported by fast_path (unused: fast=False)
+    sys.modules["llm_client"] = llm
+    sys.modules["travel_tools"] = tools
+    import travel_agent_core
+    return travel_agent_core, current
+
+
+def bench(name: str, run_one, args) -> dict:
+    calls, t0 = 0, time.perf_counter()
+    for i in range(args.queries):
+        world = FakeWorld(args.steps, args.llm_ms / 1000, args.tool_ms / 1000)
+        answer = run_one(world, f"3-day Kyoto trip #{i}")
+        assert answer.startswith("plan after"), answer
+        calls += world.llm_calls
+    wall = time.perf_counter() - t0
+    return {"loop": name, "queries": args.queries, "tool_steps": args.steps,
+            "llm_calls_per_query": round(calls / args.queries, 2),
+            "wall_s_per_query": round(wall / args.queries, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Planner loop benchmark (simulated LLM)")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--steps", type=int, default=3, help="Tool results needed before the planner can answer")
+    parser.add_argument("--llm-ms", type=float, default=300, help="Simulated latency per LLM call")
+    parser.add_argument("--tool-ms", type=float, default=50, help="Simulated latency per tool call")
+    args = parser.parse_args()
+
+    core, current = load_core()
+    max_steps = max(6, args.steps)
+
+    def run_legacy(world, query):
+        current["world"] = world
+        return legacy_run(world, core.call_tool, core.parse_json, core.SYS, query, max_steps)[0]
+
+    def run_single(world, query):
+        current["world"] = world
+        # fast=False: a "3-day Kyoto trip" would otherwise skip the planner loop being measured
+        return core.run_travel(query, max_steps=max_steps, fast=False)[0]
+
+    rows = [bench("legacy", run_legacy, args), bench("single_call", run_single, args)]
+    for row in rows:
+        print(json.dumps(row))
+    print(json.dumps({"speedup": round(rows[0]["wall_s_per_query"] / rows[1]["wall_s_per_query"], 2)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Cold-start cost of the CLI, measured with `python -X importtime`.
+
+    python bench_startup.py                          # report
+    python bench_startup.py --check                  # exit 1 if a target is missed
+    python bench_startup.py --save startup.json      # record a baseline ...
+    python bench_startup.py --baseline startup.json  # ... and fail on import-cost regressions
+
+Scenarios (each run in a fresh interpreter, in a scratch directory so no
+cache files are touched):
+- help:       `app_travel.py --help`; must not import Rich, the HTTP stack,
+              the tools/cache or an LLM SDK.
+- first_plan: everything the first plan loads before its first LLM request
+              (agent core, tools, provider SDK, response cache, tool cache).
+              Uses LM Studio by default so no API key is needed; nothing is
+              sent over the network.
+
+wall_ms is the median of --runs plain runs; import_ms is the summed
+cumulative time of top-level imports from one -X importtime run (site and
+its .pth imports excluded).
+"""
+import argparse, json, os, re, statistics, subprocess, sys, tempfile, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+HELP_MUST_NOT_IMPORT = ["rich", "requests", "httpx", "tenacity", "openai", "google.generativeai",
+                        "huggingface_hub", "numpy", "travel_agent_core", "travel_tools", "cache", "llm_client"]
+
+FIRST_PLAN = ("import travel_agent_core, travel_tools, llm_client; "
+              "llm_client.registry.get(); llm_client.response_cache(); travel_tools.get_cache()")
+
+SCENARIOS = {
+    "help": ["app_travel.py", "--help"],
+    "first_plan": ["-c", FIRST_PLAN],
+}
+
+TARGETS_MS = {"help": 200, "first_plan": 2500}  # wall time incl. interpreter start-up (~80 ms bare)
+
+
+def _cmd(args):
+    return [sys.executable] + [os.path.join(HERE, a) if a.endswith(".py") else a for a in args]
+
+
+def _env(provider: str):
+    env = dict(os.environ, LLM_PROVIDER=provider, PYTHONPATH=HERE + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    env.setdefault("GOOGLE_API_KEY", "bench-startup-placeholder")  # Gemini client is built, never called
+    return env
+
+
+def parse_importtime(stderr: str):
+    """(top-level imports as {module: cumulative_us}, set of every imported module)."""
+    top, seen = {}, set()
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            continue
+        cumulative, indent, name = int(m.group(2)), len(m.group(3)), m.group(4)
+        seen.add(name)
+        if indent == 0:
+            top[name] = top.get(name, 0) + cumulative
+    return top, seen
+
+
+def measure(name: str, args, runs: int, provider: str, workdir: str):
+    cmd, env = _cmd(args), _env(provider)
+    walls = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run(cmd, cwd=workdir, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        walls.append((time.perf_counter() - t0) * 1000)
+    proc = subprocess.run(cmd[:1] + ["-X", "importtime"] + cmd[1:], cwd=workdir, env=env, check=True,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    top, seen = parse_importtime(proc.stderr)
+    top.pop("site", None)  # interpreter start-up, not ours
+    slowest = sorted(top.items(), key=lambda kv: -kv[1])[:5]
+    row = {"scenario": name, "wall_ms": round(statistics.median(walls), 1),
+           "import_ms": round(sum(top.values()) / 1000, 1),
+           "slowest": {mod: round(us / 1000, 1) for mod, us in slowest}}
+    if name == "help":
+        row["unexpected_imports"] = [mod for mod in HELP_MUST_NOT_IMPORT if mod in seen]
+    return row
+
+
+def check(rows, baseline, tolerance: float):
+    failures = []
+    for row in rows:
+        target = TARGETS_MS.get(row["scenario"])
+        if target and row["wall_ms"] > target:
+            failures.append(f"{row['scenario']}: wall {row['wall_ms']} ms > target {target} ms")
+        if row.get("unexpected_imports"):
+            failures.append(f"{row['scenario']}: imports {', '.join(row['unexpected_imports'])}")
+        base = (baseline or {}).get(row["scenario"])
+        if base and row["import_ms"] > base["import_ms"] * (1 + tolerance):
+            failures.append(f"{row['scenario']}: import {row['import_ms']} ms > baseline "
+                            f"{base['import_ms']} ms +{tolerance:.0%}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI start-up benchmark (python -X importtime)")
+    parser.add_argument("--runs", type=int, default=5, help="Plain runs per scenario for the wall-time median")
+    parser.add_argument("--provider", choices=["GEMINI", "LMSTUDIO"], default="LMSTUDIO")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if a target or the baseline is missed")
+    parser.add_argument("--baseline", help="JSON from --save; import_ms may not grow past --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--save", help="Write this run's results as a baseline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        rows = [measure(name, cmd, args.runs, args.provider, workdir) for name, cmd in SCENARIOS.items()]
+    for row in rows:
+        print(json.dumps(row))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({row["scenario"]: row for row in rows}, f, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    failures = check(rows, baseline, args.tolerance)
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    if failures and (args.check or baseline):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,680 @@
-import json, os, time
-from typing import Any, Optional
+import abc, asyncio, atexit, io, json, os, sqlite3, threading, time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+
+def _encode(rec: Dict[str, Any]) -> bytes:
+    return (json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _scan(f, base: int = 0) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+    """Yield (offset, length, record) for each complete log line in f."""
+    pos = base
+    for line in f:
+        if not line.endswith(b"\n"):
+            return  # torn tail
+        try:
+            rec = json.loads(line)
+            rec["k"]
+        except (ValueError, KeyError, TypeError):
+            return
+        yield pos, len(line), rec
+        pos += len(line)
+
+
+def _ns(key: str) -> str:
+    return key.split(":", 1)[0]
+
+
+class _WriteBehind(abc.ABC):
+    """Background thread that flushes a storage backend's pending writes."""
+
+    def __init__(self, flush_interval: float, batch_size: int):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def _kick(self, pending: int):
+        if self._thread is None and not self._closed:
+            self._thread = threading.Thread(target=self._run, name="cache-flush", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+        if pending >= self.batch_size:
+            self._wake.set()
+
+    def _background(self):
+        self.flush()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self._background()
+            except (OSError, sqlite3.Error):
+                pass
+
+    @abc.abstractmethod
+    def flush(self):
+        """Write the buffered records to the backing store."""
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        try:
+            self.flush()
+        except (OSError, sqlite3.Error):
+            pass
+
+
+class AppendLogStorage(_WriteBehind):
+    """Append-only JSONL log; the persistent tier behind JsonCache.
+
+    Only an index of key -> (offset, length, ts) is kept in memory; values
+    are read back from disk on demand. Writes are buffered and flushed in
+    batches by a background thread, so set() never touches the disk itself.
+    Superseded records are dropped by periodic compaction, which rewrites
+    the live records to a temp file and swaps it in with an atomic rename.
+    A torn last line (crash mid-write) is ignored and truncated on load.
+
+    Record format, one JSON object per line:
+        {"k": key, "ts": 1712345678.9, "v": value}   # set
+        {"k": key, "d": 1}                            # delete
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0, batch_size: int = 512,
+                 compact_min: int = 1000, compact_ratio: float = 2.0, fsync: bool = False):
+        super().__init__(flush_interval, batch_size)
+        self.path = path
+        self.compact_min = compact_min
+        self.compact_ratio = compact_ratio
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._compacting = threading.Lock()
+        self._index: Dict[str, Tuple[int, int, float]] = {}  # offset -1 = not flushed yet
+        self._unflushed: Dict[str, Dict[str, Any]] = {}
+        self._pending: List[Tuple[str, bytes, Optional[float]]] = []
+        self._records = 0
+        self._size = 0
+        self._reader = None
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    # -- reading ---------------------------------------------------------
+    def load(self):
+        with self._lock:
+            self._index, self._records, self._size = {}, 0, 0
+            if not os.path.exists(self.path):
+                return
+            with open(self.path, "rb") as f:
+                for off, ln, rec in _scan(f):
+                    self._apply(rec, off, ln)
+                    self._records += 1
+                    self._size = off + ln
+            if self._size < os.path.getsize(self.path):
+                os.truncate(self.path, self._size)
+
+    def _apply(self, rec: Dict[str, Any], off: int, ln: int):
+        if rec.get("d"):
+            self._index.pop(rec["k"], None)
+        else:
+            self._index[rec["k"]] = (off, ln, rec.get("ts", 0))
+
+    def read(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._unflushed.get(key)
+            if item is not None:
+                return item
+            loc = self._index.get(key)
+            if loc is None:
+                return None
+            if self._reader is None:
+                self._reader = open(self.path, "rb")
+            self._reader.seek(loc[0])
+            rec = json.loads(self._reader.read(loc[1]))
+        return {"_ts": rec.get("ts", 0), "value": rec.get("v")}
+
+    def purge(self, ttl_by_ns: Dict[str, int], default_ttl: int, now: float) -> int:
+        with self._lock:
+            stale = [k for k, (_, _, ts) in self._index.items()
+                     if now - ts > ttl_by_ns.get(_ns(k), default_ttl)]
+            for key in stale:
+                self.delete(key)
+        return len(stale)
+
+    # -- writing ---------------------------------------------------------
+    def _enqueue(self, key: str, rec: Dict[str, Any], ts: Optional[float]):
+        self._pending.append((key, _encode(rec), ts))
+        self._records += 1
+        self._kick(len(self._pending))
+
+    def put(self, key: str, item: Dict[str, Any]):
+        ts = item.get("_ts", 0)
+        with self._lock:
+            self._index[key] = (-1, 0, ts)
+            self._unflushed[key] = item
+            self._enqueue(key, {"k": key, "ts": ts, "v": item.get("value")}, ts)
+
+    def delete(self, key: str, ts: Optional[float] = None):
+        """Remove key; with ts, only if the stored entry is not newer than ts."""
+        with self._lock:
+            loc = self._index.get(key)
+            if loc is None or (ts is not None and loc[2] > ts):
+                return
+            del self._index[key]
+            self._unflushed.pop(key, None)
+            self._enqueue(key, {"k": key, "d": 1}, None)
+
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+            with open(self.path, "ab") as f:
+                f.write(b"".join(line for _, line, _ in pending))
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            pos = self._size
+            for key, line, ts in pending:
+                if ts is not None and key in self._unflushed:
+                    self._index[key] = (pos, len(line), ts)
+                pos += len(line)
+            self._size = pos
+            self._unflushed.clear()
+
+    def needs_compaction(self) -> bool:
+        with self._lock:
+            dead = self._records - len(self._index)
+            return dead >= self.compact_min and dead > len(self._index) * (self.compact_ratio - 1)
+
+    def compact(self):
+        """Rewrite the log with live records only, then rename it into place.
+
+        Live records are copied without holding the lock; records appended
+        meanwhile are copied over under the lock right before the swap.
+        """
+        with self._compacting:
+            self._compact()
+
+    def _compact(self):
+        self.flush()
+        with self._lock:
+            if not os.path.exists(self.path):
+                return
+            live = sorted((off, ln, k) for k, (off, ln, _) in self._index.items() if off >= 0)
+            end = self._size
+        tmp = self.path + ".tmp"
+        new_index: Dict[str, Tuple[int, int, float]] = {}
+        src, out = open(self.path, "rb"), open(tmp, "wb")
+        try:
+            pos = 0
+            for off, ln, key in live:
+                src.seek(off)
+                line = src.read(ln)
+                out.write(line)
+                new_index[key] = (pos, ln, json.loads(line).get("ts", 0))
+                pos += ln
+            with self._lock:
+                self.flush()
+                src.seek(end)
+                tail = src.read()
+                out.write(tail)
+                out.flush()
+                os.fsync(out.fileno())
+                src.close()
+                out.close()
+                if self._reader is not None:
+                    self._reader.close()
+                    self._reader = None
+                os.replace(tmp, self.path)
+                self._index, self._records = new_index, len(new_index)
+                for off, ln, rec in _scan(io.BytesIO(tail), pos):
+                    self._apply(rec, off, ln)
+                    self._records += 1
+                self._size = pos + len(tail)
+        finally:
+            src.close()
+            out.close()
+
+    def _background(self):
+        self.flush()
+        if self.needs_compaction():
+            self.compact()
+
+    def close(self):
+        super().close()
+        with self._lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+
+class SqliteStorage(_WriteBehind):
+    """SQLite (WAL mode) persistent tier that several processes can share.
+
+    WAL lets readers run concurrently with one writer across processes;
+    busy_timeout makes competing writers wait instead of failing. Writes
+    are buffered and applied in one transaction per flush with executemany,
+    so each batch reuses the same prepared statements. TTL expiry deletes
+    go through the (ns, ts) index.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cache (
+        key   TEXT PRIMARY KEY,
+        ns    TEXT NOT NULL,
+        ts    REAL NOT NULL,
+        value TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS cache_ns_ts ON cache (ns, ts);
+    """
+
+    def __init__(self, path: str, flush_interval: float = 0.5, batch_size: int = 256,
+                 busy_timeout_ms: int = 5000):
+        super().__init__(flush_interval, batch_size)
+        self.path = path
+        self._lock = threading.RLock()
+        self._pending: "OrderedDict[str, Tuple[Optional[Dict[str, Any]], Optional[float]]]" = OrderedDict()
+        self._db = sqlite3.connect(path, timeout=busy_timeout_ms / 1000, check_same_thread=False,
+                                   isolation_level=None)
+        self._db.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(self.SCHEMA)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def load(self):
+        pass  # nothing to index; rows are read on demand
+
+    def read(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key][0]
+            row = self._db.execute("SELECT ts, value FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return {"_ts": row[0], "value": json.loads(row[1])}
+
+    def put(self, key: str, item: Dict[str, Any]):
+        with self._lock:
+            self._pending[key] = (item, None)
+            self._pending.move_to_end(key)
+            self._kick(len(self._pending))
+
+    def delete(self, key: str, ts: Optional[float] = None):
+        """Remove key; with ts, only if the stored entry is not newer than ts."""
+        with self._lock:
+            self._pending[key] = (None, ts)
+            self._pending.move_to_end(key)
+            self._kick(len(self._pending))
+
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, OrderedDict()
+            upserts = [(k, _ns(k), it["_ts"], json.dumps(it.get("value"), ensure_ascii=False))
+                       for k, (it, _) in pending.items() if it is not None]
+            deletes = [(k, ts if ts is not None else float("inf"))
+                       for k, (it, ts) in pending.items() if it is None]
+            with self._db:
+                self._db.execute("BEGIN IMMEDIATE")
+                if deletes:
+                    self._db.executemany("DELETE FROM cache WHERE key = ? AND ts <= ?", deletes)
+                if upserts:
+                    self._db.executemany(
+                        "INSERT INTO cache (key, ns, ts, value) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET ts = excluded.ts, value = excluded.value "
+                        "WHERE excluded.ts >= cache.ts", upserts)
+
+    def purge(self, ttl_by_ns: Dict[str, int], default_ttl: int, now: float) -> int:
+        self.flush()
+        removed = 0
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            for ns, ttl in ttl_by_ns.items():
+                removed += self._db.execute("DELETE FROM cache WHERE ns = ? AND ts < ?",
+                                            (ns, now - ttl)).rowcount
+            marks = ",".join("?" * len(ttl_by_ns))
+            where = f"ns NOT IN ({marks}) AND ts < ?" if ttl_by_ns else "ts < ?"
+            removed += self._db.execute(f"DELETE FROM cache WHERE {where}",
+                                        (*ttl_by_ns, now - default_ttl)).rowcount
+        return removed
+
+    def close(self):
+        super().close()
+        with self._lock:
+            self._db.close()
+
+
+def make_storage(backend: str, path: str):
+    """Pick the persistent tier: "log" (default, one process) or "sqlite" (shared)."""
+    stem = os.path.splitext(path)[0]
+    if (backend or "log").lower() == "sqlite":
+        return SqliteStorage(stem + ".sqlite3")
+    return AppendLogStorage(stem + ".log")
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one execution.
+
+    The first caller of do(key, fn) runs fn; callers arriving while it is in
+    flight block and receive the same result (or exception). ado() does the
+    same for coroutines on one event loop; the shared fetch runs as its own
+    task, so cancelling one waiter does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._tasks: Dict[str, "asyncio.Future"] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Returns (value, shared); shared is True when another caller did the work."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value, False
+
+    async def ado(self, key: str, afn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        loop = asyncio.get_running_loop()
+        task = self._tasks.get(key)
+        shared = task is not None and not task.done() and task.get_loop() is loop
+        if not shared:
+            task = self._tasks[key] = loop.create_task(afn())
+            task.add_done_callback(lambda t, k=key: self._task_done(k, t))
+        return await asyncio.shield(task), shared
+
+    def _task_done(self, key: str, task: "asyncio.Future"):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every waiter was cancelled
+
+    def in_flight(self, key: str) -> bool:
+        with self._lock:
+            return key in self._calls or key in self._tasks
+
 
 class JsonCache:
-    def __init__(self, path: str, ttl_sec: int = 600):
+    """Two-tier TTL cache: a bounded in-process LRU in front of a persistent store.
+
+    TTLs can differ per namespace (the part of the key before ':'), e.g.
+    {"weather": 600, "wiki": 86400}; other keys use ttl_sec. A background
+    sweeper drops expired entries from both tiers every sweep_sec. The
+    persistent tier is chosen with backend ("log" or "sqlite", see
+    make_storage) unless a storage object is passed in.
+
+    get_or_load()/aget_or_load() put a SingleFlight in front of misses so
+    concurrent callers for one key share a single upstream fetch. With
+    stale_sec > 0 an entry stays around that long past its TTL: get() treats
+    it as a miss, but get_or_load() returns it at once and refreshes it with
+    one background load (stale-while-revalidate).
+    """
+
+    def __init__(self, path: str, ttl_sec: int = 600, storage=None, backend: str = "log",
+                 max_entries: int = 2048, ttl_by_ns: Optional[Dict[str, int]] = None,
+                 sweep_sec: float = 60, stale_sec: float = 0):
         self.path = path
         self.ttl = ttl_sec
-        self._data = {}
+        self.ttl_by_ns = dict(ttl_by_ns or {})
+        self.max_entries = max_entries
+        self.stale_sec = stale_sec
+        self.flight = SingleFlight()
+        self._refreshing: Set[str] = set()
+        self._refresh_tasks: Set["asyncio.Future"] = set()
+        self.storage = storage or make_storage(backend, path)
+        self._lock = threading.Lock()
+        self._hot: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expired": 0,
+                       "stale": 0, "coalesced": 0, "refreshes": 0}
         self._load()
+        self._stop = threading.Event()
+        self._sweep_thread: Optional[threading.Thread] = None
+        if sweep_sec:
+            self._sweep_every = sweep_sec
+            self._sweep_thread = threading.Thread(target=self._sweeper, name="cache-sweep",
+                                                  daemon=True)
+            self._sweep_thread.start()
 
     def _load(self):
-        if os.path.exists(self.path):
-            try:
-                with open(self.path, "r", encoding="utf-8") as f:
-                    self._data = json.load(f)
-            except Exception:
-                self._data = {}
-
-    def _save(self):
+        self.storage.load()
+        if not os.path.isfile(self.path):
+            return
+        # One-time import of a cache.json written by the old whole-file format
         try:
-            with open(self.path, "w", encoding="utf-8") as f:
-                json.dump(self._data, f, ensure_ascii=False, indent=2)
+            with open(self.path, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
         except Exception:
+            legacy = {}
+        if not isinstance(legacy, dict):
+            legacy = {}
+        for key, item in legacy.items():
+            if isinstance(item, dict) and "_ts" in item:
+                self.storage.put(key, item)
+        try:
+            os.replace(self.path, self.path + ".migrated")
+        except OSError:
             pass
 
+    def ttl_for(self, key: str) -> int:
+        return self.ttl_by_ns.get(_ns(key), self.ttl)
+
+    def _expired(self, key: str, ts: float, now: Optional[float] = None) -> bool:
+        return (now or time.time()) - ts > self.ttl_for(key)
+
+    def _remember(self, key: str, item: Dict[str, Any]):
+        self._hot[key] = item
+        self._hot.move_to_end(key)
+        while len(self._hot) > self.max_entries:
+            self._hot.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def lookup(self, key: str) -> Optional[Tuple[Any, bool]]:
+        """(value, fresh) from either tier, or None; fresh is False inside the stale window."""
+        with self._lock:
+            item = self._hot.get(key)
+            if item is not None:
+                if not self._expired(key, item.get("_ts", 0)):
+                    self._hot.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return item.get("value"), True
+                # Another process may have refreshed it in a shared store
+                del self._hot[key]
+        item = self.storage.read(key)
+        with self._lock:
+            item = self._hot.get(key, item)  # a set() may have raced the disk read
+            if not item:
+                self._stats["misses"] += 1
+                return None
+            age = time.time() - item.get("_ts", 0)
+            if age > self.ttl_for(key) + self.stale_sec:
+                self.storage.delete(key, item.get("_ts", 0))
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._remember(key, item)
+            if age > self.ttl_for(key):
+                return item.get("value"), False
+            self._stats["disk_hits"] += 1
+            return item.get("value"), True
+
     def get(self, key: str) -> Optional[Any]:
-        item = self._data.get(key)
-        if not item:
+        hit = self.lookup(key)
+        if hit is None:
             return None
-        ts = item.get("_ts", 0)
-        if time.time() - ts > self.ttl:
-            self._data.pop(key, None)
-            self._save()
+        if not hit[1]:
+            with self._lock:
+                self._stats["misses"] += 1
             return None
-        return item.get("value")
+        return hit[0]
 
     def set(self, key: str, value: Any):
-        self._data[key] = {"_ts": time.time(), "value": value}
-        self._save()
+        item = {"_ts": time.time(), "value": value}
+        with self._lock:
+            self._remember(key, item)
+            self.storage.put(key, item)
+
+    # ---- single-flight loads ----
+    def _fill(self, key: str, loader: Callable[[], Any]) -> Any:
+        value = loader()
+        if value is not None:  # None means "do not cache" (e.g. not found)
+            self.set(key, value)
+        return value
+
+    def _served_stale(self, key: str) -> bool:
+        """Count a stale hit; True if the caller should start the refresh."""
+        with self._lock:
+            self._stats["stale"] += 1
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self._stats["refreshes"] += 1
+            return True
+
+    def _refreshed(self, key: str):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def revalidate(self, key: str, fn: Callable[[], Any]):
+        """Run fn once in the background (single-flight on key) to refresh a stale entry."""
+        if not self._served_stale(key):
+            return
+
+        def run():
+            try:
+                self.flight.do(key, fn)
+            except Exception:
+                pass  # keep serving the stale value; the next caller retries
+            finally:
+                self._refreshed(key)
+
+        threading.Thread(target=run, name="cache-refresh", daemon=True).start()
+
+    def shared_load(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """flight.do() that also counts coalesced callers."""
+        value, shared = self.flight.do(key, fn)
+        if shared:
+            with self._lock:
+                self._stats["coalesced"] += 1
+        return value, shared
+
+    def get_or_load(self, key: str, loader: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Value for key, calling loader() at most once at a time per key.
+
+        Returns (value, cached): cached is False only for the caller whose
+        loader actually ran.
+        """
+        hit = self.lookup(key)
+        if hit is not None:
+            value, fresh = hit
+            if not fresh:
+                self.revalidate(key, lambda: self._fill(key, loader))
+            return value, True
+        return self.shared_load(key, lambda: self._fill(key, loader))
+
+    async def _afill(self, key: str, aloader: Callable[[], Awaitable[Any]]) -> Any:
+        value = await aloader()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def arevalidate(self, key: str, afn: Callable[[], Awaitable[Any]]):
+        """Async revalidate(): the refresh runs as a task on the current loop."""
+        if not self._served_stale(key):
+            return
+
+        async def run():
+            try:
+                await self.flight.ado(key, afn)
+            except Exception:
+                pass
+            finally:
+                self._refreshed(key)
+
+        task = asyncio.ensure_future(run())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def ashared_load(self, key: str, afn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        value, shared = await self.flight.ado(key, afn)
+        if shared:
+            with self._lock:
+                self._stats["coalesced"] += 1
+        return value, shared
+
+    async def aget_or_load(self, key: str, aloader: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        hit = self.lookup(key)
+        if hit is not None:
+            value, fresh = hit
+            if not fresh:
+                self.arevalidate(key, lambda: self._afill(key, aloader))
+            return value, True
+        return await self.ashared_load(key, lambda: self._afill(key, aloader))
+
+    def sweep(self) -> int:
+        """Drop expired entries from both tiers; returns how many were removed."""
+        now = time.time() - self.stale_sec  # keep entries still servable as stale
+        with self._lock:
+            for key in [k for k, it in self._hot.items() if self._expired(k, it.get("_ts", 0), now)]:
+                del self._hot[key]
+        removed = self.storage.purge(self.ttl_by_ns, self.ttl, now)
+        with self._lock:
+            self._stats["expired"] += removed
+        return removed
+
+    def _sweeper(self):
+        while not self._stop.wait(self._sweep_every):
+            try:
+                self.sweep()
+            except (OSError, sqlite3.Error):
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = dict(self._stats)
+            out["hot_entries"] = len(self._hot)
+        out["max_entries"] = self.max_entries
+        out["disk_entries"] = len(self.storage)
+        served = out["hits"] + out["disk_hits"] + out["stale"]
+        lookups = served + out["misses"]
+        out["hit_rate"] = round(served / lookups, 3) if lookups else 0.0
+        return out
+
+    def close(self):
+        self._stop.set()
+        if self._sweep_thread is not None and self._sweep_thread is not threading.current_thread():
+            self._sweep_thread.join()
+        self.storage.close()
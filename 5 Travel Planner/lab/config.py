@@ -1,4 +1,6 @@
 import os
+from urllib.parse import urlsplit
+
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -7,11 +9,112 @@ GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "GEMINI").upper()
 LMSTUDIO_MODEL = os.getenv("LMSTUDIO_MODEL", "local-model")
 LMSTUDIO_BASE_URL = os.getenv("LMSTUDIO_BASE_URL", "http://localhost:1234/v1")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")  # how long the server keeps the model loaded after a call
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "300"))  # seconds; a cold model load can take a while
+HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
+HUGGINGFACE_MODEL = os.getenv("HUGGINGFACE_MODEL", "mistralai/Mistral-7B-Instruct-v0.2")
+# Per-role routing (llm_providers.py), e.g. plan on a local model and narrate the answer remotely
+PLANNER_PROVIDER = os.getenv("PLANNER_PROVIDER", "").upper()
+NARRATOR_PROVIDER = os.getenv("NARRATOR_PROVIDER", "").upper()
 
 TRANSLATE_BASE_URL = os.getenv("TRANSLATE_BASE_URL", "https://libretranslate.com")
 
 HTTP_TIMEOUT = 20
+# Shared keep-alive HTTP client (http_client.py)
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))  # hosts with a cached pool
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))          # connections kept per host
+HTTP_HTTP2 = os.getenv("HTTP_HTTP2", "0") == "1"                       # needs: pip install httpx[http2]
 MAX_STEPS_DEFAULT = 6
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))  # app_travel.py --batch: plans in flight at once
+
+# service.py: plans run at once, and requests that may wait before the service answers 429
+SERVICE_HOST = os.getenv("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8080"))
+SERVICE_WORKERS = int(os.getenv("SERVICE_WORKERS", "4"))
+SERVICE_QUEUE_SIZE = int(os.getenv("SERVICE_QUEUE_SIZE", "16"))
+
+# Batched planner actions ({"tools":[...]}) run on a shared thread pool
+MAX_PARALLEL_TOOLS = 8
+TOOL_CONCURRENCY = {"weather": 4, "wikipedia": 4, "translate": 2}  # per-tool in-flight cap
+TOOL_CONCURRENCY_DEFAULT = 4
+# arun_travel: process-wide in-flight cap per tool across all concurrent plans
+ASYNC_TOOL_CONCURRENCY = {"weather": 64, "wikipedia": 64, "translate": 8}
 
 CACHE_FILE = "cache.json"
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "log").lower()  # log (single process) | sqlite (shared by workers)
 CACHE_TTL_SEC = 600
+# weather: the cached hourly series answers "now" for whatever hour it is, so it only has to
+# follow forecast updates (hourly), not the clock
+CACHE_TTL_BY_NS = {"weather": 3600, "wiki": 24 * 3600}  # per key prefix, overrides CACHE_TTL_SEC
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "2048"))  # in-memory LRU tier
+CACHE_SWEEP_SEC = 60
+CACHE_STALE_SEC = int(os.getenv("CACHE_STALE_SEC", "300"))  # serve expired entries this long while one refresh runs
+
+# LLM response cache (llm_cache.py): off | exact (same normalized prompt) | semantic (+ similar prompts)
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "exact").lower()
+LLM_CACHE_FILE = "llm_cache.json"
+LLM_CACHE_TTL_SEC = int(os.getenv("LLM_CACHE_TTL_SEC", str(24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_THRESHOLD = float(os.getenv("LLM_CACHE_THRESHOLD", "0.92"))  # cosine similarity for a semantic hit
+# llm_client.generate_batch / agenerate_batch: prompts in flight at once
+LLM_BATCH_CONCURRENCY = int(os.getenv("LLM_BATCH_CONCURRENCY", "4"))
+
+
+def _env_table(var: str, defaults: dict, cast=float, upper: bool = False) -> dict:
+    """defaults overridden by an env var of the form "name=value,name=value"."""
+    table = dict(defaults)
+    for item in filter(None, os.getenv(var, "").split(",")):
+        name, _, value = item.partition("=")
+        name = name.strip()
+        table[name.upper() if upper else name] = cast(value)
+    return table
+
+
+# Rate limits (rate_limit.py): requests per minute (0 = unlimited) and most calls in flight, which
+# adapts (AIMD) below the cap on 429/5xx/timeouts or calls slower than the latency target.
+# Override any table with e.g. LLM_RPM="GEMINI=60,OPENAI=500" or UPSTREAM_CONCURRENCY="wikipedia=16".
+LLM_RPM = _env_table("LLM_RPM", {"GEMINI": 15}, upper=True)
+LLM_CONCURRENCY = _env_table("LLM_CONCURRENCY", {"GEMINI": 4, "OPENAI": 8, "HUGGINGFACE": 4, "LMSTUDIO": 2,
+                                                  "OLLAMA": 4}, cast=int, upper=True)
+# HTTP upstreams, named by host (a host also matches its subdomains)
+UPSTREAM_HOSTS = {"open-meteo.com": "open-meteo", "wikipedia.org": "wikipedia", "newsapi.org": "newsapi",
+                  urlsplit(TRANSLATE_BASE_URL).hostname or "libretranslate.com": "translate"}
+UPSTREAM_RPM = _env_table("UPSTREAM_RPM", {"open-meteo": 600, "wikipedia": 200, "newsapi": 30, "translate": 20})
+UPSTREAM_CONCURRENCY = _env_table("UPSTREAM_CONCURRENCY", {"open-meteo": 8, "wikipedia": 8, "newsapi": 2,
+                                                           "translate": 2}, cast=int)
+UPSTREAM_LATENCY_MS = _env_table("UPSTREAM_LATENCY_MS", {"open-meteo": 2000, "wikipedia": 2000, "newsapi": 3000,
+                                                         "translate": 5000})
+
+# Fail fast (resilience.py): a plan's tool calls share one deadline; an upstream that fails
+# BREAKER_FAILURES times in a row is skipped for BREAKER_RESET_SEC (then probed once)
+PLAN_DEADLINE_SEC = float(os.getenv("PLAN_DEADLINE_SEC", "90"))
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_RESET_SEC = float(os.getenv("BREAKER_RESET_SEC", "30"))
+# Hedged GETs: if no reply after the upstream's recent p95 latency, send a second copy and take the
+# first answer (idempotent GETs only; needs HEDGE_MIN_SAMPLES timings first). HTTP_HEDGE="" turns it off.
+HEDGE_UPSTREAMS = set(filter(None, os.getenv("HTTP_HEDGE", "open-meteo,wikipedia").split(",")))
+HEDGE_MIN_MS = float(os.getenv("HEDGE_MIN_MS", "50"))
+HEDGE_MIN_SAMPLES = 20
+
+# Fast path (fast_path.py): a recognized query (known cities + trip length, or the weather in known
+# cities) skips the planner steps; its tools run at once and one LLM call writes the answer
+FAST_PATH = os.getenv("FAST_PATH", "1") == "1"
+
+# Gazetteer (gazetteer.py): a GeoNames dump (e.g. cities15000.zip) compiled into GAZETTEER_INDEX
+# (memory-mapped) on first use; without it the tools know the built-in workshop cities only
+GAZETTEER_FILE = os.getenv("GAZETTEER_FILE", "")
+GAZETTEER_INDEX = os.getenv("GAZETTEER_INDEX", "gazetteer.idx")
+# "lat,lon" given as a city resolves to the nearest place at most this far away (else: unknown)
+GAZETTEER_SNAP_KM = float(os.getenv("GAZETTEER_SNAP_KM", "50"))
+
+# Hourly forecast kept per city (forecast.py): days from today that trip-day questions can reach (max 16)
+FORECAST_DAYS = max(1, min(16, int(os.getenv("FORECAST_DAYS", "7"))))
+
+# Planner prompt budget (context_manager.py): older observations are shortened, then dropped, past this
+CONTEXT_BUDGET_TOKENS = int(os.getenv("CONTEXT_BUDGET_TOKENS", "3000"))
+CONTEXT_KEEP_RECENT = 2  # latest turns always kept verbatim
@@ -0,0 +1,223 @@
+"""Response cache for llm_client.generate_text / agenerate_text.
+
+Exact mode: the key is a hash of provider, model, temperature and the
+normalized prompt (Unicode NFKC, case-folded, whitespace collapsed), so
+re-running the same plan step skips the LLM call. Entries live in a
+JsonCache under the "llm:" namespace: LRU hot tier, TTL, persisted to
+llm_cache.log (or .sqlite3), and concurrent identical prompts share one call.
+
+Semantic mode adds a local vector index: each prompt (or the shorter
+semantic_text the caller passes, e.g. just the conversation without the
+fixed system prompt) is embedded as a hashed bag of words and character
+trigrams. A miss on the exact key returns the cached response of the most
+similar earlier prompt when cosine similarity >= threshold and both texts
+contain the same numbers ("3-day" vs "5-day" never match) and the same names:
+places the gazetteer finds plus capitalized words mid-sentence, so "3-day trip
+to Kyoto" never answers "3-day trip to Paris" (a one-word change the vector
+barely sees). The index is in-memory, per provider/model/temperature, and
+LRU-bounded.
+"""
+import hashlib
+import math
+import operator
+import re
+import threading
+import unicodedata
+import zlib
+from array import array
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Optional, Tuple
+
+import gazetteer
+from cache import JsonCache
+
+_WORD = re.compile(r"\w+")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+_PROPER = re.compile(r"(?<=[a-z,] )[A-Z][\w'-]*")  # capitalized after a lowercase word: "trip to Kyoto"
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return " ".join(text.split())
+
+
+def names(text: str) -> FrozenSet[str]:
+    """Places and proper nouns in text (original casing), case-folded."""
+    found = {p.key for p in gazetteer.get().mentions(text or "", limit=50)}
+    found.update(w.casefold() for w in _PROPER.findall(text or ""))
+    return frozenset(found)
+
+
+def embed(text: str, dims: int = 256) -> array:
+    """L2-normalized hashed bag of words + in-word character trigrams."""
+    vec = array("f", bytes(4 * dims))
+    for word in _WORD.findall(text):
+        vec[zlib.crc32(word.encode()) % dims] += 1.0
+        padded = f"#{word}#"
+        for i in range(len(padded) - 2):
+            vec[zlib.crc32(padded[i:i + 3].encode()) % dims] += 0.5
+    norm = math.sqrt(sum(v * v for v in vec))
+    if norm:
+        for i in range(dims):
+            vec[i] /= norm
+    return vec
+
+
+class LLMCache:
+    def __init__(self, path: str, mode: str = "exact", ttl_sec: int = 24 * 3600,
+                 max_entries: int = 1024, threshold: float = 0.92, dims: int = 256,
+                 backend: str = "log", sweep_sec: float = 60):
+        self.mode = mode
+        self.threshold = threshold
+        self.dims = dims
+        self.max_entries = max_entries
+        self.store = JsonCache(path, ttl_sec=ttl_sec, backend=backend, max_entries=max_entries,
+                               ttl_by_ns={"llm": ttl_sec}, sweep_sec=sweep_sec)
+        self._lock = threading.Lock()
+        # bucket -> key -> (vector, numbers in the text, names in the text)
+        self._index: Dict[str, "OrderedDict[str, Tuple[array, FrozenSet[str], FrozenSet[str]]]"] = {}
+        self._stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
+
+    @staticmethod
+    def _bucket(provider: str, model: str, temperature: float) -> str:
+        return f"{provider}|{model}|{temperature:g}"
+
+    def key(self, provider: str, model: str, temperature: float, prompt: str) -> str:
+        digest = hashlib.sha256(
+            f"{self._bucket(provider, model, temperature)}\n{normalize(prompt)}".encode("utf-8")).hexdigest()
+        return f"llm:{digest}"
+
+    # ---- vector index ----
+    def _features(self, text: str) -> Tuple[array, FrozenSet[str], FrozenSet[str]]:
+        folded = normalize(text)
+        return embed(folded, self.dims), frozenset(_NUMBER.findall(folded)), names(text)
+
+    def _nearest(self, bucket: str, vec: array, numbers: FrozenSet[str],
+                 names: FrozenSet[str]) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            entries = list(self._index.get(bucket, {}).items())
+        best, best_sim = None, self.threshold
+        for key, (other, other_numbers, other_names) in entries:
+            if other_numbers != numbers or other_names != names:
+                continue
+            sim = sum(map(operator.mul, vec, other))
+            if sim >= best_sim:
+                best, best_sim = key, sim
+        return (best, best_sim) if best else None
+
+    def _add(self, bucket: str, key: str, features: Tuple[array, FrozenSet[str], FrozenSet[str]]):
+        with self._lock:
+            entries = self._index.setdefault(bucket, OrderedDict())
+            entries[key] = features
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def _forget(self, bucket: str, key: str):
+        with self._lock:
+            self._index.get(bucket, {}).pop(key, None)
+
+    def _semantic_hit(self, bucket: str, features) -> Optional[str]:
+        match = self._nearest(bucket, *features)
+        if match is None:
+            return None
+        value = self.store.get(match[0])
+        if value is None:  # expired or evicted from the store
+            self._forget(bucket, match[0])
+            return None
+        with self._lock:
+            entries = self._index.get(bucket, {})
+            if match[0] in entries:  # put() may have evicted it since _nearest
+                entries.move_to_end(match[0])
+        return value
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    # ---- lookups ----
+    def get(self, provider: str, model: str, temperature: float, prompt: str,
+            semantic_text: Optional[str] = None) -> Optional[str]:
+        """Cached response (exact key, then a similar prompt in semantic mode) or None."""
+        value = self.store.get(self.key(provider, model, temperature, prompt))
+        if value is not None:
+            self._count("exact_hits")
+            return value
+        if self.mode == "semantic":
+            value = self._semantic_hit(self._bucket(provider, model, temperature),
+                                       self._features(semantic_text or prompt))
+            if value is not None:
+                self._count("semantic_hits")
+                return value
+        self._count("misses")
+        return None
+
+    def put(self, provider: str, model: str, temperature: float, prompt: str, text: str,
+            semantic_text: Optional[str] = None):
+        """Store a response produced outside get_or_generate (e.g. a finished stream)."""
+        if not text:
+            return
+        key = self.key(provider, model, temperature, prompt)
+        self.store.set(key, text)
+        if self.mode == "semantic":
+            self._add(self._bucket(provider, model, temperature), key, self._features(semantic_text or prompt))
+
+    def get_or_generate(self, provider: str, model: str, temperature: float, prompt: str,
+                        generate: Callable[[], str], semantic_text: Optional[str] = None) -> str:
+        key = self.key(provider, model, temperature, prompt)
+        features = bucket = None
+        if self.mode == "semantic":
+            value = self.store.get(key)
+            if value is not None:
+                self._count("exact_hits")
+                return value
+            bucket = self._bucket(provider, model, temperature)
+            features = self._features(semantic_text or prompt)
+            value = self._semantic_hit(bucket, features)
+            if value is not None:
+                self._count("semantic_hits")
+                return value
+        value, cached = self.store.get_or_load(key, lambda: generate() or None)
+        self._count("exact_hits" if cached else "misses")
+        if features is not None and value is not None:
+            self._add(bucket, key, features)
+        return value
+
+    async def aget_or_generate(self, provider: str, model: str, temperature: float, prompt: str,
+                               agenerate: Callable[[], Awaitable[str]],
+                               semantic_text: Optional[str] = None) -> str:
+        key = self.key(provider, model, temperature, prompt)
+        features = bucket = None
+        if self.mode == "semantic":
+            value = self.store.get(key)
+            if value is not None:
+                self._count("exact_hits")
+                return value
+            bucket = self._bucket(provider, model, temperature)
+            features = self._features(semantic_text or prompt)
+            value = self._semantic_hit(bucket, features)
+            if value is not None:
+                self._count("semantic_hits")
+                return value
+
+        async def load():
+            return (await agenerate()) or None
+
+        value, cached = await self.store.aget_or_load(key, load)
+        self._count("exact_hits" if cached else "misses")
+        if features is not None and value is not None:
+            self._add(bucket, key, features)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            out["indexed"] = sum(len(v) for v in self._index.values())
+        lookups = out["exact_hits"] + out["semantic_hits"] + out["misses"]
+        out["hit_rate"] = round((lookups - out["misses"]) / lookups, 3) if lookups else 0.0
+        out["mode"] = self.mode
+        out["store"] = self.store.stats()
+        return out
+
+    def close(self):
+        self.store.close()
@@ -1,21 +1,117 @@
-from config import GOOGLE_API_KEY, LLM_PROVIDER, LMSTUDIO_BASE_URL, LMSTUDIO_MODEL
-
-if LLM_PROVIDER == "LMSTUDIO":
-    from openai import OpenAI
-    _client = OpenAI(base_url=LMSTUDIO_BASE_URL, api_key="lm-studio")
-    def generate_text(prompt: str, temperature: float = 0.3) -> str:
-        resp = _client.chat.completions.create(
-            model=LMSTUDIO_MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=temperature,
-        )
-        return resp.choices[0].message.content
-else:
-    import google.generativeai as genai
-    if not GOOGLE_API_KEY:
-        raise ValueError("GOOGLE_API_KEY is not set. Put it in .env or export it.")
-    genai.configure(api_key=GOOGLE_API_KEY)
-    _model = genai.GenerativeModel("gemini-1.5-flash")
-    def generate_text(prompt: str, temperature: float = 0.3) -> str:
-        resp = _model.generate_content(prompt)
-        return resp.text
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
+
+from config import (CACHE_BACKEND, CACHE_SWEEP_SEC, LLM_BATCH_CONCURRENCY, LLM_CACHE_FILE, LLM_CACHE_MAX_ENTRIES,
+                    LLM_CACHE_MODE, LLM_CACHE_THRESHOLD, LLM_CACHE_TTL_SEC, LLM_CONCURRENCY, LLM_PROVIDER, LLM_RPM,
+                    NARRATOR_PROVIDER, PLANNER_PROVIDER)
+from llm_providers import ProviderRegistry
+from rate_limit import RateLimits
+
+# Backends are looked up per call (see llm_providers.py): provider= names one
+# explicitly, role= ("planner", "narrator") follows PLANNER_/NARRATOR_PROVIDER,
+# otherwise LLM_PROVIDER. SDKs and the response cache load on first use.
+registry = ProviderRegistry(LLM_PROVIDER, {"planner": PLANNER_PROVIDER, "narrator": NARRATOR_PROVIDER})
+# Requests/minute (LLM_RPM) and adaptive calls in flight (LLM_CONCURRENCY) per provider; only
+# calls that miss the response cache wait here. Quota/429 errors shrink that provider's window.
+limits = RateLimits(LLM_RPM, concurrency=LLM_CONCURRENCY)
+
+_lock = threading.Lock()
+_response_cache = None
+_cache_ready = False
+
+
+def response_cache():
+    """Response cache (LLM_CACHE_MODE=off|exact|semantic, see llm_cache.py), or None when off."""
+    global _response_cache, _cache_ready
+    if not _cache_ready:
+        with _lock:
+            if not _cache_ready:
+                if LLM_CACHE_MODE != "off":
+                    from llm_cache import LLMCache
+                    _response_cache = LLMCache(LLM_CACHE_FILE, mode=LLM_CACHE_MODE, ttl_sec=LLM_CACHE_TTL_SEC,
+                                               max_entries=LLM_CACHE_MAX_ENTRIES, threshold=LLM_CACHE_THRESHOLD,
+                                               backend=CACHE_BACKEND, sweep_sec=CACHE_SWEEP_SEC)
+                _cache_ready = True
+    return _response_cache
+
+
+def generate_text(prompt: str, temperature: float = 0.3, semantic_text: Optional[str] = None,
+                  provider: Optional[str] = None, role: Optional[str] = None) -> str:
+    """semantic_text: the part of the prompt to compare in semantic mode (default: all of it).
+    provider/role: which backend answers this call (see registry)."""
+    llm, cache = registry.get(provider, role), response_cache()
+
+    def call() -> str:
+        finish = limits.begin(llm.name)
+        try:
+            text = llm.generate(prompt, temperature)
+        except Exception as e:
+            finish(error=e)
+            raise
+        finish()
+        return text
+
+    if cache is None:
+        return call()
+    return cache.get_or_generate(llm.name, llm.model, temperature, prompt, call, semantic_text)
+
+async def agenerate_text(prompt: str, temperature: float = 0.3, semantic_text: Optional[str] = None,
+                         provider: Optional[str] = None, role: Optional[str] = None) -> str:
+    llm, cache = registry.get(provider, role), response_cache()
+
+    async def call() -> str:
+        finish = await limits.abegin(llm.name)
+        try:
+            text = await llm.agenerate(prompt, temperature)
+        except Exception as e:
+            finish(error=e)
+            raise
+        finish()
+        return text
+
+    if cache is None:
+        return await call()
+    return await cache.aget_or_generate(llm.name, llm.model, temperature, prompt, call, semantic_text)
+
+def stream_text(prompt: str, temperature: float = 0.3, semantic_text: Optional[str] = None,
+                provider: Optional[str] = None, role: Optional[str] = None) -> Iterator[str]:
+    """Yield the response in chunks as the model produces them (a cached response is one chunk)."""
+    llm, cache = registry.get(provider, role), response_cache()
+    if cache is not None:
+        cached = cache.get(llm.name, llm.model, temperature, prompt, semantic_text)
+        if cached is not None:
+            yield cached
+            return
+    finish = limits.begin(llm.name)
+    parts = []
+    try:
+        for piece in llm.stream(prompt, temperature):
+            parts.append(piece)
+            yield piece
+    except Exception as e:
+        finish(error=e)
+        raise
+    finally:
+        finish()  # no-op after an error; also frees the slot if the caller stops early
+    if cache is not None:
+        cache.put(llm.name, llm.model, temperature, prompt, "".join(parts), semantic_text)
+
+def generate_batch(prompts: List[str], temperature: float = 0.3, provider: Optional[str] = None,
+                   role: Optional[str] = None, concurrency: int = LLM_BATCH_CONCURRENCY) -> List[str]:
+    """generate_text for many prompts, up to `concurrency` in flight on the shared client; results in order."""
+    if not prompts:
+        return []
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(prompts)), thread_name_prefix="llm-batch") as pool:
+        return list(pool.map(lambda p: generate_text(p, temperature, provider=provider, role=role), prompts))
+
+async def agenerate_batch(prompts: List[str], temperature: float = 0.3, provider: Optional[str] = None,
+                          role: Optional[str] = None, concurrency: int = LLM_BATCH_CONCURRENCY) -> List[str]:
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(prompt: str) -> str:
+        async with sem:
+            return await agenerate_text(prompt, temperature, provider=provider, role=role)
+
+    return list(await asyncio.gather(*(one(p) for p in prompts)))
@@ -0,0 +1,254 @@
+"""Token buckets that space out calls to rate-limited upstreams.
+
+TokenBucket(rate, burst): `rate` tokens per second refill up to `burst`.
+acquire()/aacquire() take one token, waiting if the bucket is empty (up to
+max_wait). Each
+caller reserves its token up front (the count may go negative), so waiters
+are served in arrival order and never wake up together to race for one token.
+
+AdaptiveLimit caps calls in flight with AIMD (as TCP congestion control
+does): every call that finishes fine and fast adds 1/limit, so the cap grows
+by one per full window; a 429, a 5xx, a timeout or a call slower than the
+latency target halves it (0.9x for slowness). Calls that started before the
+last cut do not cut again, so one burst of failures counts once.
+
+RateLimits keeps one bucket and, optionally, one adaptive limit per name (an
+LLM provider, an upstream API) from requests-per-minute and max-concurrency
+tables; names without a limit are not throttled. begin()/abegin() wait for
+both (at most max_wait, e.g. a caller's deadline) and return a
+finish(status, error, retry_after) callback that feeds the outcome back; a
+Retry-After from the upstream also pauses its bucket.
+"""
+import asyncio
+import collections
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float = 1):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.waited_s = 0.0
+
+    def _reserve(self, max_wait: Optional[float] = None) -> Optional[float]:
+        """Take a token; return how long the caller must wait before using it
+        (None, and no token taken, if that is longer than max_wait)."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            wait = (1 - self._tokens) / self.rate
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens -= 1
+            self.waits += 1
+            self.waited_s += wait
+            return wait
+
+    def acquire(self, max_wait: Optional[float] = None) -> bool:
+        wait = self._reserve(max_wait)
+        if wait:
+            time.sleep(wait)
+        return wait is not None
+
+    async def aacquire(self, max_wait: Optional[float] = None) -> bool:
+        wait = self._reserve(max_wait)
+        if wait:
+            await asyncio.sleep(wait)
+        return wait is not None
+
+    def pause(self, seconds: float):
+        """Hand out no tokens for `seconds` (the upstream asked us to back off)."""
+        with self._lock:
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+class AdaptiveLimit:
+    def __init__(self, max_limit: int, min_limit: int = 1, latency_target_ms: Optional[float] = None):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.latency_target_ms = latency_target_ms
+        self.limit = float(self.max_limit)  # start open; the first overload signal brings it down
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._waiters: collections.deque = collections.deque()  # threading.Event or (loop, future), FIFO
+        self._last_cut = 0.0
+        self.cuts = 0
+        self.waits = 0
+
+    def _grant_locked(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if isinstance(waiter, threading.Event):
+                self.in_flight += 1
+                waiter.set()
+            else:
+                loop, fut = waiter
+                if fut.done():  # cancelled while waiting
+                    continue
+                self.in_flight += 1
+                loop.call_soon_threadsafe(_resolve, fut, self)
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        with self._lock:
+            if not self._waiters and self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            event = threading.Event()
+            self._waiters.append(event)
+            self.waits += 1
+        if event.wait(timeout):
+            return True
+        with self._lock:
+            if event.is_set():  # granted just as the wait timed out
+                return True
+            self._waiters.remove(event)
+        return False
+
+    async def aacquire(self, timeout: Optional[float] = None) -> bool:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if not self._waiters and self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            fut = loop.create_future()
+            self._waiters.append((loop, fut))
+            self.waits += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return not fut.cancel()  # cancel() fails only if the slot was handed over meanwhile
+        except asyncio.CancelledError:
+            if not fut.cancel():
+                self.release(started=None, ok=True)
+            raise
+
+    def release(self, started: Optional[float], ok: bool, latency_ms: Optional[float] = None):
+        """Free a slot and adjust the limit; ok=False is an overload signal (429, 5xx, timeout)."""
+        with self._lock:
+            self.in_flight -= 1
+            slow = ok and self.latency_target_ms and latency_ms is not None and latency_ms > self.latency_target_ms
+            if started is not None and (not ok or slow):
+                if started >= self._last_cut:
+                    self.limit = max(self.min_limit, self.limit * (0.9 if slow else 0.5))
+                    self._last_cut = time.monotonic()
+                    self.cuts += 1
+            elif started is not None:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._grant_locked()
+
+
+def _resolve(fut: "asyncio.Future", limit: AdaptiveLimit):
+    if fut.cancelled():  # cancelled after the grant was scheduled: give the slot back
+        limit.release(started=None, ok=True)
+    else:
+        fut.set_result(None)
+
+
+def _left(max_wait: Optional[float], started: float) -> Optional[float]:
+    return None if max_wait is None else max(0.0, max_wait - (time.monotonic() - started))
+
+
+OVERLOAD_STATUS = {429, 502, 503, 504}
+
+
+def is_overload(status: Optional[int] = None, error: Optional[BaseException] = None) -> bool:
+    """429/5xx responses, timeouts, and SDK errors that mention a rate limit or quota."""
+    if status is not None:
+        return status in OVERLOAD_STATUS or status >= 500
+    if error is None:
+        return False
+    if isinstance(error, TimeoutError) or "timeout" in type(error).__name__.lower():
+        return True
+    text = f"{type(error).__name__} {error}".lower()
+    return any(word in text for word in ("429", "rate limit", "ratelimit", "quota", "resourceexhausted",
+                                         "too many requests", "overloaded", "503"))
+
+
+class RateLimits:
+    def __init__(self, per_minute: Dict[str, float], burst_sec: float = 10,
+                 concurrency: Optional[Dict[str, int]] = None, latency_ms: Optional[Dict[str, float]] = None):
+        """per_minute: name -> requests/minute (0 or missing = unlimited); bursts cover burst_sec.
+        concurrency: name -> most calls in flight (AIMD moves below it); latency_ms: name -> slow-call target."""
+        self._buckets: Dict[str, TokenBucket] = {}
+        for name, rpm in per_minute.items():
+            if rpm and rpm > 0:
+                rate = rpm / 60.0
+                self._buckets[name] = TokenBucket(rate, burst=rate * burst_sec)
+        self._adaptive: Dict[str, AdaptiveLimit] = {
+            name: AdaptiveLimit(n, latency_target_ms=(latency_ms or {}).get(name))
+            for name, n in (concurrency or {}).items() if n and n > 0}
+
+    def bucket(self, name: str) -> Optional[TokenBucket]:
+        return self._buckets.get(name)
+
+    def adaptive(self, name: str) -> Optional[AdaptiveLimit]:
+        return self._adaptive.get(name)
+
+    def acquire(self, name: str):
+        bucket = self._buckets.get(name)
+        if bucket is not None:
+            bucket.acquire()
+
+    async def aacquire(self, name: str):
+        bucket = self._buckets.get(name)
+        if bucket is not None:
+            await bucket.aacquire()
+
+    def _finisher(self, bucket: Optional[TokenBucket], limit: Optional[AdaptiveLimit]):
+        started = time.monotonic()
+        done = False
+
+        def finish(status: Optional[int] = None, error: Optional[BaseException] = None,
+                   retry_after: Optional[float] = None):
+            nonlocal done
+            if done:
+                return
+            done = True
+            if retry_after and bucket is not None:
+                bucket.pause(retry_after)
+            if limit is not None:
+                latency_ms = (time.monotonic() - started) * 1000
+                limit.release(started, ok=not is_overload(status, error), latency_ms=latency_ms)
+
+        return finish
+
+    def begin(self, name: str, max_wait: Optional[float] = None) -> Optional[Callable[..., None]]:
+        """Wait for a token and a slot for `name`; call the returned finish(...) when the call is over.
+        Returns None, holding nothing, if that would take longer than max_wait seconds."""
+        bucket, limit = self._buckets.get(name), self._adaptive.get(name)
+        started = time.monotonic()
+        if bucket is not None and not bucket.acquire(max_wait):
+            return None
+        if limit is not None and not limit.acquire(_left(max_wait, started)):
+            return None  # the bucket token is spent; the call that used it just did not happen
+        return self._finisher(bucket, limit)
+
+    async def abegin(self, name: str, max_wait: Optional[float] = None) -> Optional[Callable[..., None]]:
+        bucket, limit = self._buckets.get(name), self._adaptive.get(name)
+        started = time.monotonic()
+        if bucket is not None and not await bucket.aacquire(max_wait):
+            return None
+        if limit is not None and not await limit.aacquire(_left(max_wait, started)):
+            return None
+        return self._finisher(bucket, limit)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {}
+        for name, b in self._buckets.items():
+            out[name] = {"rpm": round(b.rate * 60, 1), "waits": b.waits, "waited_s": round(b.waited_s, 2)}
+        for name, a in self._adaptive.items():
+            out.setdefault(name, {"waits": 0}).update(
+                concurrency=round(a.limit, 2), max_concurrency=a.max_limit, in_flight=a.in_flight,
+                slot_waits=a.waits, cuts=a.cuts)
+        return out
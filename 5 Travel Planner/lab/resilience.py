@@ -0,0 +1,133 @@
+"""Fail fast instead of waiting on an unhealthy upstream.
+
+- Deadlines: `with deadline(time.monotonic() + 30): ...` sets a deadline in a
+  contextvar. http_client clips every request timeout to the time left and
+  raises DeadlineExceeded once it has passed. Context variables follow asyncio
+  tasks; thread pools need `contextvars.copy_context().run`.
+- Circuit breakers: one per upstream. After BREAKER_FAILURES failures in a row
+  (transport error, timeout, 429/5xx) the breaker opens, and calls raise
+  UpstreamUnavailable at once for BREAKER_RESET_SEC. Then one probe call is let
+  through: success closes the breaker, failure opens it again.
+- error_observation() turns either exception into a structured tool
+  observation the planner can act on (skip the tool, finalize with what it has).
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from config import BREAKER_FAILURES, BREAKER_RESET_SEC
+
+
+class UpstreamUnavailable(Exception):
+    def __init__(self, upstream: str, retry_in: float):
+        super().__init__(f"{upstream} is unavailable (circuit open), retry in {retry_in:.0f}s")
+        self.upstream = upstream
+        self.retry_in = retry_in
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+# ---- deadlines ----
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+@contextmanager
+def deadline(at: Optional[float]):
+    """Calls in this block must finish by time.monotonic() == at (None = no deadline; an outer one still holds)."""
+    outer = _deadline.get()
+    token = _deadline.set(at if outer is None else (outer if at is None else min(at, outer)))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None without one."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def clip_timeout(timeout: float) -> float:
+    """timeout, shortened to the time left; raises DeadlineExceeded when none is left."""
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("deadline exceeded before the request was sent")
+    return min(timeout, left)
+
+
+# ---- circuit breakers ----
+class CircuitBreaker:
+    def __init__(self, name: str, failures: int = BREAKER_FAILURES, reset_sec: float = BREAKER_RESET_SEC):
+        self.name = name
+        self.max_failures = failures
+        self.reset_sec = reset_sec
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self.rejected = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before(self):
+        """Raise UpstreamUnavailable while open; in half-open state only one probe goes through."""
+        with self._lock:
+            if self.state == "closed":
+                return
+            retry_in = self.opened_at + self.reset_sec - time.monotonic()
+            if self.state == "open" and retry_in <= 0:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return
+            self.rejected += 1
+        raise UpstreamUnavailable(self.name, max(retry_in, 1.0))
+
+    def record(self, ok: Optional[bool]):
+        """Outcome of a call let through by before(); None = says nothing about the upstream."""
+        with self._lock:
+            probe, self._probing = self._probing, False
+            if ok is None or (self.state == "open" and not probe):
+                return  # no signal, or a straggler that started before the breaker opened
+            if ok:
+                self.state, self.failures = "closed", 0
+                return
+            self.failures += 1
+            if probe or self.failures >= self.max_failures:
+                if self.state != "open":
+                    self.opens += 1
+                self.state, self.opened_at = "open", time.monotonic()
+
+
+class Breakers:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(name, CircuitBreaker(name))
+        return breaker
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: {"state": b.state, "failures": b.failures, "opens": b.opens, "rejected": b.rejected}
+                for name, b in self._breakers.items()}
+
+
+def error_observation(tool: str, error: BaseException) -> Optional[Dict[str, Any]]:
+    """Structured observation for a fail-fast error, or None for other exceptions."""
+    if isinstance(error, UpstreamUnavailable):
+        return {"error": f"Tool {tool} skipped: {error}", "error_type": "upstream_unavailable",
+                "upstream": error.upstream, "retry_in_s": round(error.retry_in)}
+    if isinstance(error, DeadlineExceeded):
+        return {"error": f"Tool {tool} skipped: the plan's time budget is used up", "error_type": "deadline_exceeded"}
+    return None
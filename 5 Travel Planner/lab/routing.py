@@ -0,0 +1,146 @@
+"""Distances and visiting order for multi-city trips (the distance_matrix and route_order tools).
+
+- distance_matrix(lats, lons): all pairwise great-circle distances (km) in one
+  vectorized haversine over NumPy arrays: an N x N ndarray. Without NumPy
+  (it is optional, see requirements.txt) it returns a list of rows computed
+  in pure Python.
+- solve_route(matrix): a short path through every city, starting at the
+  first one. A nearest-neighbour tour improved by 2-opt (reverse any segment
+  that makes the path shorter, until none does). With NumPy, each 2-opt pass
+  scores all segment ends for one start in a single array expression, so
+  1000 cities take well under a second.
+  round_trip=True returns to the start; otherwise the path ends anywhere.
+
+NumPy is imported on the first call, so importing this module stays cheap.
+"""
+import math
+from typing import List, Sequence, Tuple
+
+EARTH_RADIUS_KM = 6371.0
+_MAX_PASSES = 100  # 2-opt passes; each pass only runs if the previous one improved the path
+
+_numpy = None
+
+
+def _np():
+    """numpy, or None when it is not installed."""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy or None
+
+
+def distance_matrix(lats: Sequence[float], lons: Sequence[float]):
+    """Pairwise haversine distances in km (ndarray with NumPy, else a list of rows)."""
+    np = _np()
+    if np is not None:
+        lat, lon = np.radians(np.asarray(lats, dtype=np.float64)), np.radians(np.asarray(lons, dtype=np.float64))
+        h = (np.sin((lat[:, None] - lat[None, :]) / 2) ** 2
+             + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin((lon[:, None] - lon[None, :]) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+    lat, lon = [math.radians(x) for x in lats], [math.radians(x) for x in lons]
+    cos = [math.cos(x) for x in lat]
+    rows = []
+    for i in range(len(lat)):
+        row = []
+        for j in range(len(lat)):
+            h = math.sin((lat[i] - lat[j]) / 2) ** 2 + cos[i] * cos[j] * math.sin((lon[i] - lon[j]) / 2) ** 2
+            row.append(2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, h))))
+        rows.append(row)
+    return rows
+
+
+def rounded_rows(matrix) -> List[List[int]]:
+    """The matrix as lists of whole km (JSON-ready)."""
+    if isinstance(matrix, list):
+        return [[round(km) for km in row] for row in matrix]
+    return _np().rint(matrix).astype(int).tolist()
+
+
+def path_km(matrix, order: Sequence[int], round_trip: bool = False) -> float:
+    legs = list(zip(order, order[1:])) + ([(order[-1], order[0])] if round_trip and len(order) > 1 else [])
+    return float(sum(matrix[a][b] for a, b in legs))
+
+
+def _nearest_neighbour(matrix, n: int) -> List[int]:
+    np = _np()
+    order, left = [0], set(range(1, n))
+    if np is not None and not isinstance(matrix, list):
+        unvisited = np.ones(n, dtype=bool)
+        unvisited[0] = False
+        for _ in range(n - 1):
+            row = np.where(unvisited, matrix[order[-1]], np.inf)
+            nxt = int(row.argmin())
+            unvisited[nxt] = False
+            order.append(nxt)
+        return order
+    while left:
+        here = matrix[order[-1]]
+        nxt = min(left, key=here.__getitem__)
+        left.remove(nxt)
+        order.append(nxt)
+    return order
+
+
+def _two_opt(matrix, order: List[int], round_trip: bool) -> List[int]:
+    """Reverse order[i..j] while that shortens the path; city 0 stays first.
+
+    The path is closed with a sentinel so both cases share one formula: back to
+    the start for a round trip, or an extra node at distance 0 from every city
+    for an open path (so the last leg costs nothing to change)."""
+    n = len(order)
+    if n < 4 - (0 if round_trip else 1):
+        return order
+    np = _np()
+    if np is not None and not isinstance(matrix, list):
+        if round_trip:
+            dist, path = matrix, np.array(order + [order[0]])
+        else:
+            dist = np.zeros((n + 1, n + 1))
+            dist[:n, :n] = matrix
+            path = np.array(order + [n])
+        for _ in range(_MAX_PASSES):
+            improved = False
+            for i in range(1, n - 1):
+                a, b = path[i - 1], path[i]
+                c, d = path[i + 1:n], path[i + 2:n + 1]  # segment ends j = i+1 .. n-1 and what follows
+                delta = dist[a, c] + dist[b, d] - dist[a, b] - dist[c, d]
+                k = int(delta.argmin())
+                if delta[k] < -1e-9:
+                    j = i + 1 + k
+                    path[i:j + 1] = path[i:j + 1][::-1].copy()
+                    improved = True
+            if not improved:
+                break
+        return [int(x) for x in path[:n]]
+    if round_trip:
+        dist, path = matrix, order + [order[0]]
+    else:
+        dist = [row + [0.0] for row in matrix] + [[0.0] * (n + 1)]
+        path = order + [n]
+    for _ in range(_MAX_PASSES):
+        improved = False
+        for i in range(1, n - 1):
+            for j in range(i + 1, n):
+                a, b, c, d = path[i - 1], path[i], path[j], path[j + 1]
+                if dist[a][c] + dist[b][d] - dist[a][b] - dist[c][d] < -1e-9:
+                    path[i:j + 1] = path[i:j + 1][::-1]
+                    improved = True
+        if not improved:
+            break
+    return path[:n]
+
+
+def solve_route(matrix, round_trip: bool = False) -> Tuple[List[int], float, float]:
+    """(order, km, nearest-neighbour km): a short path through every city of matrix, from city 0."""
+    n = len(matrix)
+    if n == 0:
+        return [], 0.0, 0.0
+    order = _nearest_neighbour(matrix, n)
+    first_km = path_km(matrix, order, round_trip)
+    order = _two_opt(matrix, list(order), round_trip)
+    return order, path_km(matrix, order, round_trip), first_km
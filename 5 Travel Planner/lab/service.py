@@ -0,0 +1,344 @@
+"""Long-running HTTP service for the travel planner (standard library only).
+
+    python service.py --port 8080 --workers 4 --queue 16
+
+    POST /plan     {"query": "...", "max_steps": 6, "translate": "tl", "deadline_s": 30, "fast": true}
+                   -> 200 {"answer": "...", "trace": [...]}
+                   With "Accept: text/event-stream" (or /plan?stream=1) the reply is
+                   Server-Sent Events: one event per trace record (user, fast_path,
+                   planner, observation, narrator, final), "token" events while the
+                   answer is being written, then "done" (or "error").
+                   "fast": false always plans step by step (no fast_path.py shortcut).
+    GET  /metrics  Prometheus text: requests, queue depth, in-flight plans, latency,
+                   upstream HTTP, LLM cache, rate-limit waits, adaptive concurrency
+                   limits and fast-path hits.
+    GET  /healthz  "ok"
+
+Requests go into a bounded queue served by a fixed pool of worker threads, so
+at most --workers plans run at once. When the queue is full the service
+answers 429 with a Retry-After estimate instead of piling up work. The tool
+cache, HTTP pool and LLM clients are process-wide and warmed at start-up, so
+a request only pays for its own LLM and tool calls.
+"""
+import argparse
+import json
+import math
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from config import FAST_PATH, MAX_STEPS_DEFAULT, PLAN_DEADLINE_SEC, SERVICE_HOST, SERVICE_PORT, SERVICE_QUEUE_SIZE, SERVICE_WORKERS
+
+MAX_BODY_BYTES = 64 * 1024
+
+
+class Job:
+    def __init__(self, payload: Dict[str, Any], stream: bool):
+        self.payload = payload
+        self.events: Optional["queue.Queue[Tuple[str, Any]]"] = queue.Queue() if stream else None
+        self.done = threading.Event()
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.enqueued = time.perf_counter()
+
+    def emit(self, event: str, data: Any):
+        if self.events is not None:
+            self.events.put((event, data))
+
+
+class AgentService:
+    """Bounded job queue + fixed worker pool around one agent entry point."""
+
+    def __init__(self, run_job: Callable[[Job], Dict[str, Any]], workers: int = 4, queue_size: int = 16):
+        self.run_job = run_job
+        self.workers = workers
+        self.queue: "queue.Queue[Optional[Job]]" = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.counts = {"ok": 0, "error": 0, "rejected": 0}
+        self.latency: deque = deque(maxlen=1024)
+        self.latency_sum = 0.0
+        self.queue_wait: deque = deque(maxlen=1024)
+        self._threads = [threading.Thread(target=self._worker, name=f"agent-worker-{i}", daemon=True)
+                         for i in range(workers)]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, job: Job) -> bool:
+        try:
+            self.queue.put_nowait(job)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.counts["rejected"] += 1
+            return False
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free: recent mean latency x queued jobs per worker."""
+        with self._lock:
+            mean = sum(self.latency) / len(self.latency) if self.latency else 5.0
+        return max(1, math.ceil(mean * (self.queue.qsize() + 1) / self.workers))
+
+    def _worker(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            started = time.perf_counter()
+            with self._lock:
+                self.in_flight += 1
+                self.queue_wait.append(started - job.enqueued)
+            status = "ok"
+            try:
+                job.result = self.run_job(job)
+            except Exception as e:
+                status, job.error = "error", f"{type(e).__name__}: {e}"
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.in_flight -= 1
+                self.counts[status] += 1
+                self.latency.append(elapsed)
+                self.latency_sum += elapsed
+            if status == "ok":
+                job.emit("done", {"answer": job.result.get("answer"), "elapsed_s": round(elapsed, 3)})
+            else:
+                job.emit("error", {"error": job.error})
+            job.done.set()
+
+    def stop(self):
+        for _ in self._threads:
+            self.queue.put(None)
+
+    def metrics(self) -> List[str]:
+        with self._lock:
+            counts, in_flight = dict(self.counts), self.in_flight
+            latency, waits, latency_sum = sorted(self.latency), sorted(self.queue_wait), self.latency_sum
+        lines = ["# TYPE agent_requests_total counter"]
+        lines += [f'agent_requests_total{{status="{k}"}} {v}' for k, v in counts.items()]
+        lines += ["# TYPE agent_queue_depth gauge", f"agent_queue_depth {self.queue.qsize()}",
+                  "# TYPE agent_queue_capacity gauge", f"agent_queue_capacity {self.queue.maxsize}",
+                  "# TYPE agent_in_flight gauge", f"agent_in_flight {in_flight}",
+                  "# TYPE agent_workers gauge", f"agent_workers {self.workers}",
+                  "# TYPE agent_request_seconds summary"]
+        for q in (0.5, 0.95, 0.99):
+            lines.append(f'agent_request_seconds{{quantile="{q}"}} {_quantile(latency, q):.3f}')
+        lines += [f"agent_request_seconds_sum {latency_sum:.3f}",
+                  f"agent_request_seconds_count {counts['ok'] + counts['error']}",
+                  "# TYPE agent_queue_wait_seconds summary"]
+        for q in (0.5, 0.95):
+            lines.append(f'agent_queue_wait_seconds{{quantile="{q}"}} {_quantile(waits, q):.3f}')
+        return lines
+
+
+def _quantile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def make_handler(service: AgentService, route: str, validate: Callable[[Dict[str, Any]], Optional[str]],
+                 extra_metrics: Callable[[], List[str]] = lambda: [], quiet: bool = True):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            if not quiet:
+                super().log_message(fmt, *args)
+
+        def _send(self, status: int, body: Any, content_type: str = "application/json",
+                  headers: Optional[Dict[str, str]] = None):
+            data = body if isinstance(body, bytes) else (
+                body.encode("utf-8") if isinstance(body, str) else json.dumps(body, ensure_ascii=False).encode("utf-8"))
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            path = urlsplit(self.path).path
+            if path == "/healthz":
+                self._send(200, "ok\n", "text/plain")
+            elif path == "/metrics":
+                text = "\n".join(service.metrics() + extra_metrics()) + "\n"
+                self._send(200, text, "text/plain; version=0.0.4")
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            url = urlsplit(self.path)
+            if url.path != route:
+                self._send(404, {"error": "not found"})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_BODY_BYTES:
+                self._send(413, {"error": "request body too large"})
+                return
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._send(400, {"error": "body must be JSON"})
+                return
+            problem = validate(payload) if isinstance(payload, dict) else "body must be a JSON object"
+            if problem:
+                self._send(400, {"error": problem})
+                return
+
+            stream = ("text/event-stream" in (self.headers.get("Accept") or "")
+                      or parse_qs(url.query).get("stream", ["0"])[0] in ("1", "true"))
+            job = Job(payload, stream)
+            if not service.submit(job):
+                wait = service.retry_after()
+                self._send(429, {"error": "busy, retry later", "retry_after_s": wait},
+                           headers={"Retry-After": str(wait)})
+                return
+            if stream:
+                self._stream(job)
+                return
+            job.done.wait()
+            if job.error:
+                self._send(500, {"error": job.error})
+            else:
+                self._send(200, job.result)
+
+        def _stream(self, job: Job):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            try:
+                while True:
+                    event, data = job.events.get()
+                    self.wfile.write(f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    if event in ("done", "error"):
+                        return
+            except (BrokenPipeError, ConnectionResetError):
+                return  # client went away; the plan still finishes and is cached
+
+    return Handler
+
+
+# ---- travel planner wiring ----
+def _validate(payload: Dict[str, Any]) -> Optional[str]:
+    if not isinstance(payload.get("query"), str) or not payload["query"].strip():
+        return 'missing "query" (string)'
+    steps = payload.get("max_steps")
+    if steps is not None and (isinstance(steps, bool) or not isinstance(steps, int) or steps <= 0):
+        return '"max_steps" must be a positive integer'
+    deadline = payload.get("deadline_s")
+    if deadline is not None and (isinstance(deadline, bool) or not isinstance(deadline, (int, float))
+                                 or not (deadline > 0 and math.isfinite(deadline))):
+        return '"deadline_s" must be a positive number of seconds'
+    if payload.get("translate") is not None and not isinstance(payload["translate"], str):
+        return '"translate" must be a language code'
+    if payload.get("fast") is not None and not isinstance(payload["fast"], bool):
+        return '"fast" must be true or false'
+    return None
+
+
+def run_plan(job: Job) -> Dict[str, Any]:
+    from travel_agent_core import run_travel
+    p = job.payload
+    streaming = job.events is not None
+    max_steps = MAX_STEPS_DEFAULT if p.get("max_steps") is None else p["max_steps"]
+    deadline_s = PLAN_DEADLINE_SEC if p.get("deadline_s") is None else float(p["deadline_s"])
+    if PLAN_DEADLINE_SEC:  # 0 = no server-side deadline, so nothing to clip to
+        deadline_s = min(deadline_s, PLAN_DEADLINE_SEC)
+    answer, trace = run_travel(p["query"], max_steps=min(max_steps, 12), translate_lang=p.get("translate"),
+                               deadline_s=deadline_s, fast=FAST_PATH and p.get("fast") is not False,
+                               on_token=(lambda text: job.emit("token", {"text": text})) if streaming else None,
+                               on_event=(lambda rec: job.emit(rec["role"], rec)) if streaming else None)
+    return {"answer": answer, "trace": trace}
+
+
+def warm_up():
+    """Open caches and pools and build the LLM client before the first request."""
+    import http_client, llm_client, travel_agent_core, travel_tools  # noqa: F401
+    travel_tools.get_cache()
+    llm_client.response_cache()
+    http_client.client()
+    for role in ("planner", "narrator"):
+        try:
+            llm_client.registry.get(role=role)
+        except Exception as e:  # missing key / SDK: report now, fail per request later
+            print(f"warning: LLM provider for {role} not ready: {e}", file=sys.stderr)
+
+
+def travel_metrics() -> List[str]:
+    import fast_path, http_client, llm_client, travel_tools
+    lines = ["# TYPE agent_upstream_requests_total counter"]
+    hosts = http_client.stats()
+    lines += [f'agent_upstream_requests_total{{host="{h}"}} {s["count"]}' for h, s in hosts.items()]
+    lines.append("# TYPE agent_upstream_errors_total counter")
+    lines += [f'agent_upstream_errors_total{{host="{h}"}} {s["errors"]}' for h, s in hosts.items()]
+    lines.append("# TYPE agent_upstream_latency_ms gauge")
+    lines += [f'agent_upstream_latency_ms{{host="{h}",quantile="0.95"}} {s["p95_ms"]}' for h, s in hosts.items()]
+    lines.append("# TYPE agent_upstream_hedged_total counter")
+    lines += [f'agent_upstream_hedged_total{{host="{h}",result="{k}"}} {s[k]}'
+              for h, s in hosts.items() for k in ("hedged", "hedge_wins")]
+    breakers = http_client.breakers.stats()
+    lines.append("# TYPE agent_upstream_circuit_open gauge")
+    lines += [f'agent_upstream_circuit_open{{name="{n}"}} {int(b["state"] != "closed")}' for n, b in breakers.items()]
+    lines.append("# TYPE agent_upstream_circuit_rejected_total counter")
+    lines += [f'agent_upstream_circuit_rejected_total{{name="{n}"}} {b["rejected"]}' for n, b in breakers.items()]
+    cache = llm_client.response_cache()
+    if cache is not None:
+        stats = cache.stats()
+        lines.append("# TYPE agent_llm_cache_lookups_total counter")
+        lines += [f'agent_llm_cache_lookups_total{{result="{k}"}} {stats[k]}'
+                  for k in ("exact_hits", "semantic_hits", "misses")]
+    for kind, limits in (("llm", llm_client.limits), ("upstream", http_client.limits)):
+        stats = limits.stats()
+        lines.append(f"# TYPE agent_{kind}_rate_limit_waits_total counter")
+        lines += [f'agent_{kind}_rate_limit_waits_total{{name="{n}"}} {s["waits"]}' for n, s in stats.items()]
+        lines.append(f"# TYPE agent_{kind}_concurrency_limit gauge")
+        lines += [f'agent_{kind}_concurrency_limit{{name="{n}"}} {s["concurrency"]}'
+                  for n, s in stats.items() if "concurrency" in s]
+    tool_cache = travel_tools.get_cache().stats()
+    lines.append("# TYPE agent_tool_cache_total counter")
+    lines += [f'agent_tool_cache_total{{result="{k}"}} {v}' for k, v in tool_cache.items()
+              if isinstance(v, int) and not k.endswith("_entries")]
+    lines += ["# TYPE agent_tool_cache_entries gauge", f'agent_tool_cache_entries {tool_cache["hot_entries"]}']
+    fast = fast_path.stats()
+    lines += ["# TYPE agent_fast_path_queries_total counter", f'agent_fast_path_queries_total {fast["queries"]}']
+    lines.append("# TYPE agent_fast_path_total counter")
+    lines += [f'agent_fast_path_total{{rule="{r}",result="{k}"}} {n}'
+              for r, s in fast["by_rule"].items() for k, n in s.items()]
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Travel planner HTTP service")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--workers", type=int, default=SERVICE_WORKERS, help="Plans run at once")
+    parser.add_argument("--queue", type=int, default=SERVICE_QUEUE_SIZE, help="Requests waiting before 429")
+    parser.add_argument("--log", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    warm_up()
+    service = AgentService(run_plan, workers=max(1, args.workers), queue_size=max(1, args.queue))
+    handler = make_handler(service, "/plan", _validate, travel_metrics, quiet=not args.log)
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    print(f"travel planner on http://{args.host}:{args.port}/plan "
+          f"({args.workers} workers, queue {args.queue})", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import os, sys, time
+
+import pytest
+
+# The lab modules import each other by bare name (import cache, import gazetteer, ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def tool_cache(tmp_path, monkeypatch):
+    """A fresh JsonCache under tmp_path as travel_tools' cache."""
+    import travel_tools
+    from cache import JsonCache
+    cache = JsonCache(str(tmp_path / "cache.json"), ttl_by_ns={"weather": 3600}, sweep_sec=0)
+    monkeypatch.setattr(travel_tools, "_cache", cache)
+    yield cache
+    cache.close()
+
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+@pytest.fixture
+def open_meteo(monkeypatch, tool_cache):
+    """Fake Open-Meteo hourly forecast: 20 + hour of day in every city; returns the list of requests."""
+    import travel_tools
+    requests = []
+
+    def answer(params):
+        requests.append(params)
+        lats = str(params["latitude"]).split(",")
+        days = int(params.get("forecast_days", 7))
+        start = int(time.time()) // 86400 * 86400
+        locs = [{"utc_offset_seconds": 0,
+                 "hourly": {"time": [start + 3600 * h for h in range(24 * days)],
+                            "temperature_2m": [20.0 + h % 24 for h in range(24 * days)]}} for _ in lats]
+        return _Response(locs if len(locs) > 1 else locs[0])
+
+    async def aanswer(url, params=None, headers=None):
+        return answer(params)
+
+    monkeypatch.setattr(travel_tools, "_http_get", lambda url, params=None, headers=None: answer(params))
+    monkeypatch.setattr(travel_tools, "_ahttp_get", aanswer)
+    return requests
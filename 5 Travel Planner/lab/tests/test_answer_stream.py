@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from answer_stream import AnswerStream
+
+
+def _stream(reply, size=1):
+    s = AnswerStream()
+    out = "".join(s.feed(reply[i:i + size]) for i in range(0, len(reply), size))
+    assert out == s.text
+    return s
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+def test_answer_is_decoded_across_any_chunking(size):
+    answer = 'Day 1: "Fushimi Inari" \\ temples\n\tramen 🍜 – café/bar'
+    reply = json.dumps({"final": True, "answer": answer})
+    s = _stream(reply, size)
+    assert s.text == answer and s.done
+
+
+def test_surrogate_pair_split_between_chunks():
+    reply = '{"final":true,"answer":"noodles \\ud83c\\udf5c!"}'
+    assert _stream(reply, 1).text == "noodles 🍜!"
+
+
+def test_answer_key_may_come_first_and_have_spaces():
+    assert _stream('{ "answer" :  "hi", "final": true}').text == "hi"
+
+
+def test_tool_actions_produce_nothing():
+    assert _stream(json.dumps({"tool": "weather", "args": {"city": "Kyoto"}})).text == ""
+
+
+def test_answer_inside_tool_args_is_not_streamed():
+    reply = json.dumps({"tool": "wikipedia", "args": {"topic": "x", "answer": "leak"}})
+    s = _stream(reply)
+    assert s.text == "" and not s.done
+
+
+def test_answer_as_a_value_or_inside_a_string_is_not_a_key():
+    assert _stream('{"note":"\\"answer\\":\\"leak\\"","tool":"x"}').text == ""
+    assert _stream('{"tool":"answer","args":{}}').text == ""
+    assert _stream('{"tools":[{"tool":"x","args":{"answer":"leak"}}],"answer":"ok"}').text == "ok"
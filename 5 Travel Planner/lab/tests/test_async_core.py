@@ -0,0 +1,114 @@
+import asyncio, json, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import travel_agent_core as core
+
+
+def _script(monkeypatch, *replies):
+    it = iter(replies)
+
+    async def agenerate_text(prompt, **kw):
+        await asyncio.sleep(0)
+        return next(it)
+
+    monkeypatch.setattr(core, "agenerate_text", agenerate_text)
+    monkeypatch.setattr(core, "_narrates", lambda: False)
+
+
+def _async_tool(monkeypatch, name, delay):
+    async def tool(city):
+        await asyncio.sleep(delay)
+        return {"city": city}
+
+    monkeypatch.setitem(core.ASYNC_TOOLS, name, tool)
+    monkeypatch.setitem(core.TOOL_REGISTRY, name, {"fn": lambda city: {"city": city}, "args": {"city": "str"}})
+
+
+def test_arun_travel_gathers_a_batch(monkeypatch):
+    _async_tool(monkeypatch, "slow", 0.2)
+    batch = {"tools": [{"tool": "slow", "args": {"city": c}} for c in ("Tokyo", "Kyoto", "Osaka")]}
+    _script(monkeypatch, json.dumps(batch), json.dumps({"final": True, "answer": "ok"}))
+    t0 = time.perf_counter()
+    answer, trace = asyncio.run(core.arun_travel("trip", fast=False, deadline_s=None))
+    assert answer == "ok"
+    assert time.perf_counter() - t0 < 0.5  # three 0.2 s calls at once
+    assert [t["data"]["observation"]["city"] for t in trace if t["role"] == "observation"] == ["Tokyo", "Kyoto", "Osaka"]
+
+
+def test_arun_travel_falls_back_to_sync_helpers(monkeypatch):
+    _script(monkeypatch, json.dumps({"tool": "parse_meta", "args": {"query": "3 days in Kyoto"}}),
+            json.dumps({"final": True, "answer": "ok"}))
+    _, trace = asyncio.run(core.arun_travel("3 days in Kyoto", fast=False, deadline_s=None))
+    obs = [t["data"]["observation"] for t in trace if t["role"] == "observation"]
+    assert obs == [{"days": 3, "budget": None}]
+
+
+def test_cancelling_arun_travel_keeps_the_partial_trace(monkeypatch):
+    _async_tool(monkeypatch, "slow", 10)
+    _script(monkeypatch, json.dumps({"tool": "slow", "args": {"city": "Tokyo"}}))
+    trace = []
+
+    async def main():
+        task = asyncio.ensure_future(core.arun_travel("trip", trace=trace, fast=False, deadline_s=None))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert [t["role"] for t in trace] == ["user", "planner", "cancelled"]
+
+
+def test_async_tool_limits_work_across_event_loops(monkeypatch):
+    async def slow(city):
+        await asyncio.sleep(0.01)
+        return {"city": city}
+
+    monkeypatch.setitem(core.ASYNC_TOOLS, "slow", slow)
+    monkeypatch.setitem(core.ASYNC_TOOL_CONCURRENCY, "slow", 1)  # every second call waits
+
+    async def batch():
+        return await core.acall_tools([{"tool": "slow", "args": {"city": c}} for c in "AB"])
+
+    for _ in range(2):  # e.g. run_batch called twice in one process
+        assert [r["city"] for r in asyncio.run(batch())] == ["A", "B"]
+
+
+class _FakeOpenAI(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive: a reused client would hold a connection of the first loop
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        content = json.dumps({"final": True, "answer": "plan"})
+        body = json.dumps({"id": "x", "object": "chat.completion", "created": 0, "model": "local-model",
+                           "choices": [{"index": 0, "finish_reason": "stop",
+                                        "message": {"role": "assistant", "content": content}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_arun_travel_twice_in_one_process(monkeypatch):
+    pytest.importorskip("openai")
+    import llm_client, llm_providers
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _FakeOpenAI)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        monkeypatch.setattr(llm_providers, "LMSTUDIO_BASE_URL", f"http://127.0.0.1:{httpd.server_address[1]}/v1")
+        monkeypatch.setattr(llm_client, "registry", llm_providers.ProviderRegistry("LMSTUDIO"))
+        monkeypatch.setattr(llm_client, "response_cache", lambda: None)
+        monkeypatch.setattr(core, "_narrates", lambda: False)
+        for _ in range(2):  # a second asyncio.run must not reuse the first loop's SDK client
+            answer, _ = asyncio.run(core.arun_travel("hello", fast=False, deadline_s=None))
+            assert answer == "plan"
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+import batch_runner
+
+
+def _write(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+@pytest.fixture
+def planner(monkeypatch):
+    calls = []
+
+    async def fake_arun(query, max_steps=6, translate_lang=None, trace=None, fast=True):
+        calls.append(query)
+        if "fail" in query:
+            raise RuntimeError("boom")
+        trace.append({"role": "planner"})
+        return f"plan for {query}", trace
+
+    monkeypatch.setattr(batch_runner, "arun_travel", fake_arun)
+    return calls
+
+
+def test_read_jobs_defaults_ids_and_drops_duplicates(tmp_path):
+    src = tmp_path / "in.jsonl"
+    _write(src, ['"Tokyo 3 days"', "# comment", "", '{"id": "k", "query": "Kyoto", "translate": "tl"}',
+                 '"Tokyo 3 days"'])
+    jobs = batch_runner.read_jobs(str(src), translate="ja")
+    assert [j["query"] for j in jobs] == ["Tokyo 3 days", "Kyoto"]
+    assert jobs[0]["id"] == batch_runner._job_id("Tokyo 3 days", "ja") and jobs[0]["translate"] == "ja"
+    assert jobs[1]["id"] == "k" and jobs[1]["translate"] == "tl"
+
+
+def test_read_jobs_reports_bad_lines(tmp_path):
+    src = tmp_path / "in.jsonl"
+    _write(src, ['"ok"', "{not json"])
+    with pytest.raises(ValueError, match=":2:"):
+        batch_runner.read_jobs(str(src))
+    _write(src, ['{"id": "x"}'])
+    with pytest.raises(ValueError, match="missing"):
+        batch_runner.read_jobs(str(src))
+
+
+def test_rerun_skips_ok_and_retries_errors(tmp_path, planner):
+    src, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write(src, ['"Tokyo"', '"fail once"', '"Kyoto"'])
+    first = batch_runner.run_batch(str(src), str(out), workers=2)
+    assert (first["ok"], first["error"], first["skipped"]) == (2, 1, 0)
+    assert sorted(planner) == ["Kyoto", "Tokyo", "fail once"]
+
+    planner.clear()
+    second = batch_runner.run_batch(str(src), str(out), workers=2)
+    assert planner == ["fail once"] and second["skipped"] == 2
+    recs = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert len(recs) == 4 and {r["status"] for r in recs} == {"ok", "error"}
+
+
+def test_resume_after_torn_last_line(tmp_path, planner):
+    src, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write(src, ['{"id": "a", "query": "Tokyo"}', '{"id": "b", "query": "Kyoto"}'])
+    out.write_text(json.dumps({"id": "a", "status": "ok"}) + '\n{"id": "b", "sta', encoding="utf-8")
+    assert batch_runner.completed_ids(str(out)) == {"a"}
+
+    summary = batch_runner.run_batch(str(src), str(out))
+    assert planner == ["Kyoto"] and summary["skipped"] == 1
+    lines = out.read_text(encoding="utf-8").splitlines()
+    assert json.loads(lines[-1])["id"] == "b" and json.loads(lines[-1])["steps"] == 1
+    assert batch_runner.completed_ids(str(out)) == {"a", "b"}
@@ -0,0 +1,69 @@
+import json, threading, time
+
+import travel_agent_core as core
+
+
+def _fake_tools(monkeypatch, delay=0.0):
+    calls = []
+    lock = threading.Lock()
+    active = {"now": 0, "max": 0}
+
+    def echo(city):
+        with lock:
+            calls.append(city)
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+        time.sleep(delay)
+        with lock:
+            active["now"] -= 1
+        return {"city": city}
+
+    monkeypatch.setitem(core.TOOL_REGISTRY, "echo", {"fn": echo, "args": {"city": "str"}})
+    return calls, active
+
+
+def test_actions_of_normalizes_single_and_batched_decisions():
+    assert core.actions_of({"tool": "weather", "args": {"city": "Tokyo"}}) == [{"tool": "weather", "args": {"city": "Tokyo"}}]
+    assert core.actions_of({"tool": "parse_meta", "args": None}) == [{"tool": "parse_meta", "args": {}}]
+    batch = {"tools": [{"tool": "weather", "args": {"city": "A"}}, "junk", {"tool": "wikipedia", "args": {"topic": "B"}}]}
+    assert [a["tool"] for a in core.actions_of(batch)] == ["weather", "wikipedia"]
+    assert core.actions_of({"final": True, "answer": "x"}) == []
+
+
+def test_call_tools_runs_in_parallel_and_keeps_order(monkeypatch):
+    _, active = _fake_tools(monkeypatch, delay=0.2)
+    monkeypatch.setitem(core.TOOL_CONCURRENCY, "echo", 8)
+    t0 = time.perf_counter()
+    results = core.call_tools([{"tool": "echo", "args": {"city": c}} for c in "ABCD"])
+    assert [r["city"] for r in results] == list("ABCD")
+    assert time.perf_counter() - t0 < 0.6
+    assert active["max"] > 1
+
+
+def test_per_tool_concurrency_cap(monkeypatch):
+    _, active = _fake_tools(monkeypatch, delay=0.05)
+    monkeypatch.setitem(core.TOOL_CONCURRENCY, "echo", 2)
+    monkeypatch.setattr(core, "_limits", {})
+    core.call_tools([{"tool": "echo", "args": {"city": str(i)}} for i in range(6)])
+    assert active["max"] <= 2
+
+
+def test_bad_and_unknown_tools_become_observations(monkeypatch):
+    _fake_tools(monkeypatch)
+    results = core.call_tools([{"tool": "echo", "args": {"town": "A"}}, {"tool": "nope", "args": {}}])
+    assert results[0]["error"].startswith("Bad args for echo")
+    assert results[1] == {"error": "Unknown tool 'nope'"}
+
+
+def test_one_planner_step_runs_a_whole_batch(monkeypatch):
+    calls, _ = _fake_tools(monkeypatch)
+    replies = iter([json.dumps({"tools": [{"tool": "echo", "args": {"city": "Tokyo"}},
+                                          {"tool": "echo", "args": {"city": "Kyoto"}}]}),
+                    json.dumps({"final": True, "answer": "done"})])
+    monkeypatch.setattr(core, "generate_text", lambda prompt, **kw: next(replies))
+    monkeypatch.setattr(core, "_narrates", lambda: False)
+    answer, trace = core.run_travel("Tokyo and Kyoto", fast=False, deadline_s=None)
+    assert answer == "done"
+    assert sorted(calls) == ["Kyoto", "Tokyo"]
+    steps = [t["data"]["step"] for t in trace if t["role"] == "observation"]
+    assert steps == [1, 1]
@@ -0,0 +1,101 @@
+import json, os, time
+
+import pytest
+
+from cache import AppendLogStorage, JsonCache, _WriteBehind
+
+
+def _item(value, ts=None):
+    return {"_ts": time.time() if ts is None else ts, "value": value}
+
+
+def test_log_replays_after_reopen(tmp_path):
+    path = str(tmp_path / "cache.log")
+    log = AppendLogStorage(path)
+    log.put("weather:a", _item({"t": 1}))
+    log.put("weather:b", _item({"t": 2}))
+    log.put("weather:a", _item({"t": 3}))
+    log.delete("weather:b")
+    log.close()
+
+    again = AppendLogStorage(path)
+    again.load()
+    assert len(again) == 1
+    assert again.read("weather:a")["value"] == {"t": 3}
+    assert again.read("weather:b") is None
+    again.close()
+
+
+def test_unflushed_writes_are_readable(tmp_path):
+    log = AppendLogStorage(str(tmp_path / "cache.log"), flush_interval=3600)
+    log.put("k:1", _item("v"))
+    assert not os.path.exists(log.path) or os.path.getsize(log.path) == 0
+    assert log.read("k:1")["value"] == "v"
+    log.flush()
+    assert log.read("k:1")["value"] == "v"
+    log.close()
+
+
+def test_close_releases_the_reader(tmp_path):
+    log = AppendLogStorage(str(tmp_path / "cache.log"))
+    log.put("k:1", _item("v"))
+    log.flush()
+    assert log.read("k:1")["value"] == "v"
+    reader = log._reader
+    log.close()
+    assert reader.closed and log._reader is None
+
+
+def test_write_behind_requires_flush():
+    with pytest.raises(TypeError):
+        _WriteBehind(1.0, 10)
+
+
+def test_torn_tail_is_dropped_and_truncated(tmp_path):
+    path = str(tmp_path / "cache.log")
+    log = AppendLogStorage(path)
+    log.put("k:ok", _item(1))
+    log.close()
+    good = os.path.getsize(path)
+    with open(path, "ab") as f:
+        f.write(b'{"k":"k:torn","ts":1,"v":')  # crash mid-write
+
+    again = AppendLogStorage(path)
+    again.load()
+    assert again.read("k:ok")["value"] == 1
+    assert again.read("k:torn") is None
+    assert os.path.getsize(path) == good
+    again.close()
+
+
+def test_compaction_keeps_live_records_only(tmp_path):
+    path = str(tmp_path / "cache.log")
+    log = AppendLogStorage(path, compact_min=10)
+    for i in range(50):
+        log.put("k:same", _item(i))
+    log.put("k:other", _item("x"))
+    log.flush()
+    assert log.needs_compaction()
+    log.compact()
+
+    with open(path, "rb") as f:
+        lines = [json.loads(line) for line in f]
+    assert sorted(rec["k"] for rec in lines) == ["k:other", "k:same"]
+    assert log.read("k:same")["value"] == 49
+    log.put("k:after", _item("y"))
+    log.close()
+
+    again = AppendLogStorage(path)
+    again.load()
+    assert again.read("k:after")["value"] == "y"
+    assert again.read("k:same")["value"] == 49
+    again.close()
+
+
+def test_legacy_cache_json_is_imported_once(tmp_path):
+    legacy = tmp_path / "cache.json"
+    legacy.write_text(json.dumps({"wiki:tokyo": {"_ts": time.time(), "value": {"summary": "Capital"}}}))
+    cache = JsonCache(str(legacy), sweep_sec=0)
+    assert cache.get("wiki:tokyo") == {"summary": "Capital"}
+    assert not legacy.exists() and (tmp_path / "cache.json.migrated").exists()
+    cache.close()
@@ -0,0 +1,63 @@
+import time
+
+from cache import JsonCache
+
+
+def _cache(tmp_path, **kw):
+    return JsonCache(str(tmp_path / "cache.json"), sweep_sec=0, **kw)
+
+
+def test_hot_tier_is_bounded_and_falls_back_to_disk(tmp_path):
+    cache = _cache(tmp_path, max_entries=3)
+    for i in range(10):
+        cache.set(f"k:{i}", i)
+    stats = cache.stats()
+    assert stats["hot_entries"] == 3 and stats["evictions"] == 7
+    assert cache.get("k:0") == 0  # evicted from memory, still on disk
+    assert cache.stats()["disk_hits"] == 1
+    cache.close()
+
+
+def test_lru_keeps_recently_read_keys(tmp_path):
+    cache = _cache(tmp_path, max_entries=2)
+    cache.set("k:a", 1)
+    cache.set("k:b", 2)
+    cache.get("k:a")
+    cache.set("k:c", 3)  # evicts b, the least recently used
+    assert list(cache._hot) == ["k:a", "k:c"]
+    cache.close()
+
+
+def test_ttl_per_namespace(tmp_path):
+    cache = _cache(tmp_path, ttl_sec=100, ttl_by_ns={"weather": 10})
+    old = time.time() - 50
+    for key in ("weather:tokyo", "wiki:tokyo"):
+        cache.set(key, "v")
+        cache._hot[key]["_ts"] = old
+    assert cache.get("weather:tokyo") is None
+    assert cache.get("wiki:tokyo") == "v"
+    assert cache.ttl_for("weather:x") == 10 and cache.ttl_for("other") == 100
+    cache.close()
+
+
+def test_sweep_drops_expired_from_both_tiers(tmp_path):
+    cache = _cache(tmp_path, ttl_sec=100, ttl_by_ns={"weather": 10})
+    old = time.time() - 50
+    cache.storage.put("weather:old", {"_ts": old, "value": 1})
+    cache.set("weather:new", 2)
+    cache.set("wiki:kept", 3)
+    cache._hot["wiki:kept"]["_ts"] = old
+    assert cache.sweep() == 1
+    assert len(cache.storage) == 2
+    assert cache.get("weather:new") == 2 and cache.get("wiki:kept") == 3
+    cache.close()
+
+
+def test_close_stops_the_sweeper(tmp_path):
+    cache = JsonCache(str(tmp_path / "cache.json"), sweep_sec=3600)
+    thread = cache._sweep_thread
+    assert thread.is_alive()
+    started = time.monotonic()
+    cache.close()
+    assert not thread.is_alive()
+    assert time.monotonic() - started < 5
@@ -0,0 +1,128 @@
+import asyncio, threading, time
+
+import pytest
+
+from cache import JsonCache, SingleFlight
+
+
+def _cache(tmp_path, **kw):
+    return JsonCache(str(tmp_path / "cache.json"), sweep_sec=0, **kw)
+
+
+def test_concurrent_misses_share_one_load(tmp_path):
+    cache = _cache(tmp_path)
+    calls, gate = [], threading.Event()
+
+    def loader():
+        calls.append(1)
+        gate.wait(2)
+        return "v"
+
+    out = []
+    threads = [threading.Thread(target=lambda: out.append(cache.get_or_load("k:x", loader))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert sorted(cached for _, cached in out) == [False] + [True] * 7
+    assert cache.stats()["coalesced"] == 7
+    cache.close()
+
+
+def test_loader_errors_reach_every_waiter_and_are_not_cached():
+    flight, gate = SingleFlight(), threading.Event()
+    errors = []
+
+    def boom():
+        gate.wait(2)
+        raise ValueError("upstream down")
+
+    def call():
+        try:
+            flight.do("k", boom)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert len(errors) == 3 and not flight.in_flight("k")
+
+
+def test_none_is_not_cached(tmp_path):
+    cache = _cache(tmp_path)
+    assert cache.get_or_load("wiki:nope", lambda: None) == (None, False)
+    assert cache.get("wiki:nope") is None
+    cache.close()
+
+
+def test_stale_entry_is_served_and_refreshed_once(tmp_path):
+    cache = _cache(tmp_path, ttl_sec=10, stale_sec=60)
+    cache.set("k:x", "old")
+    cache._hot["k:x"]["_ts"] = time.time() - 30  # past the TTL, inside the stale window
+    refreshed = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        refreshed.set()
+        return "new"
+
+    assert cache.get("k:x") is None  # plain get() treats stale as a miss
+    assert cache.get_or_load("k:x", loader) == ("old", True)
+    assert cache.get_or_load("k:x", loader)[0] in ("old", "new")
+    assert refreshed.wait(2)
+    time.sleep(0.05)
+    assert cache.get("k:x") == "new" and len(calls) == 1
+    cache.close()
+
+
+def test_entries_past_the_stale_window_are_misses(tmp_path):
+    cache = _cache(tmp_path, ttl_sec=10, stale_sec=5)
+    cache.set("k:x", "old")
+    cache._hot["k:x"]["_ts"] = time.time() - 30
+    assert cache.get_or_load("k:x", lambda: "new") == ("new", False)
+    cache.close()
+
+
+def test_async_misses_share_one_task(tmp_path):
+    cache = _cache(tmp_path)
+    calls = []
+
+    async def aloader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "v"
+
+    async def main():
+        return await asyncio.gather(*(cache.aget_or_load("k:a", aloader) for _ in range(5)))
+
+    out = asyncio.run(main())
+    assert len(calls) == 1 and all(value == "v" for value, _ in out)
+    cache.close()
+
+
+def test_cancelling_one_async_waiter_does_not_cancel_the_fetch():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "v"
+
+    async def main():
+        first = asyncio.ensure_future(flight.ado("k", fetch))
+        second = asyncio.ensure_future(flight.ado("k", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == ("v", True)
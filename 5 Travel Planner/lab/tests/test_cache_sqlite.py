@@ -0,0 +1,45 @@
+import time
+
+from cache import JsonCache, SqliteStorage, make_storage
+
+
+def test_make_storage_picks_backend(tmp_path):
+    sqlite = make_storage("sqlite", str(tmp_path / "cache.json"))
+    assert isinstance(sqlite, SqliteStorage) and sqlite.path.endswith("cache.sqlite3")
+    sqlite.close()
+
+
+def test_two_caches_share_one_database(tmp_path):
+    path = str(tmp_path / "cache.json")
+    a = JsonCache(path, backend="sqlite", sweep_sec=0)
+    b = JsonCache(path, backend="sqlite", sweep_sec=0)
+    a.set("weather:tokyo", {"t": 20})
+    a.storage.flush()
+    assert b.get("weather:tokyo") == {"t": 20}
+    a.close()
+    b.close()
+
+
+def test_older_write_does_not_replace_newer_row(tmp_path):
+    db = SqliteStorage(str(tmp_path / "c.sqlite3"))
+    now = time.time()
+    db.put("k:x", {"_ts": now, "value": "new"})
+    db.flush()
+    db.put("k:x", {"_ts": now - 60, "value": "old"})
+    db.flush()
+    assert db.read("k:x")["value"] == "new"
+    db.delete("k:x", ts=now - 60)  # a delete for an older entry leaves the newer one
+    db.flush()
+    assert db.read("k:x")["value"] == "new"
+    db.close()
+
+
+def test_purge_uses_namespace_ttls(tmp_path):
+    db = SqliteStorage(str(tmp_path / "c.sqlite3"))
+    now = time.time()
+    db.put("weather:a", {"_ts": now - 50, "value": 1})
+    db.put("wiki:a", {"_ts": now - 50, "value": 2})
+    db.put("other:a", {"_ts": now - 500, "value": 3})
+    assert db.purge({"weather": 10, "wiki": 100}, 200, now) == 2
+    assert db.read("wiki:a")["value"] == 2 and len(db) == 1
+    db.close()
@@ -0,0 +1,35 @@
+import json
+
+from context_manager import ConversationContext, estimate_tokens, shrink
+
+
+def test_prompts_share_a_stable_prefix():
+    ctx = ConversationContext("SYS", "3 days in Kyoto")
+    first = ctx.planner_prompt()
+    ctx.add({"tool": "weather", "args": {"city": "Kyoto"}}, {"temp_now_c": 20})
+    second = ctx.planner_prompt()
+    ctx.add({"tool": "wikipedia", "args": {"topic": "Kyoto"}}, {"summary": "City"})
+    third = ctx.planner_prompt()
+    head = first[:-len(ConversationContext.SUFFIX_FIRST)]
+    assert second.startswith(head) and third.startswith(second[:-len(ConversationContext.SUFFIX_NEXT)])
+    assert ctx.planner_prompt(last=True).endswith(ConversationContext.SUFFIX_LAST)
+
+
+def test_shrink_cuts_strings_and_lists():
+    out = shrink({"summary": "x" * 500, "items": list(range(9))})
+    assert len(out["summary"]) == 161 and out["summary"].endswith("…")
+    assert out["items"] == [0, 1, 2, 3, 4, "(+4 more)"]
+
+
+def test_over_budget_compacts_old_turns_then_drops_them():
+    ctx = ConversationContext("SYS", "query", budget_tokens=400, keep_recent=2)
+    for i in range(6):
+        ctx.add({"tool": "wikipedia", "args": {"topic": f"T{i}"}}, {"summary": "word " * 120})
+    assert ctx.tokens() <= 400 or ctx.stats()["turns"] == 2
+    prompt = ctx.planner_prompt()
+    assert "earlier steps omitted" in prompt
+    recent = [json.dumps({"tool": "wikipedia", "args": {"topic": t}}) for t in ("T4", "T5")]
+    assert all(r in prompt for r in recent)
+    assert ("word " * 120).strip() in prompt  # the latest observation is kept whole
+    assert estimate_tokens(prompt) <= 400 + estimate_tokens(ConversationContext.SUFFIX_LAST)
+
@@ -0,0 +1,80 @@
+import json
+
+import fast_path
+import travel_agent_core as core
+
+
+def _tools(plan):
+    return [a["tool"] for a in plan.actions]
+
+
+def test_itinerary_rule():
+    plan = fast_path.match("5 days in Tokyo and Kyoto on a tight budget")
+    assert plan.rule == "itinerary"
+    assert _tools(plan) == ["parse_meta", "weather_batch", "wikipedia", "wikipedia", "distance"]
+    assert plan.actions[1]["args"] == {"cities": ["Tokyo", "Kyoto"], "days": 5}
+    assert plan.actions[-1]["args"] == {"city_a": "Tokyo", "city_b": "Kyoto"}
+
+
+def test_itinerary_of_three_cities_orders_the_route():
+    plan = fast_path.match("A weekend across Osaka, Kyoto and Tokyo")
+    assert plan.actions[1]["args"]["days"] == 2
+    assert plan.actions[-1] == {"tool": "route_order", "args": {"cities": ["Osaka", "Kyoto", "Tokyo"]}}
+
+
+def test_weather_rule():
+    plan = fast_path.match("What's the weather in Manila?")
+    assert plan.rule == "weather" and plan.actions == [{"tool": "weather_batch", "args": {"cities": ["Manila"]}}]
+
+
+def test_unrecognized_queries_go_to_the_planner():
+    assert fast_path.match("Plan a trip to Kyoto") is None  # no trip length
+    assert fast_path.match("3 days somewhere warm") is None  # no city
+    assert fast_path.match("Translate my 3 day Tokyo plan to Tagalog") is None
+    assert fast_path.match("Compare hotels for 4 days in Paris") is None
+    assert fast_path.match("") is None
+
+
+def test_stats_count_hits_and_fallbacks(monkeypatch):
+    monkeypatch.setattr(fast_path, "_stats", fast_path._Stats())
+    plan = fast_path.match("weather in Tokyo")
+    fast_path.match("hello")
+    fast_path.fell_back(plan)
+    fast_path.match("weather in Kyoto")
+    stats = fast_path.stats()
+    assert (stats["queries"], stats["hits"], stats["fallbacks"]) == (3, 2, 1)
+    assert stats["hit_rate"] == round(1 / 3, 3) and stats["by_rule"]["weather"] == {"hits": 2, "fallbacks": 1}
+
+
+def _fake(monkeypatch, replies):
+    prompts, batches = [], []
+    it = iter(replies)
+
+    def generate_text(prompt, **kw):
+        prompts.append(prompt)
+        return next(it)
+
+    def call_tools(actions):
+        batches.append([a["tool"] for a in actions])
+        return [{"tool": a["tool"], "ok": True} for a in actions]
+
+    monkeypatch.setattr(core, "generate_text", generate_text)
+    monkeypatch.setattr(core, "_narrates", lambda: False)
+    monkeypatch.setattr(core, "call_tools", call_tools)
+    return prompts, batches
+
+
+def test_run_travel_fast_path_makes_one_llm_call(monkeypatch):
+    prompts, batches = _fake(monkeypatch, [json.dumps({"final": True, "answer": "sunny"})])
+    answer, trace = core.run_travel("weather in Tokyo", fast=True, deadline_s=None)
+    assert answer == "sunny" and len(prompts) == 1 and batches == [["weather_batch"]]
+    assert trace[1]["role"] == "fast_path" and trace[-2]["data"]["fast_path"] == "weather"
+
+
+def test_run_travel_falls_back_to_the_planner(monkeypatch):
+    more = json.dumps({"tool": "wikipedia", "args": {"topic": "Tokyo"}})
+    prompts, batches = _fake(monkeypatch, [more, more, json.dumps({"final": True, "answer": "plan"})])
+    answer, trace = core.run_travel("weather in Tokyo", fast=True, deadline_s=None)
+    assert answer == "plan" and len(prompts) == 3
+    assert batches == [["weather_batch"], ["wikipedia"]]  # the loop starts from the prefetched weather
+    assert [t["data"]["step"] for t in trace if t["role"] == "planner"] == [1, 2, 3]
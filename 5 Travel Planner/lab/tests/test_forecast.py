@@ -0,0 +1,87 @@
+import datetime
+import math
+import time
+from array import array
+
+import pytest
+
+from forecast import DAY, Forecast
+
+TOKYO, NEW_YORK = 9 * 3600, -4 * 3600
+
+
+def _local_midnight(date, offset):
+    return (date - datetime.date(1970, 1, 1)).days * DAY - offset
+
+
+def _series(date, offset, hours=48, temps=None):
+    return Forecast(_local_midnight(date, offset), 3600, offset, array("f", temps or range(hours)))
+
+
+@pytest.mark.parametrize("offset", [TOKYO, NEW_YORK, 0])
+def test_days_follow_the_local_clock(offset):
+    day1 = datetime.date(2026, 10, 18)
+    f = _series(day1, offset)
+    assert f.day(day1) == {"date": "2026-10-18", "min_c": 0, "max_c": 23, "mean_c": 11.5}
+    assert f.day(day1 + datetime.timedelta(days=1))["min_c"] == 24
+    assert f.day(day1 - datetime.timedelta(days=1)) is None
+    assert f.day(day1 + datetime.timedelta(days=2)) is None
+    assert f.today(f.base) == f.today(f.base + DAY - 1) == f.today(f.base + DAY) - 1
+
+
+def test_utc_midnight_is_not_a_day_boundary_with_an_offset():
+    f = _series(datetime.date(2026, 10, 18), TOKYO)
+    utc_midnight = _local_midnight(datetime.date(2026, 10, 18), 0)
+    assert f.today(utc_midnight - 1) == f.today(utc_midnight)  # 08:59 and 09:00 in Tokyo
+
+
+def test_at_interpolates_and_stays_inside_the_series():
+    f = Forecast(1000, 3600, 0, array("f", [10.0, 20.0, 30.0]))
+    assert f.at(1000) == 10.0 and f.at(1000 + 1800) == 15.0 and f.at(1000 + 2 * 3600 + 60) == 30.0
+    assert f.at(999) is None and f.at(f.end) is None
+    assert f.end == 1000 + 3 * 3600
+
+
+def test_missing_readings():
+    f = Forecast(0, 3600, 0, array("f", [10.0, math.nan, 30.0]))
+    assert f.at(0) == 10.0  # the next hour is missing: the reading itself
+    assert f.at(3600) is None
+    day = _series(datetime.date(2026, 10, 18), 0, temps=[math.nan] * 12 + [5.0] * 12 + [math.nan] * 24)
+    assert day.day(datetime.date(2026, 10, 18))["mean_c"] == 5.0
+    assert day.day(datetime.date(2026, 10, 19)) is None
+
+
+def test_daily_starts_today():
+    today = datetime.datetime.fromtimestamp(time.time() + NEW_YORK, datetime.timezone.utc).date()
+    f = _series(today - datetime.timedelta(days=1), NEW_YORK, hours=24 * 5)
+    days = f.daily()
+    assert [d["date"] for d in days] == [(today + datetime.timedelta(days=i)).isoformat() for i in range(4)]
+    assert len(f.daily(2)) == 2 and f.daily(0) == []
+    assert f.day(0) == days[0] and f.day(1) == days[1]
+    assert f.now() is not None
+
+
+def test_from_open_meteo():
+    f = Forecast.from_open_meteo({"utc_offset_seconds": TOKYO,
+                                  "hourly": {"time": [100, 3700, 7300], "temperature_2m": [1.5, None, 3.0]}})
+    assert (f.base, f.step, f.offset) == (100, 3600, TOKYO)
+    assert f.temps[0] == 1.5 and math.isnan(f.temps[1])
+    assert Forecast.from_open_meteo({"hourly": {"time": [], "temperature_2m": []}}) is None
+    assert Forecast.from_open_meteo(None) is None
+
+
+def test_cache_value_round_trip():
+    f = _series(datetime.date(2026, 10, 18), TOKYO, temps=[1.25, math.nan, -3.5])
+    g = Forecast.from_value(f.to_value())
+    assert (g.base, g.step, g.offset) == (f.base, f.step, f.offset)
+    assert g.temps[0] == 1.25 and math.isnan(g.temps[1]) and g.temps[2] == -3.5
+
+
+@pytest.mark.parametrize("value", [
+    None,
+    {"city": "Tokyo", "temp_now_c": 21.3},  # entries from before the series
+    {"temps": [1.0, 2.0], "base": 0, "step": 3600},
+    {"temps": "AACAPw==", "step": 3600},
+])
+def test_other_cache_values_are_none(value):
+    assert Forecast.from_value(value) is None
@@ -0,0 +1,102 @@
+import pytest
+
+import gazetteer
+import travel_tools
+from gazetteer import Gazetteer
+
+ROWS = gazetteer.SEED + [
+    ("Paris", [], 33.6609, -95.5555, "US", 25_000),
+    ("São Paulo", ["Sao Paulo", "Sampa"], -23.5475, -46.6361, "BR", 12_400_000),
+    ("Nice", [], 43.7031, 7.2661, "FR", 340_000),
+    ("Ulm", [], 48.3984, 9.9916, "DE", 126_000),
+]
+
+
+@pytest.fixture(scope="module")
+def gaz():
+    return Gazetteer.from_rows(ROWS)
+
+
+def test_names_normalize():
+    assert gazetteer.normalize("São-Paulo!") == gazetteer.normalize("SAO PAULO") == "sao paulo"
+
+
+def test_exact_and_aliases_most_populous_first(gaz):
+    assert [p.country for p in gaz.exact("paris")] == ["FR", "US"]
+    assert gaz.exact("Paris", country="us")[0].lat == pytest.approx(33.6609, abs=1e-3)
+    assert gaz.exact("sampa")[0].name == "São Paulo" and gaz.exact("NYC")[0].name == "New York"
+
+
+@pytest.mark.parametrize("text, name, country", [
+    ("Paris", "Paris", "FR"),
+    ("Paris, US", "Paris", "US"),
+    ("paris us", "Paris", "US"),
+    ("sao-paulo", "São Paulo", "BR"),
+    ("Kyoto, JP", "Kyoto", "JP"),
+    ("3 days in Kyoto please", "Kyoto", "JP"),
+    ("Kyotto", "Kyoto", "JP"),
+    ("Singapoor", "Singapore", "SG"),
+    ("35.01,135.77", "Kyoto", "JP"),
+])
+def test_resolve(gaz, text, name, country):
+    place = gaz.resolve(text)
+    assert (place.name, place.country) == (name, country)
+
+
+def test_resolve_unknown_is_none(gaz):
+    assert gaz.resolve("Atlantis") is None and gaz.resolve("") is None
+    assert gaz.resolve("Kyoto, FR") is None and gaz.resolve("kyoto fr") is None  # not another country's Kyoto
+    assert gaz.resolve("Atlantis, FR") is None
+    assert gazetteer.Gazetteer.from_rows(gazetteer.SEED).resolve("Paris, US") is None
+    assert gaz.resolve("0.0,-30.0") is None  # the Atlantic: nothing within GAZETTEER_SNAP_KM
+
+
+def test_resolve_does_not_complete_partial_names(gaz):
+    assert gaz.resolve("York") is None  # part of New York, not a typo of it
+    assert gaz.resolve("Manil") is None and gaz.resolve("Osa") is None
+    assert gaz.resolve("New Yrok").name == "New York" and gaz.resolve("Tokio").name == "Tokyo"
+
+
+def test_fuzzy_and_prefix(gaz):
+    (place, score), *_ = gaz.fuzzy("Osakka")
+    assert place.name == "Osaka" and 0 < score < 1
+    assert gaz.fuzzy("zzzz") == []
+    assert [p.name for p in gaz.prefix("s", limit=2)] == ["São Paulo", "Singapore"]
+
+
+def test_mentions_skip_everyday_words(gaz):
+    assert [p.name for p in gaz.mentions("A weekend in Tokyo and New York City")] == ["Tokyo", "New York"]
+    assert gaz.mentions("nice weather in ulm") == []
+    assert [p.name for p in gaz.mentions("Fly to Nice, then Ulm")] == ["Nice", "Ulm"]
+
+
+def test_compiled_index_opens_from_a_geonames_dump(tmp_path):
+    def line(gid, name, aliases, lat, lon, cc, pop, fclass="P"):
+        return "\t".join([str(gid), name, name, aliases, str(lat), str(lon), fclass, "PPL", cc]
+                         + [""] * 5 + [str(pop)]) + "\n"
+
+    src = tmp_path / "cities.txt"
+    src.write_text(line(1, "Kyoto", "Kyōto,Kioto", 35.0116, 135.7681, "JP", 1_460_000)
+                   + line(2, "Mount Fuji", "", 35.36, 138.73, "JP", 0, fclass="T")
+                   + line(3, "Nara", "", 34.685, 135.805, "JP", 360_000), encoding="utf-8")
+    gaz = gazetteer.compile_file(str(src), str(tmp_path / "gaz.idx"))
+    assert gaz.places == 2  # only populated places
+    assert Gazetteer.open(str(tmp_path / "gaz.idx")).resolve("kioto").name == "Kyoto"
+
+
+@pytest.mark.parametrize("text, names", [
+    ("Kyoto, JP", ["Kyoto, JP"]),
+    ("Tokyo, Kyoto, JP", ["Tokyo", "Kyoto, JP"]),
+    ("Kyoto, JP, Paris, FR", ["Kyoto, JP", "Paris, FR"]),
+    ("Tokyo,Kyoto", ["Tokyo", "Kyoto"]),
+    ("14.6,121.0", ["14.6,121.0"]),
+])
+def test_split_names(text, names):
+    assert gazetteer.split_names(text) == names
+
+
+def test_tools_keep_a_country_code_with_its_city(open_meteo):
+    out = travel_tools.tool_weather_batch("Kyoto, JP, Tokyo")
+    assert [r["city"] for r in out["results"]] == ["Kyoto", "Tokyo"] and "unknown" not in out
+    places, unknown = travel_tools._resolve_all("Paris, FR, London")
+    assert [p.name for p in places] == ["Paris", "London"] and unknown == []
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import http_client
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    connections = set()
+
+    def do_GET(self):
+        _Handler.connections.add(self.client_address)
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    _Handler.connections = set()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_sync_calls_share_one_keep_alive_connection(server):
+    assert http_client.client() is http_client.client()
+    for _ in range(5):
+        r = http_client.get(server + "/x", hedge=False)
+        assert r.json() == {"ok": True}
+    assert len(_Handler.connections) == 1
+    stats = http_client.stats()["127.0.0.1"]
+    assert stats["count"] >= 5 and stats["errors"] == 0
+
+
+def test_async_client_per_event_loop(server):
+    async def fetch():
+        r = await http_client.aget(server + "/x", hedge=False)
+        return r.status_code, http_client.async_client()
+
+    first_status, first = asyncio.run(fetch())
+    second_status, second = asyncio.run(fetch())  # a fresh loop must not reuse the closed loop's client
+    assert first_status == second_status == 200 and first is not second
+
+
+def test_aclose_and_close_drop_the_async_clients(server):
+    async def fetch_and_close():
+        await http_client.aget(server + "/x", hedge=False)
+        c = http_client.async_client()
+        await http_client.aclose()
+        return c
+
+    assert asyncio.run(fetch_and_close()).is_closed
+
+    loop = asyncio.new_event_loop()
+    try:
+        c = loop.run_until_complete(_fetch(server))  # the loop stays open: close() can still close it
+        http_client.close()
+        assert c.is_closed and http_client._client is None and not http_client._aclients
+    finally:
+        loop.close()
+
+
+async def _fetch(url):
+    await http_client.aget(url + "/x", hedge=False)
+    return http_client.async_client()
+
+
+def test_upstream_for_matches_parent_domains():
+    assert http_client.upstream_for("https://api.open-meteo.com/v1/forecast") == "open-meteo"
+    assert http_client.upstream_for("https://en.wikipedia.org/api/rest_v1/page/summary/X") == "wikipedia"
+    assert http_client.upstream_for("http://127.0.0.1:9/x") is None
@@ -0,0 +1,79 @@
+import json, operator
+
+from context_manager import ConversationContext
+from llm_cache import LLMCache, embed, normalize
+from travel_agent_core import SYS
+
+ARGS = ("GEMINI", "gemini-2.0-flash", 0.3)
+
+
+def _prompt(query):
+    prompt = ConversationContext(SYS, query).planner_prompt()
+    return prompt, prompt[len(SYS):]
+
+
+def _cache(tmp_path, mode="semantic"):
+    return LLMCache(str(tmp_path / "llm_cache.json"), mode=mode, sweep_sec=0)
+
+
+def test_exact_key_ignores_case_and_whitespace(tmp_path):
+    cache = _cache(tmp_path, mode="exact")
+    cache.put(*ARGS, "Plan a trip to  Kyoto", "answer")
+    assert cache.get(*ARGS, "plan a trip to kyoto") == "answer"
+    assert cache.get("OPENAI", "gpt-4o-mini", 0.3, "plan a trip to kyoto") is None
+    cache.close()
+
+
+def test_other_city_does_not_share_a_semantic_entry(tmp_path):
+    cache = _cache(tmp_path)
+    kyoto, kyoto_sem = _prompt("Plan a 3-day trip to Kyoto on a budget")
+    paris, paris_sem = _prompt("Plan a 3-day trip to Paris on a budget")
+    # the vectors alone can't tell them apart
+    assert sum(map(operator.mul, embed(normalize(kyoto_sem)), embed(normalize(paris_sem)))) > cache.threshold
+    decision = json.dumps({"tool": "weather", "args": {"city": "Kyoto"}})
+    cache.put(*ARGS, kyoto, decision, semantic_text=kyoto_sem)
+
+    assert cache.get(*ARGS, paris, semantic_text=paris_sem) is None
+    calls = []
+    out = cache.get_or_generate(*ARGS, paris, lambda: calls.append(1) or '{"tool":"weather","args":{"city":"Paris"}}',
+                                semantic_text=paris_sem)
+    assert calls == [1] and "Paris" in out
+    assert cache.get(*ARGS, kyoto, semantic_text=kyoto_sem) == decision  # exact duplicate still hits
+    cache.close()
+
+
+def test_similar_prompt_about_the_same_city_hits(tmp_path):
+    cache = _cache(tmp_path)
+    first, first_sem = _prompt("Plan a 3-day trip to Kyoto on a budget")
+    again, again_sem = _prompt("Plan a 3-day trip to Kyoto on a budget, please")
+    cache.put(*ARGS, first, "plan", semantic_text=first_sem)
+    assert cache.get(*ARGS, again, semantic_text=again_sem) == "plan"
+    assert cache.stats()["semantic_hits"] == 1
+    cache.close()
+
+
+def test_numbers_must_match(tmp_path):
+    cache = _cache(tmp_path)
+    three, three_sem = _prompt("Plan a 3-day trip to Kyoto")
+    five, five_sem = _prompt("Plan a 5-day trip to Kyoto")
+    cache.put(*ARGS, three, "plan", semantic_text=three_sem)
+    assert cache.get(*ARGS, five, semantic_text=five_sem) is None
+    cache.close()
+
+
+def test_semantic_hit_survives_a_concurrent_eviction(tmp_path, monkeypatch):
+    cache = _cache(tmp_path)
+    prompt, sem = _prompt("Plan a 3-day trip to Kyoto")
+    cache.put(*ARGS, prompt, "plan", semantic_text=sem)
+    key = cache.key(*ARGS, prompt)
+    bucket = cache._bucket(*ARGS)
+    found = cache._nearest
+
+    def nearest_then_evict(*a):
+        match = found(*a)
+        cache._forget(bucket, key)  # e.g. put() evicting it right after the lookup
+        return match
+
+    monkeypatch.setattr(cache, "_nearest", nearest_then_evict)
+    assert cache._semantic_hit(bucket, cache._features(sem)) == "plan"
+    cache.close()
@@ -0,0 +1,61 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import llm_client
+import llm_providers
+from llm_providers import ProviderRegistry
+
+
+def _fake_loaders(monkeypatch):
+    built = []
+
+    def loader(name):
+        def load():
+            built.append(name)
+            return SimpleNamespace(name=name, model=f"{name.lower()}-model",
+                                   generate=lambda prompt, temperature: f"{name}: {prompt}")
+        return load
+
+    monkeypatch.setattr(llm_providers, "LOADERS", {n: loader(n) for n in llm_providers.PROVIDERS})
+    return built
+
+
+def test_explicit_provider_then_role_route_then_default():
+    reg = ProviderRegistry("gemini", {"planner": "OLLAMA", "narrator": ""})
+    assert reg.resolve() == "GEMINI"
+    assert reg.resolve(role="planner") == "OLLAMA"
+    assert reg.resolve(role="narrator") == "GEMINI"
+    assert reg.resolve("openai", role="planner") == "OPENAI"
+    reg.route("planner", None)
+    assert reg.resolve(role="planner") == "GEMINI"
+
+
+def test_unknown_provider_is_rejected():
+    with pytest.raises(ValueError, match="Unknown LLM provider"):
+        ProviderRegistry("CLAUDIUS")
+    with pytest.raises(ValueError):
+        ProviderRegistry("GEMINI").route("planner", "nope")
+
+
+def test_each_backend_is_built_once_on_first_use(monkeypatch):
+    built = _fake_loaders(monkeypatch)
+    reg = ProviderRegistry("LMSTUDIO", {"narrator": "OPENAI"})
+    assert built == []
+    threads = [threading.Thread(target=reg.get) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert reg.get(role="narrator").name == "OPENAI"
+    assert built == ["LMSTUDIO", "OPENAI"] and reg.loaded() == ["LMSTUDIO", "OPENAI"]
+
+
+def test_generate_text_follows_the_role(monkeypatch):
+    _fake_loaders(monkeypatch)
+    monkeypatch.setattr(llm_client, "registry", ProviderRegistry("LMSTUDIO", {"narrator": "OLLAMA"}))
+    monkeypatch.setattr(llm_client, "response_cache", lambda: None)
+    assert llm_client.generate_text("hi", role="planner") == "LMSTUDIO: hi"
+    assert llm_client.generate_text("hi", role="narrator") == "OLLAMA: hi"
+    assert llm_client.generate_text("hi", provider="gemini") == "GEMINI: hi"
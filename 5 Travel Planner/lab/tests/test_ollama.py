@@ -0,0 +1,71 @@
+import asyncio, json, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import llm_providers
+
+
+class _Ollama(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    bodies = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        _Ollama.bodies.append(body)
+        if body.get("model") == "missing":
+            out = json.dumps({"error": "model 'missing' not found"}).encode()
+            self.send_response(404)
+        elif body.get("stream"):
+            out = b"".join(json.dumps({"response": w, "done": False}).encode() + b"\n" for w in ("Hel", "lo"))
+            out += json.dumps({"response": "", "done": True}).encode() + b"\n"
+            self.send_response(200)
+        else:
+            out = json.dumps({"response": "Hello", "done": True}).encode()
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def ollama(monkeypatch):
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    _Ollama.bodies = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Ollama)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    monkeypatch.setattr(llm_providers, "OLLAMA_BASE_URL", f"http://127.0.0.1:{httpd.server_address[1]}")
+    monkeypatch.setattr(llm_providers, "OLLAMA_KEEP_ALIVE", "30m")
+    yield llm_providers._load_ollama()
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_generate_sends_keep_alive_and_options(ollama):
+    assert ollama.generate("hi", 0.2) == "Hello"
+    body = _Ollama.bodies[-1]
+    assert body["keep_alive"] == "30m" and body["stream"] is False
+    assert body["options"] == {"temperature": 0.2} and body["prompt"] == "hi"
+
+
+def test_stream_yields_ndjson_chunks(ollama):
+    assert list(ollama.stream("hi", 0.2)) == ["Hel", "lo"]
+
+
+def test_agenerate_uses_the_async_client(ollama):
+    assert asyncio.run(ollama.agenerate("hi", 0.2)) == "Hello"
+
+
+def test_server_errors_are_raised(ollama, monkeypatch):
+    monkeypatch.setattr(llm_providers, "OLLAMA_MODEL", "missing")
+    with pytest.raises(RuntimeError, match="not found"):
+        llm_providers._load_ollama().generate("hi", 0.2)
+
+
+def test_preload_sends_no_prompt(ollama):
+    ollama.preload()
+    assert "prompt" not in _Ollama.bodies[-1] and _Ollama.bodies[-1]["keep_alive"] == "30m"
@@ -0,0 +1,43 @@
+import json
+
+import travel_agent_core as core
+from context_manager import ConversationContext
+
+
+def _script(monkeypatch, replies):
+    prompts = []
+    it = iter(replies)
+
+    def generate_text(prompt, **kw):
+        prompts.append(prompt)
+        return next(it)
+
+    monkeypatch.setattr(core, "generate_text", generate_text)
+    monkeypatch.setattr(core, "_narrates", lambda: False)
+    return prompts
+
+
+def test_one_llm_call_per_step(monkeypatch):
+    meta = json.dumps({"tool": "parse_meta", "args": {"query": "3 days in Kyoto"}})
+    prompts = _script(monkeypatch, [meta, meta, json.dumps({"final": True, "answer": "plan"})])
+    answer, trace = core.run_travel("3 days in Kyoto", fast=False, deadline_s=None)
+    assert answer == "plan"
+    assert len(prompts) == 3
+    assert [t["role"] for t in trace] == ["user", "planner", "observation", "planner", "observation", "planner", "final"]
+    assert prompts[0].endswith(ConversationContext.SUFFIX_FIRST)
+    assert prompts[1].endswith(ConversationContext.SUFFIX_NEXT) and '"days": 3' in prompts[1]
+
+
+def test_step_limit_asks_for_a_final_answer_once(monkeypatch):
+    meta = json.dumps({"tool": "parse_meta", "args": {"query": "x"}})
+    prompts = _script(monkeypatch, [meta, meta, json.dumps({"final": True, "answer": "best effort"})])
+    answer, _ = core.run_travel("x", max_steps=2, fast=False, deadline_s=None)
+    assert answer == "best effort"
+    assert len(prompts) == 3 and prompts[-1].endswith(ConversationContext.SUFFIX_LAST)
+
+
+def test_unparseable_reply_after_an_observation_finalizes(monkeypatch):
+    meta = json.dumps({"tool": "parse_meta", "args": {"query": "x"}})
+    _script(monkeypatch, [meta, "not json"])
+    answer, _ = core.run_travel("x", fast=False, deadline_s=None)
+    assert answer.startswith("Based on the observation")
@@ -0,0 +1,135 @@
+import asyncio, threading, time
+
+import pytest
+
+import rate_limit
+from rate_limit import AdaptiveLimit, RateLimits, TokenBucket, is_overload
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = _Clock()
+    monkeypatch.setattr(rate_limit, "time", c)
+    return c
+
+
+def test_bucket_serves_the_burst_then_spaces_calls(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    for _ in range(3):
+        assert bucket.acquire()
+    assert clock.slept == []
+    assert bucket.acquire() and clock.slept == [0.5]
+    assert bucket.waits == 1 and bucket.waited_s == pytest.approx(0.5)
+
+
+def test_bucket_reserves_in_arrival_order(clock):
+    bucket = TokenBucket(rate=1, burst=1)
+    assert bucket._reserve() == 0.0
+    assert [bucket._reserve() for _ in range(3)] == [1.0, 2.0, 3.0]
+
+
+def test_bucket_max_wait_takes_no_token(clock):
+    bucket = TokenBucket(rate=1, burst=1)
+    bucket.acquire()
+    assert not bucket.acquire(max_wait=0.5)
+    assert bucket._reserve(max_wait=1.0) == 1.0  # the refused call did not queue behind it
+
+
+def test_bucket_pause(clock):
+    bucket = TokenBucket(rate=1, burst=5)
+    bucket.pause(3)
+    assert bucket._reserve() == pytest.approx(4.0)
+
+
+def test_aimd_halves_once_per_burst_and_grows_back(clock):
+    limit = AdaptiveLimit(8)
+    starts = []
+    for _ in range(4):
+        assert limit.acquire()
+        starts.append(clock.monotonic())
+    clock.now += 1
+    limit.release(starts[0], ok=False)
+    assert limit.limit == 4
+    limit.release(starts[1], ok=False)  # started before the cut: same overload, no second cut
+    assert limit.limit == 4 and limit.cuts == 1
+    limit.release(clock.monotonic(), ok=False)
+    assert limit.limit == 2
+    for _ in range(2):
+        limit.release(clock.monotonic(), ok=True)
+    assert limit.limit == pytest.approx(2 + 1 / 2 + 1 / 2.5)
+
+
+def test_aimd_slow_calls_shrink_gently_and_floor_at_min(clock):
+    limit = AdaptiveLimit(10, min_limit=2, latency_target_ms=100)
+    limit.acquire()
+    limit.release(clock.monotonic(), ok=True, latency_ms=500)
+    assert limit.limit == pytest.approx(9)
+    for _ in range(10):
+        clock.now += 1
+        limit.acquire()
+        limit.release(clock.monotonic(), ok=False)
+    assert limit.limit == 2
+
+
+def test_waiters_get_slots_in_order():
+    limit = AdaptiveLimit(1)
+    assert limit.acquire()
+    assert not limit.acquire(timeout=0.01)
+    got = []
+    threads = [threading.Thread(target=lambda i=i: got.append(i) if limit.acquire(timeout=5) else None)
+               for i in range(2)]
+    for t in threads:
+        t.start()
+        while len(limit._waiters) < threads.index(t) + 1:
+            time.sleep(0.001)
+    limit.release(None, ok=True)
+    threads[0].join(5)
+    assert got == [0]
+    limit.release(None, ok=True)
+    threads[1].join(5)
+    assert got == [0, 1] and limit.in_flight == 1
+
+
+def test_async_waiter_timeout_and_grant():
+    async def main():
+        limit = AdaptiveLimit(1)
+        assert await limit.aacquire()
+        assert not await limit.aacquire(timeout=0.01)
+        waiter = asyncio.ensure_future(limit.aacquire(timeout=5))
+        await asyncio.sleep(0)
+        limit.release(None, ok=True)
+        assert await waiter and limit.in_flight == 1
+
+    asyncio.run(main())
+
+
+def test_is_overload():
+    assert is_overload(429) and is_overload(500) and is_overload(503)
+    assert not is_overload(200) and not is_overload(404) and not is_overload()
+    assert is_overload(error=TimeoutError()) and is_overload(error=RuntimeError("429 Too Many Requests"))
+    assert is_overload(error=RuntimeError("Quota exceeded")) and not is_overload(error=ValueError("bad json"))
+
+
+def test_rate_limits_begin_feeds_outcomes_back(clock):
+    limits = RateLimits({"api": 60, "free": 0}, burst_sec=1, concurrency={"api": 4})
+    assert limits.bucket("free") is None and limits.begin("free") is not None
+    finish = limits.begin("api")
+    finish(status=429, retry_after=2)
+    finish(status=429)  # a second call of the same finish is ignored
+    assert limits.adaptive("api").limit == 2 and limits.adaptive("api").in_flight == 0
+    assert limits.begin("api", max_wait=1) is None  # paused for the Retry-After
+    stats = limits.stats()["api"]
+    assert stats["rpm"] == 60 and stats["cuts"] == 1 and stats["concurrency"] == 2
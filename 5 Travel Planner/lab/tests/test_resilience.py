@@ -0,0 +1,112 @@
+import asyncio, time
+
+import pytest
+
+import resilience
+from resilience import CircuitBreaker, DeadlineExceeded, UpstreamUnavailable, deadline
+
+
+class _Clock:
+    now = 500.0
+
+    @classmethod
+    def monotonic(cls):
+        return cls.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    _Clock.now = 500.0
+    monkeypatch.setattr(resilience, "time", _Clock)
+    return _Clock
+
+
+def _fail(breaker, times=1):
+    for _ in range(times):
+        breaker.before()
+        breaker.record(False)
+
+
+def test_breaker_opens_after_failures_in_a_row(clock):
+    breaker = CircuitBreaker("wiki", failures=3, reset_sec=30)
+    _fail(breaker, 2)
+    breaker.before()
+    breaker.record(True)  # a success resets the count
+    _fail(breaker, 2)
+    assert breaker.state == "closed"
+    _fail(breaker)
+    assert breaker.state == "open" and breaker.opens == 1
+    with pytest.raises(UpstreamUnavailable) as err:
+        breaker.before()
+    assert err.value.upstream == "wiki" and err.value.retry_in == 30 and breaker.rejected == 1
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker("wiki", failures=1, reset_sec=10)
+    _fail(breaker)
+    clock.now += 10
+    breaker.before()
+    assert breaker.state == "half_open"
+    with pytest.raises(UpstreamUnavailable):
+        breaker.before()  # the probe is still running
+    breaker.record(False)
+    assert breaker.state == "open" and breaker.opens == 2
+    clock.now += 10
+    breaker.before()
+    breaker.record(True)
+    assert breaker.state == "closed" and breaker.failures == 0
+    breaker.before()
+
+
+def test_stragglers_and_no_signal_do_not_move_the_breaker(clock):
+    breaker = CircuitBreaker("wiki", failures=1, reset_sec=10)
+    breaker.before()  # straggler: let through while closed
+    _fail(breaker)
+    breaker.record(True)  # ...and finishing after the breaker opened
+    assert breaker.state == "open"
+    clock.now += 10
+    breaker.before()
+    breaker.record(None)
+    assert breaker.state == "half_open"
+    breaker.before()  # the probe said nothing, so another one may go
+
+
+def test_deadlines_nest_to_the_earliest(clock):
+    assert resilience.remaining() is None
+    with deadline(clock.now + 10):
+        with deadline(clock.now + 60):
+            assert resilience.remaining() == 10
+        with deadline(None):
+            assert resilience.remaining() == 10
+        with deadline(clock.now + 3):
+            assert resilience.remaining() == 3
+        assert resilience.remaining() == 10
+    assert resilience.remaining() is None
+
+
+def test_clip_timeout(clock):
+    assert resilience.clip_timeout(20) == 20
+    with deadline(clock.now + 5):
+        assert resilience.clip_timeout(20) == 5 and resilience.clip_timeout(2) == 2
+        clock.now += 5
+        with pytest.raises(DeadlineExceeded):
+            resilience.clip_timeout(20)
+
+
+def test_deadline_is_per_task():
+    async def task(seconds):
+        with deadline(time.monotonic() + seconds):
+            await asyncio.sleep(0)
+            return round(resilience.remaining())
+
+    async def main():
+        return await asyncio.gather(task(5), task(50))
+
+    assert asyncio.run(main()) == [5, 50]
+
+
+def test_error_observation():
+    obs = resilience.error_observation("wikipedia", UpstreamUnavailable("wikipedia", 12.4))
+    assert obs["error_type"] == "upstream_unavailable" and obs["retry_in_s"] == 12
+    assert resilience.error_observation("weather", DeadlineExceeded())["error_type"] == "deadline_exceeded"
+    assert resilience.error_observation("weather", ValueError()) is None
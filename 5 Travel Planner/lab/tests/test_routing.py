@@ -0,0 +1,97 @@
+import itertools
+import math
+import random
+
+import pytest
+
+import routing
+import travel_tools
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(routing, "_numpy", False)
+    else:
+        pytest.importorskip("numpy")
+    return request.param
+
+
+def _plane(points):
+    """Euclidean distances as the matrix type of the current backend."""
+    rows = [[math.dist(p, q) for q in points] for p in points]
+    np = routing._np()
+    return np.array(rows) if np is not None else rows
+
+
+def _best(matrix, n, round_trip):
+    tours = ([0] + list(rest) for rest in itertools.permutations(range(1, n)))
+    return min(routing.path_km(matrix, t, round_trip) for t in tours)
+
+
+def test_distance_matrix(backend):
+    tokyo, kyoto, paris = (35.6762, 139.6503), (35.0116, 135.7681), (48.8566, 2.3522)
+    m = routing.distance_matrix(*zip(tokyo, kyoto, paris))
+    assert isinstance(m, list) == (backend == "python")
+    assert m[0][1] == pytest.approx(360, abs=2) and m[0][2] == pytest.approx(9712, abs=10)
+    assert m[1][0] == m[0][1] and m[2][2] == 0
+    assert routing.rounded_rows(m)[0] == [0, round(m[0][1]), round(m[0][2])]
+
+
+def test_backends_agree(monkeypatch):
+    pytest.importorskip("numpy")
+    rnd = random.Random(3)
+    lats = [rnd.uniform(-80, 80) for _ in range(30)]
+    lons = [rnd.uniform(-180, 180) for _ in range(30)]
+    fast = routing.distance_matrix(lats, lons).tolist()
+    monkeypatch.setattr(routing, "_numpy", False)
+    slow = routing.distance_matrix(lats, lons)
+    assert all(a == pytest.approx(b, abs=1e-6) for ra, rb in zip(fast, slow) for a, b in zip(ra, rb))
+
+
+@pytest.mark.parametrize("round_trip", [False, True])
+def test_two_opt_finds_the_best_tour_on_convex_points(backend, round_trip):
+    # points on a circle, shuffled: without crossings (what 2-opt removes) the hull order is optimal
+    rnd = random.Random(5)
+    angles = [2 * math.pi * i / 9 for i in range(9)]
+    rnd.shuffle(angles)
+    matrix = _plane([(math.cos(a), math.sin(a)) for a in angles])
+    order, km, greedy_km = routing.solve_route(matrix, round_trip=round_trip)
+    assert order[0] == 0 and sorted(order) == list(range(9))
+    assert km <= greedy_km + 1e-9
+    assert km == pytest.approx(_best(matrix, 9, round_trip))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_two_opt_is_never_worse_than_greedy(backend, seed):
+    rnd = random.Random(seed)
+    n = 7
+    matrix = _plane([(rnd.random(), rnd.random()) for _ in range(n)])
+    for round_trip in (False, True):
+        order, km, greedy_km = routing.solve_route(matrix, round_trip=round_trip)
+        assert sorted(order) == list(range(n)) and order[0] == 0
+        assert km == pytest.approx(routing.path_km(matrix, order, round_trip))
+        assert _best(matrix, n, round_trip) - 1e-9 <= km <= greedy_km + 1e-9
+
+
+def test_open_path_and_round_trip_differ(backend):
+    # on a line starting at one end, the open path goes straight out; a round trip must come back
+    matrix = _plane([(0, 0), (3, 0), (1, 0), (2, 0)])
+    order, km, _ = routing.solve_route(matrix)
+    assert order == [0, 2, 3, 1] and km == pytest.approx(3)
+    order, km, _ = routing.solve_route(matrix, round_trip=True)
+    assert km == pytest.approx(6)
+
+
+def test_tiny_inputs(backend):
+    assert routing.solve_route([]) == ([], 0.0, 0.0)
+    assert routing.solve_route(_plane([(0, 0)]))[0] == [0]
+    assert routing.solve_route(_plane([(0, 0), (1, 1)]), round_trip=True)[1] == pytest.approx(2 * math.sqrt(2))
+
+
+def test_route_order_tool(backend):
+    out = travel_tools.tool_route_order(["Tokyo", "Paris", "Osaka", "Kyoto"])
+    assert out["order"] == ["Tokyo", "Kyoto", "Osaka", "Paris"] and not out["round_trip"]
+    assert len(out["legs"]) == 3 and out["total_km"] == pytest.approx(sum(leg["km"] for leg in out["legs"]), abs=2)
+    trip = travel_tools.tool_route_order("Tokyo, Paris, Kyoto", round_trip=True)
+    assert trip["legs"][-1]["to"] == "Tokyo" and len(trip["legs"]) == 3
@@ -0,0 +1,58 @@
+import pytest
+
+import service
+import travel_agent_core
+
+
+@pytest.mark.parametrize("payload", [
+    {},
+    {"query": "  "},
+    {"query": "Tokyo", "max_steps": 0},
+    {"query": "Tokyo", "max_steps": -2},
+    {"query": "Tokyo", "max_steps": True},
+    {"query": "Tokyo", "max_steps": 2.5},
+    {"query": "Tokyo", "deadline_s": 0},
+    {"query": "Tokyo", "deadline_s": -1.5},
+    {"query": "Tokyo", "deadline_s": False},
+    {"query": "Tokyo", "deadline_s": float("nan")},
+    {"query": "Tokyo", "deadline_s": "30"},
+    {"query": "Tokyo", "translate": 5},
+    {"query": "Tokyo", "translate": ["tl"]},
+    {"query": "Tokyo", "fast": "no"},
+])
+def test_validate_rejects(payload):
+    assert service._validate(payload)
+
+
+def test_validate_accepts():
+    assert service._validate({"query": "Tokyo", "max_steps": 3, "deadline_s": 2.5, "translate": "tl",
+                              "fast": False}) is None
+    assert service._validate({"query": "Tokyo", "max_steps": None, "translate": None}) is None
+
+
+@pytest.fixture
+def run_args(monkeypatch):
+    seen = {}
+
+    def fake_run(query, **kwargs):
+        seen.update(kwargs)
+        return "answer", []
+
+    monkeypatch.setattr(travel_agent_core, "run_travel", fake_run)
+    return seen
+
+
+def test_run_plan_clips_to_the_server_deadline(run_args, monkeypatch):
+    monkeypatch.setattr(service, "PLAN_DEADLINE_SEC", 90.0)
+    service.run_plan(service.Job({"query": "Tokyo", "deadline_s": 300, "max_steps": 40}, stream=False))
+    assert run_args["deadline_s"] == 90.0 and run_args["max_steps"] == 12
+    service.run_plan(service.Job({"query": "Tokyo", "deadline_s": 5}, stream=False))
+    assert run_args["deadline_s"] == 5.0 and run_args["max_steps"] == service.MAX_STEPS_DEFAULT
+
+
+def test_run_plan_without_server_deadline_keeps_the_clients(run_args, monkeypatch):
+    monkeypatch.setattr(service, "PLAN_DEADLINE_SEC", 0.0)
+    service.run_plan(service.Job({"query": "Tokyo", "deadline_s": 30}, stream=False))
+    assert run_args["deadline_s"] == 30.0
+    service.run_plan(service.Job({"query": "Tokyo"}, stream=False))
+    assert not run_args["deadline_s"]
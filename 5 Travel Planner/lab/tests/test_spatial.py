@@ -0,0 +1,90 @@
+import math
+import random
+
+import pytest
+
+import gazetteer
+from gazetteer import Gazetteer
+
+N = 5000
+
+
+def _haversine(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    h = (math.sin((p2 - p1) / 2) ** 2
+         + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * gazetteer.EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(h)))
+
+
+@pytest.fixture(scope="module")
+def world(tmp_path_factory):
+    rnd = random.Random(11)
+    rows = []
+    for i in range(N):
+        # uniform on the sphere, plus a cluster at the date line and one near the pole
+        lat = math.degrees(math.asin(rnd.uniform(-1, 1)))
+        lon = rnd.uniform(-180, 180)
+        if i % 10 == 0:
+            lat, lon = rnd.uniform(-5, 5), rnd.choice([-1, 1]) * rnd.uniform(179, 180)
+        elif i % 10 == 1:
+            lat, lon = rnd.uniform(88, 90), rnd.uniform(-180, 180)
+        rows.append((f"Place {i}", [], round(lat, 4), round(lon, 4), "XX", rnd.randrange(1_000_000)))
+    # the same places through a GeoNames-style dump and the compiled, memory-mapped index
+    src = tmp_path_factory.mktemp("gaz") / "synthetic.txt"
+    with open(src, "w", encoding="utf-8") as f:
+        for i, (name, _, lat, lon, cc, pop) in enumerate(rows):
+            f.write("\t".join([str(i), name, name, "", str(lat), str(lon), "P", "PPL", cc] + [""] * 5 + [str(pop)]) + "\n")
+    gaz = gazetteer.compile_file(str(src), str(src.with_suffix(".idx")))
+    places = [gaz.place(pid) for pid in range(gaz.places)]
+    return gaz, places
+
+
+def _brute(places, lat, lon, min_population=0):
+    return sorted((_haversine(lat, lon, p.lat, p.lon), p.id) for p in places if p.population >= min_population)
+
+
+def _queries(n, seed):
+    rnd = random.Random(seed)
+    out = [(0.0, 180.0), (0.0, -179.99), (90.0, 0.0), (-90.0, 0.0), (89.5, 45.0)]
+    out += [(math.degrees(math.asin(rnd.uniform(-1, 1))), rnd.uniform(-180, 180)) for _ in range(n)]
+    return out
+
+
+def test_index_holds_every_place(world):
+    gaz, places = world
+    assert gaz.places == N and places[42].name == "Place 42"
+
+
+@pytest.mark.parametrize("k", [1, 5, 25])
+def test_nearest_matches_brute_force(world, k):
+    gaz, places = world
+    for lat, lon in _queries(60, seed=k):
+        got = gaz.nearest(lat, lon, k=k)
+        every = _brute(places, lat, lon)
+        want = every[:k]
+        assert [km for _, km in got] == pytest.approx([km for km, _ in want], abs=0.1)
+        # ids agree except between places as far as the k-th one (e.g. on one latitude at the pole)
+        ties = {pid for km, pid in every if abs(km - want[-1][0]) < 0.05}
+        assert {p.id for p, _ in got} ^ {pid for _, pid in want} <= ties
+
+
+@pytest.mark.parametrize("radius_km", [50, 500, 2500])
+def test_within_matches_brute_force(world, radius_km):
+    gaz, places = world
+    for lat, lon in _queries(40, seed=radius_km):
+        got = gaz.within(lat, lon, radius_km, limit=N)
+        want = [(km, pid) for km, pid in _brute(places, lat, lon) if km <= radius_km]
+        edge = {pid for km, pid in _brute(places, lat, lon) if abs(km - radius_km) < 0.05}
+        assert ({p.id for p, _ in got} ^ {pid for _, pid in want}) <= edge
+        assert [km for _, km in got] == sorted(km for _, km in got)
+
+
+def test_filters(world):
+    gaz, places = world
+    lat, lon = 10.0, 20.0
+    got = gaz.nearest(lat, lon, k=10, min_population=900_000)
+    assert all(p.population >= 900_000 for p, _ in got)
+    assert [p.id for p, _ in got] == [pid for _, pid in _brute(places, lat, lon, min_population=900_000)[:10]]
+    first_km = _brute(places, lat, lon)[0][0]
+    assert gaz.nearest(lat, lon, max_km=first_km - 1) == []
+    assert gaz.within(lat, lon, 3000, limit=3) == gaz.nearest(lat, lon, k=3, max_km=3000)
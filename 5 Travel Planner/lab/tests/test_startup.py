@@ -0,0 +1,30 @@
+import subprocess
+
+import bench_startup
+
+
+def _imported(args, tmp_path):
+    proc = subprocess.run(bench_startup._cmd(args)[:1] + ["-X", "importtime"] + bench_startup._cmd(args)[1:],
+                          cwd=tmp_path, env=bench_startup._env("LMSTUDIO"), capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    return proc, bench_startup.parse_importtime(proc.stderr)[1]
+
+
+def test_help_does_not_load_sdks_http_or_tools(tmp_path):
+    proc, seen = _imported(bench_startup.SCENARIOS["help"], tmp_path)
+    assert "usage" in proc.stdout.lower()
+    assert [m for m in bench_startup.HELP_MUST_NOT_IMPORT if m in seen] == []
+
+
+def test_importing_the_tools_opens_no_cache(tmp_path):
+    _, seen = _imported(["-c", "import travel_tools, travel_agent_core; assert travel_tools._cache is None"], tmp_path)
+    assert "numpy" not in seen  # routing loads it on the first distance_matrix call
+    assert list(tmp_path.iterdir()) == []  # no cache.log / llm_cache.log written
+
+
+def test_parse_importtime_keeps_top_level_totals():
+    stderr = ("import time: self [us] | cumulative | imported package\n"
+              "import time:       100 |        300 | json\n"
+              "import time:        50 |         50 |   json.decoder\n")
+    top, seen = bench_startup.parse_importtime(stderr)
+    assert top == {"json": 300} and seen == {"json", "json.decoder"}
@@ -0,0 +1,41 @@
+import asyncio
+
+import travel_tools
+
+
+def test_several_cities_cost_one_request(open_meteo):
+    out = travel_tools.tool_weather_batch(["Tokyo", "Paris", "London"])
+    assert len(open_meteo) == 1
+    assert len(open_meteo[0]["latitude"].split(",")) == 3
+    assert [r["city"] for r in out["results"]] == ["Tokyo", "Paris", "London"]
+    assert all(r["temp_now_c"] is not None for r in out["results"])
+
+
+def test_each_city_is_cached_under_its_own_key(open_meteo, tool_cache):
+    travel_tools.tool_weather_batch(["Tokyo", "Paris"])
+    assert tool_cache.get("weather:tokyo,jp") is not None
+    out = travel_tools.tool_weather_batch(["Paris", "London"])
+    assert len(open_meteo) == 2
+    assert open_meteo[1]["latitude"] == str(travel_tools.gazetteer.resolve("London").lat)  # Paris came from the cache
+    assert [r["cached"] for r in out["results"]] == [True, False]
+
+
+def test_duplicates_collapse_and_single_weather_uses_the_batch(open_meteo):
+    out = travel_tools.tool_weather_batch(["Tokyo", "tokyo", "TOKYO"])
+    assert len(out["results"]) == 1
+    assert travel_tools.tool_weather("Tokyo")["cached"] is True
+    assert len(open_meteo) == 1
+
+
+def test_async_batch_matches_sync(open_meteo):
+    out = asyncio.run(travel_tools.atool_weather_batch(["Tokyo", "Paris"]))
+    assert [r["city"] for r in out["results"]] == ["Tokyo", "Paris"]
+    assert len(open_meteo) == 1
+
+
+def test_results_follow_the_input_order(open_meteo):
+    travel_tools.tool_weather_batch(["Tokyo"])
+    out = travel_tools.tool_weather_batch(["Kyoto", "Atlantis", "Tokyo", "kyoto"])
+    assert [r["city"] for r in out["results"]] == ["Kyoto", "Atlantis", "Tokyo"]
+    assert [r.get("cached") for r in out["results"]] == [False, None, True]
+    assert "error" in out["results"][1]
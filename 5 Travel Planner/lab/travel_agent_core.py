@@ -1,24 +1,50 @@
+import asyncio
+import contextvars
 import json
 import re
-from typing import Dict, Any, List, Tuple, Optional
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 
-from llm_client import generate_text
-from travel_tools import TOOL_REGISTRY
+import fast_path
+from config import (ASYNC_TOOL_CONCURRENCY, CONTEXT_BUDGET_TOKENS, CONTEXT_KEEP_RECENT, FAST_PATH, MAX_PARALLEL_TOOLS,
+                    PLAN_DEADLINE_SEC, TOOL_CONCURRENCY, TOOL_CONCURRENCY_DEFAULT)
+from context_manager import ConversationContext, estimate_tokens
+from answer_stream import AnswerStream
+from llm_client import agenerate_text, generate_text, registry, stream_text
+from resilience import deadline, error_observation
+from travel_tools import ASYNC_TOOLS, TOOL_REGISTRY
 
 SYS = """
 You are a **Travel Planner**. Respond with STRICT JSON ONLY.
 
 Choose ONE of:
 1) An action:
-   {"tool":"<weather|wikipedia|distance|translate|parse_meta>","args":{...}}
-2) Or finalize:
+   {"tool":"<weather|weather_batch|wikipedia|distance|distance_matrix|route_order|nearby|translate|parse_meta>","args":{...}}
+2) Several independent actions at once (they run in parallel):
+   {"tools":[{"tool":"weather","args":{"city":"Tokyo"}},{"tool":"weather","args":{"city":"Kyoto"}}]}
+3) Or finalize:
    {"final":true,"answer":"... friendly, practical, day-by-day itinerary ..."}
 
 Rules:
 - Output must be a single-line JSON object with double quotes.
 - No extra text outside JSON.
 - Prefer short iterative actions; finalize when sufficient.
+- Batch actions that do not depend on each other (e.g. weather or wikipedia for
+  several cities) into one "tools" list instead of asking for them one by one.
+- For the weather in several cities prefer a single
+  {"tool":"weather_batch","args":{"cities":["Tokyo","Kyoto"]}} (one request for all).
+  Weather gives the temperature now and today's min/max; add "days":N for the min/max of
+  each of the next N days, or "day":2 (days from today) / "day":"YYYY-MM-DD" for one day.
+- For 3+ cities do not ask for distances pair by pair: {"tool":"route_order","args":{"cities":[...]}}
+  gives a short visiting order (from the first city) with the km of every leg, and
+  {"tool":"distance_matrix","args":{"cities":[...]}} all pairwise km.
+- A city the tools do not know comes back with an error. If you know where it is, pass "lat,lon"
+  as the city (it snaps to the nearest known place), or ask
+  {"tool":"nearby","args":{"lat":..,"lon":..,"radius_km":50}} for the places around it.
 - When finalizing, include: a brief overview, daily plan, weather note(s), 
   distances if relevant, and 2-4 must-try foods/experiences.
 - If user asked to translate, you may call translate at the end.
@@ -42,79 +68,278 @@ def call_tool(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
     except TypeError as e:
         return {"error": f"Bad args for {tool_name}: {e}"}
     except Exception as e:
-        return {"error": f"Tool {tool_name} failed: {e}"}
+        return error_observation(tool_name, e) or {"error": f"Tool {tool_name} failed: {e}"}
 
-def run_travel(query: str, max_steps: int = 6, translate_lang: Optional[str] = None, verbose: bool=False) -> Tuple[str, List[Dict[str, Any]]]:
+_pool: Optional[ThreadPoolExecutor] = None
+_limits: Dict[str, threading.BoundedSemaphore] = {}
+_limits_lock = threading.Lock()
+
+def _limited_call(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    # Per-tool cap so a batch of translations can't flood one LibreTranslate instance
+    with _limits_lock:
+        sem = _limits.get(tool_name)
+        if sem is None:
+            sem = _limits[tool_name] = threading.BoundedSemaphore(
+                TOOL_CONCURRENCY.get(tool_name, TOOL_CONCURRENCY_DEFAULT))
+    with sem:
+        return call_tool(tool_name, args)
+
+def call_tools(actions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Run several {"tool","args"} actions concurrently; results keep the input order."""
+    global _pool
+    if len(actions) <= 1:
+        return [_limited_call(a.get("tool"), a.get("args") or {}) for a in actions]
+    with _limits_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=MAX_PARALLEL_TOOLS, thread_name_prefix="tool")
+    # each task gets a copy of the caller's context, so the plan's deadline applies in the pool too
+    futures = [_pool.submit(contextvars.copy_context().run, _limited_call, a.get("tool"), a.get("args") or {})
+               for a in actions]
+    return [f.result() for f in futures]
+
+def actions_of(decision: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Normalize a planner decision to a list of actions ({"tool"} or {"tools":[...]})."""
+    if isinstance(decision.get("tools"), list):
+        return [a for a in decision["tools"] if isinstance(a, dict)]
+    if decision.get("tool"):
+        return [{"tool": decision.get("tool"), "args": decision.get("args", {}) or {}}]
+    return []
+
+def _decide(text: str, query: str, obs: Any) -> Dict[str, Any]:
+    try:
+        return parse_json(text)
+    except Exception:
+        if obs is not None:
+            return {"final": True, "answer": f"Based on the observation: {obs}. (Planner could not finalize.)"}
+        # Fallback: try parse_meta then wikipedia on first city found in query
+        return {"tool": "parse_meta", "args": {"query": query}}
+
+def _plan(prompt: str, on_token: Optional[Callable[[str], None]], role: str = "planner") -> str:
+    """One planner call; with on_token, stream it and pass on the answer text as it arrives."""
+    if on_token is None:
+        return generate_text(prompt, temperature=0.3, semantic_text=prompt[len(SYS):], role=role)
+    answer, parts = AnswerStream(), []
+    for piece in stream_text(prompt, temperature=0.3, semantic_text=prompt[len(SYS):], role=role):
+        parts.append(piece)
+        delta = answer.feed(piece)
+        if delta:
+            on_token(delta)
+    return "".join(parts)
+
+def _expired(ends: Optional[float]) -> bool:
+    return ends is not None and time.monotonic() >= ends
+
+def _narrates() -> bool:
+    """True when the final answer is routed to a different provider than the planner steps."""
+    return registry.resolve(role="narrator") != registry.resolve(role="planner")
+
+def _record_results(record, step: int, actions: List[Dict[str, Any]], results: List[Dict[str, Any]]) -> Any:
+    for action, result in zip(actions, results):
+        record("observation", {"step": step, "tool": action.get("tool"), "args": action.get("args") or {}, "observation": result})
+    return results[0] if len(results) == 1 else results
+
+def run_travel(query: str, max_steps: int = 6, translate_lang: Optional[str] = None, verbose: bool=False,
+               on_token: Optional[Callable[[str], None]] = None,
+               on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+               deadline_s: Optional[float] = PLAN_DEADLINE_SEC, fast: bool = FAST_PATH) -> Tuple[str, List[Dict[str, Any]]]:
+    """on_token gets the final answer's text while the model is still writing it (streaming);
+    on_event gets every trace record as soon as it is added. Tool calls share a deadline of
+    deadline_s seconds from now (None = none); once it has passed the planner must finalize.
+    With fast=True a query fast_path recognizes skips the planner steps (see fast_path.py)."""
     trace: List[Dict[str, Any]] = []
-    context = f"User: {query}\n"
+    ends = time.monotonic() + deadline_s if deadline_s else None
+    ctx = ConversationContext(SYS, query, CONTEXT_BUDGET_TOKENS, CONTEXT_KEEP_RECENT)
 
     def record(role: str, data: Dict[str, Any]):
         trace.append({"ts": datetime.utcnow().isoformat() + "Z", "role": role, "data": data})
+        if on_event:
+            on_event(trace[-1])
+
+    def finish(step: int, answer: str) -> Tuple[str, List[Dict[str, Any]]]:
+        if translate_lang:
+            # Final translation pass via tool if asked
+            with deadline(ends):
+                t = call_tool("translate", {"text": answer, "target_lang": translate_lang})
+            if "translated" in t:
+                answer = t["translated"]
+                record("observation", {"step": step, "tool": "translate", "args": {"target_lang": translate_lang}, "observation": t})
+        record("final", {"answer": answer})
+        return answer, trace
 
     record("user", {"query": query})
 
     # Optionally hint the model if translation requested
     if translate_lang:
-        context += f"Hint: user requested final translation to '{translate_lang}'.\n"
+        ctx.hint(f"Hint: user requested final translation to '{translate_lang}'.")
 
-    for step in range(1, max_steps + 1):
-        prompt = f"""{SYS}
-
-Conversation so far:
-{context}
+    obs = None
+    narrate = _narrates()
+    first = 1
+    plan = fast_path.match(query) if fast else None
+    if plan:
+        # Known plan: run its tools at once, then one call writes the final answer
+        record("fast_path", {"rule": plan.rule, "actions": plan.actions})
+        with deadline(ends):
+            results = call_tools(plan.actions)
+        obs = _record_results(record, 1, plan.actions, results)
+        ctx.add({"tools": plan.actions}, obs)
+        prompt = ctx.planner_prompt(last=True)
+        decision = _decide(_plan(prompt, on_token, role="narrator"), query, None)
+        record("planner", {"step": 1, "decision": decision, "prompt_tokens": estimate_tokens(prompt),
+                           "fast_path": plan.rule})
+        if decision.get("final"):
+            return finish(1, decision.get("answer", "(no answer)"))
+        fast_path.fell_back(plan)
+        first = 2
 
-Your JSON:
-"""
-        text = generate_text(prompt, temperature=0.3)
-        try:
-            decision = parse_json(text)
-        except Exception:
-            # Fallback: try parse_meta then wikipedia on first city found in query
-            decision = {"tool": "parse_meta", "args": {"query": query}}
-        record("planner", {"step": step, "decision": decision})
+    # One planner call per step: it sees the latest observation in the conversation and
+    # either finalizes or picks the next action(s). After max_steps tool rounds, one
+    # last call may only finalize.
+    for step in range(first, max_steps + 2):
+        last = step > max_steps or _expired(ends)
+        prompt = ctx.planner_prompt(last=last)
+        text = _plan(prompt, None if narrate else on_token)
+        decision = _decide(text, query, obs)
+        record("planner", {"step": step, "decision": decision, "prompt_tokens": estimate_tokens(prompt)})
 
+        if decision.get("final") and narrate:
+            # Planner is done; the narrator provider writes the answer from the same context
+            prompt = ctx.planner_prompt(last=True)
+            narrated = _decide(_plan(prompt, on_token, role="narrator"), query, None)
+            record("narrator", {"step": step, "provider": registry.resolve(role="narrator"),
+                                "decision": narrated, "prompt_tokens": estimate_tokens(prompt)})
+            if narrated.get("final"):
+                decision = narrated
         if decision.get("final"):
-            answer = decision.get("answer", "(no answer)")
-            if translate_lang:
-                # Final translation pass via tool if asked
-                t = call_tool("translate", {"text": answer, "target_lang": translate_lang})
-                if "translated" in t:
-                    answer = t["translated"]
-                    record("observation", {"step": step, "tool": "translate", "args": {"target_lang": translate_lang}, "observation": t})
-            record("final", {"answer": answer})
-            return answer, trace
-
-        tool = decision.get("tool")
-        args = decision.get("args", {})
-        obs = call_tool(tool, args) if tool else {"error": "No tool specified"}
-        record("observation", {"step": step, "tool": tool, "args": args, "observation": obs})
-        context += f"Planner: {json.dumps(decision)}\nObservation: {json.dumps(obs)}\n"
-
-        finalize = f"""{SYS}
-Latest observation: {json.dumps(obs)}
-If you can answer now, return {{"final":true,"answer":"..."}}
-Otherwise, return the next {{"tool":...,"args":...}}.
-"""
-        text2 = generate_text(finalize, temperature=0.3)
-        try:
-            decision2 = parse_json(text2)
-        except Exception:
-            answer = f"Based on the observation: {obs}. (Planner could not finalize.)"
-            record("final", {"answer": answer})
-            return answer, trace
-        record("planner", {"step": step, "decision": decision2})
-
-        if decision2.get("final"):
-            answer = decision2.get("answer", "(no answer)")
-            if translate_lang:
-                t = call_tool("translate", {"text": answer, "target_lang": translate_lang})
-                if "translated" in t:
-                    answer = t["translated"]
-                    record("observation", {"step": step, "tool": "translate", "args": {"target_lang": translate_lang}, "observation": t})
-            record("final", {"answer": answer})
-            return answer, trace
+            return finish(step, decision.get("answer", "(no answer)"))
+        if last:
+            break
+
+        actions = actions_of(decision)
+        if actions:
+            with deadline(ends):
+                results = call_tools(actions)
         else:
-            context += f"Planner: {json.dumps(decision2)}\n"
+            actions, results = [{"tool": None, "args": {}}], [{"error": "No tool specified"}]
+        obs = _record_results(record, step, actions, results)
+        ctx.add(decision, obs)
+
+    answer = "I reached the step limit. Try a more specific travel request (cities, days, month, budget)."
+    record("final", {"answer": answer})
+    return answer, trace
+
+
+# ---------------------------------------------------------------------------
+# asyncio variant: same protocol and trace, but LLM and HTTP calls are awaited,
+# so one event loop can drive many plans at once. Cancelling the task that runs
+# arun_travel cancels any in-flight tool calls with it.
+# ---------------------------------------------------------------------------
+# An asyncio.Semaphore belongs to the loop that first waits on it, so each running loop
+# (every asyncio.run, e.g. two run_batch calls in one process) gets its own set
+_alimits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+
+def _alimit(tool_name: str) -> asyncio.Semaphore:
+    limits = _alimits.get(asyncio.get_running_loop())
+    if limits is None:
+        limits = _alimits[asyncio.get_running_loop()] = {}
+    sem = limits.get(tool_name)
+    if sem is None:
+        sem = limits[tool_name] = asyncio.Semaphore(ASYNC_TOOL_CONCURRENCY.get(tool_name, TOOL_CONCURRENCY_DEFAULT))
+    return sem
+
+async def acall_tool(tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    afn = ASYNC_TOOLS.get(tool_name)
+    if afn is None:
+        return call_tool(tool_name, args)  # unknown tool or CPU-only helper
+    sem = _alimit(tool_name)
+    try:
+        async with sem:
+            return await afn(**args)
+    except TypeError as e:
+        return {"error": f"Bad args for {tool_name}: {e}"}
+    except Exception as e:
+        return error_observation(tool_name, e) or {"error": f"Tool {tool_name} failed: {e}"}
+
+async def acall_tools(actions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return list(await asyncio.gather(*(acall_tool(a.get("tool"), a.get("args") or {}) for a in actions)))
+
+async def arun_travel(query: str, max_steps: int = 6, translate_lang: Optional[str] = None,
+                      trace: Optional[List[Dict[str, Any]]] = None,
+                      deadline_s: Optional[float] = PLAN_DEADLINE_SEC, fast: bool = FAST_PATH) -> Tuple[str, List[Dict[str, Any]]]:
+    """Async run_travel. Pass your own trace list to keep the partial trace if the task is cancelled."""
+    trace = trace if trace is not None else []
+    ends = time.monotonic() + deadline_s if deadline_s else None
+    ctx = ConversationContext(SYS, query, CONTEXT_BUDGET_TOKENS, CONTEXT_KEEP_RECENT)
+
+    def record(role: str, data: Dict[str, Any]):
+        trace.append({"ts": datetime.utcnow().isoformat() + "Z", "role": role, "data": data})
+
+    async def finish(step: int, answer: str) -> Tuple[str, List[Dict[str, Any]]]:
+        if translate_lang:
+            with deadline(ends):
+                t = await acall_tool("translate", {"text": answer, "target_lang": translate_lang})
+            if "translated" in t:
+                answer = t["translated"]
+                record("observation", {"step": step, "tool": "translate", "args": {"target_lang": translate_lang}, "observation": t})
+        record("final", {"answer": answer})
+        return answer, trace
+
+    record("user", {"query": query})
+    if translate_lang:
+        ctx.hint(f"Hint: user requested final translation to '{translate_lang}'.")
+
+    obs = None
+    narrate = _narrates()
+    first = 1
+    plan = fast_path.match(query) if fast else None
+    try:
+        if plan:
+            record("fast_path", {"rule": plan.rule, "actions": plan.actions})
+            with deadline(ends):
+                results = await acall_tools(plan.actions)
+            obs = _record_results(record, 1, plan.actions, results)
+            ctx.add({"tools": plan.actions}, obs)
+            prompt = ctx.planner_prompt(last=True)
+            text = await agenerate_text(prompt, temperature=0.3, semantic_text=prompt[len(SYS):], role="narrator")
+            decision = _decide(text, query, None)
+            record("planner", {"step": 1, "decision": decision, "prompt_tokens": estimate_tokens(prompt),
+                               "fast_path": plan.rule})
+            if decision.get("final"):
+                return await finish(1, decision.get("answer", "(no answer)"))
+            fast_path.fell_back(plan)
+            first = 2
+
+        for step in range(first, max_steps + 2):
+            last = step > max_steps or _expired(ends)
+            prompt = ctx.planner_prompt(last=last)
+            text = await agenerate_text(prompt, temperature=0.3, semantic_text=prompt[len(SYS):], role="planner")
+            decision = _decide(text, query, obs)
+            record("planner", {"step": step, "decision": decision, "prompt_tokens": estimate_tokens(prompt)})
+
+            if decision.get("final") and narrate:
+                prompt = ctx.planner_prompt(last=True)
+                text = await agenerate_text(prompt, temperature=0.3, semantic_text=prompt[len(SYS):], role="narrator")
+                narrated = _decide(text, query, None)
+                record("narrator", {"step": step, "provider": registry.resolve(role="narrator"),
+                                    "decision": narrated, "prompt_tokens": estimate_tokens(prompt)})
+                if narrated.get("final"):
+                    decision = narrated
+            if decision.get("final"):
+                return await finish(step, decision.get("answer", "(no answer)"))
+            if last:
+                break
+
+            actions = actions_of(decision)
+            if actions:
+                with deadline(ends):
+                    results = await acall_tools(actions)
+            else:
+                actions, results = [{"tool": None, "args": {}}], [{"error": "No tool specified"}]
+            obs = _record_results(record, step, actions, results)
+            ctx.add(decision, obs)
+    except asyncio.CancelledError:
+        record("cancelled", {"query": query})
+        raise
 
     answer = "I reached the step limit. Try a more specific travel request (cities, days, month, budget)."
     record("final", {"answer": answer})
@@ -1,81 +1,238 @@
+import datetime
 import math
 import re
-import requests
-from tenacity import retry, stop_after_attempt, wait_exponential
-
-from cache import JsonCache
-from config import CACHE_FILE, CACHE_TTL_SEC, HTTP_TIMEOUT, TRANSLATE_BASE_URL
-
-cache = JsonCache(CACHE_FILE, ttl_sec=CACHE_TTL_SEC)
-
-# Approximate coordinates for a starter set
-CITY_COORDS = {
-    "manila": (14.5995, 120.9842),
-    "cebu": (10.3157, 123.8854),
-    "baguio": (16.4023, 120.5960),
-    "tokyo": (35.6762, 139.6503),
-    "kyoto": (35.0116, 135.7681),
-    "osaka": (34.6937, 135.5023),
-    "singapore": (1.3521, 103.8198),
-    "london": (51.5074, -0.1278),
-    "paris": (48.8566, 2.3522),
-    "new york": (40.7128, -74.0060),
-    "sydney": (-33.8688, 151.2093),
-}
+import threading
+from typing import Any, Dict, Optional
+from tenacity import retry, retry_if_not_exception_type, stop_after_attempt, stop_any, wait_exponential
+
+import forecast
+import gazetteer
+import http_client
+import resilience
+import routing
+from config import CACHE_BACKEND, CACHE_FILE, CACHE_MAX_ENTRIES, CACHE_STALE_SEC, CACHE_SWEEP_SEC, CACHE_TTL_BY_NS, CACHE_TTL_SEC, FORECAST_DAYS, GAZETTEER_SNAP_KM, TRANSLATE_BASE_URL
+
+# Opened on the first tool call, so importing this module does not replay the log or start the sweeper
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                from cache import JsonCache
+                _cache = JsonCache(CACHE_FILE, ttl_sec=CACHE_TTL_SEC, backend=CACHE_BACKEND, max_entries=CACHE_MAX_ENTRIES,
+                                   ttl_by_ns=CACHE_TTL_BY_NS, sweep_sec=CACHE_SWEEP_SEC, stale_sec=CACHE_STALE_SEC)
+    return _cache
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=8))
+def _out_of_time(retry_state) -> bool:
+    left = resilience.remaining()
+    return left is not None and left < 1  # not worth another backoff + attempt
+
+# All calls go through the shared pooled client (keep-alive, per-host metrics, circuit
+# breakers, deadline). Open circuits and spent deadlines fail at once instead of retrying.
+_retry = retry(stop=stop_any(stop_after_attempt(3), _out_of_time), wait=wait_exponential(min=1, max=8),
+               retry=retry_if_not_exception_type((resilience.UpstreamUnavailable, resilience.DeadlineExceeded)),
+               reraise=True)
+
+@_retry
 def _http_get(url, params=None, headers=None):
-    from config import HTTP_TIMEOUT
-    return requests.get(url, params=params, headers=headers, timeout=HTTP_TIMEOUT)
+    return http_client.get(url, params=params, headers=headers)
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=8))
+@_retry
 def _http_post(url, json_data=None, headers=None):
-    from config import HTTP_TIMEOUT
-    return requests.post(url, json=json_data, headers=headers, timeout=HTTP_TIMEOUT)
-
-def tool_weather(city: str):
-    target = (city or "manila").lower().strip()
-    chosen = None
-    for name in CITY_COORDS:
-        if name in target:
-            chosen = name
-            break
-    if not chosen:
-        chosen = "manila"
-    lat, lon = CITY_COORDS[chosen]
-    cache_key = f"weather:{chosen}"
-    cached = cache.get(cache_key)
-    if cached:
-        return {"city": chosen.title(), **cached, "cached": True}
-    url = "https://api.open-meteo.com/v1/forecast"
-    params = {"latitude": lat, "longitude": lon, "hourly": "temperature_2m"}
-    r = _http_get(url, params=params)
+    return http_client.post(url, json=json_data, headers=headers)
+
+@_retry
+async def _ahttp_get(url, params=None, headers=None):
+    return await http_client.aget(url, params=params, headers=headers)
+
+@_retry
+async def _ahttp_post(url, json_data=None, headers=None):
+    return await http_client.apost(url, json=json_data, headers=headers)
+
+WEATHER_URL = "https://api.open-meteo.com/v1/forecast"
+
+def _match_city(city: str) -> Optional[gazetteer.Place]:
+    # "lat,lon" (nearest place), exact name/alias, "Name, CC", a place named in the text, then fuzzy
+    return gazetteer.resolve(city or "")
+
+def _unknown_city(city) -> Dict[str, Any]:
+    if not (city or "").strip():
+        return {"city": city, "error": "no city given"}
+    if gazetteer.parse_lat_lon(city):
+        return {"city": city, "error": f"no known place within {GAZETTEER_SNAP_KM:g} km (the nearby tool lists the closest)"}
+    return {"city": city, "error": f"unknown place '{city}': pass \"lat,lon\" or use the nearby tool"}
+
+def _weather_params(places):
+    # Open-Meteo takes comma-separated coordinate lists and answers with one
+    # location per pair, so N cities cost one request. The whole hourly series
+    # is kept (forecast.py): "now", a later trip day and daily min/max all
+    # come from the cached entry
+    return {
+        "latitude": ",".join(str(p.lat) for p in places),
+        "longitude": ",".join(str(p.lon) for p in places),
+        "hourly": "temperature_2m",
+        "timeformat": "unixtime",
+        "timezone": "auto",
+        "forecast_days": FORECAST_DAYS,
+    }
+
+def _weather_value(loc):
+    series = forecast.Forecast.from_open_meteo(loc)
+    return series.to_value() if series else None
+
+def _trip_day(day):
+    """Day offset from today (int or "2"), or a datetime.date for "YYYY-MM-DD"; None if unreadable."""
+    if isinstance(day, str) and "-" in day.strip()[1:]:
+        try:
+            return datetime.date.fromisoformat(day.strip())
+        except ValueError:
+            return None
+    try:
+        return int(day)
+    except (TypeError, ValueError):
+        return None
+
+def _weather_result(place, value, cached, day=None, days=None):
+    series = forecast.Forecast.from_value(value)
+    if series is None:
+        return {"city": place.name, "error": "no forecast for this place"}
+    out = {"city": place.name, "temp_now_c": series.now(), "today": series.day(0)}
+    if day is not None:
+        which = _trip_day(day)
+        out["day"] = series.day(which) if which is not None else None
+        if out["day"] is None:
+            out["day_error"] = f"day {day!r} is not in the {FORECAST_DAYS}-day forecast"
+    if days:
+        out["daily"] = series.daily(_trip_day(days) or 1)
+    out["source"] = "Open-Meteo hourly temperature_2m"
+    out["cached"] = cached
+    return out
+
+def _weather_plan(cities):
+    """Resolve city names and split them into cached (fresh or stale) and to-fetch.
+
+    order keeps the input order: a Place per distinct city (repeats collapse
+    into the first) and an error dict where a name did not resolve.
+    """
+    if isinstance(cities, str):
+        cities = gazetteer.split_names(cities)
+    order, places = [], {}
+    for city in cities or [None]:
+        place = _match_city(city)
+        if place is None:
+            order.append(_unknown_city(city))
+        elif place not in places:
+            places[place] = None
+            order.append(place)
+    places = list(places)
+    values, missing, stale = {}, [], []
+    for place in places:
+        hit = get_cache().lookup(f"weather:{place.key}")
+        if hit is None or forecast.Forecast.from_value(hit[0]) is None:  # also entries from before the series
+            missing.append(place)
+            continue
+        values[place] = hit[0]
+        if not hit[1]:
+            stale.append(place)
+    return order, values, missing, stale
+
+def _flight_key(places):
+    # same key as the cache entry for one city, so identical fetches coalesce
+    return "weather:" + ";".join(sorted(p.key for p in places))
+
+def _weather_store(places, data):
+    locations = data if isinstance(data, list) else [data]
+    values = {}
+    for place, loc in zip(places, locations):
+        values[place] = _weather_value(loc)
+        if values[place] is not None:
+            get_cache().set(f"weather:{place.key}", values[place])
+    return values
+
+def _fetch_weather(places):
+    r = _http_get(WEATHER_URL, params=_weather_params(places))
+    r.raise_for_status()
+    return _weather_store(places, r.json())
+
+async def _afetch_weather(places):
+    r = await _ahttp_get(WEATHER_URL, params=_weather_params(places))
+    r.raise_for_status()
+    return _weather_store(places, r.json())
+
+def _weather_results(order, values, fetched, shared, day, days):
+    results = []
+    for entry in order:
+        if isinstance(entry, dict):
+            results.append(entry)
+        elif entry in values:
+            results.append(_weather_result(entry, values[entry], True, day, days))
+        else:
+            results.append(_weather_result(entry, fetched.get(entry), shared, day, days))
+    return {"results": results}
+
+def tool_weather_batch(cities, day=None, days=None):
+    """Now and today's min/max per city; `day` (0 = today, or "YYYY-MM-DD") or `days` (the next N) for a trip."""
+    order, values, missing, stale = _weather_plan(cities)
+    if stale:  # served as-is, refreshed by one background fetch
+        get_cache().revalidate(_flight_key(stale), lambda: _fetch_weather(stale))
+    fetched, shared = {}, False
+    if missing:  # concurrent callers for the same cities share one request
+        fetched, shared = get_cache().shared_load(_flight_key(missing), lambda: _fetch_weather(missing))
+    return _weather_results(order, values, fetched, shared, day, days)
+
+async def atool_weather_batch(cities, day=None, days=None):
+    order, values, missing, stale = _weather_plan(cities)
+    if stale:
+        get_cache().arevalidate(_flight_key(stale), lambda: _afetch_weather(stale))
+    fetched, shared = {}, False
+    if missing:
+        fetched, shared = await get_cache().ashared_load(_flight_key(missing), lambda: _afetch_weather(missing))
+    return _weather_results(order, values, fetched, shared, day, days)
+
+def tool_weather(city: str, day=None, days=None):
+    return tool_weather_batch([city], day=day, days=days)["results"][0]
+
+async def atool_weather(city: str, day=None, days=None):
+    return (await atool_weather_batch([city], day=day, days=days))["results"][0]
+
+def _wiki_url(title: str) -> str:
+    return f"https://en.wikipedia.org/api/rest_v1/page/summary/{title}"
+
+def _wiki_value(r):
+    if r.status_code in (400, 404):
+        return None  # not cached
     r.raise_for_status()
-    data = r.json()
-    temps = data.get("hourly", {}).get("temperature_2m", [])
-    now_c = temps[0] if temps else None
-    value = {"temp_now_c": now_c, "source": "Open-Meteo hourly temperature_2m"}
-    cache.set(cache_key, value)
-    return {"city": chosen.title(), **value, "cached": False}
+    return {"summary": r.json().get("extract")}
+
+def _wiki_result(topic: str, value, cached: bool):
+    if value is None:
+        return {"topic": topic, "summary": None, "error": "not found"}
+    return {"topic": topic, **value, "cached": cached}
 
 def tool_wikipedia(topic: str):
     topic = (topic or "").strip()
     if not topic:
         return {"topic": topic, "summary": None, "error": "empty topic"}
     title = topic.replace(" ", "_")
-    cache_key = f"wiki:{title.lower()}"
-    cached = cache.get(cache_key)
-    if cached:
-        return {"topic": topic, **cached, "cached": True}
-    url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{title}"
-    r = _http_get(url, headers={"Accept": "application/json"})
-    if r.status_code in (400, 404):
-        return {"topic": topic, "summary": None, "error": "not found"}
-    r.raise_for_status()
-    data = r.json()
-    value = {"summary": data.get("extract")}
-    cache.set(cache_key, value)
-    return {"topic": topic, **value, "cached": False}
+    value, cached = get_cache().get_or_load(
+        f"wiki:{title.lower()}",
+        lambda: _wiki_value(_http_get(_wiki_url(title), headers={"Accept": "application/json"})))
+    return _wiki_result(topic, value, cached)
+
+async def atool_wikipedia(topic: str):
+    topic = (topic or "").strip()
+    if not topic:
+        return {"topic": topic, "summary": None, "error": "empty topic"}
+    title = topic.replace(" ", "_")
+
+    async def load():
+        return _wiki_value(await _ahttp_get(_wiki_url(title), headers={"Accept": "application/json"}))
+
+    value, cached = await get_cache().aget_or_load(f"wiki:{title.lower()}", load)
+    return _wiki_result(topic, value, cached)
 
 def haversine_km(a, b):
     R = 6371.0
@@ -87,21 +244,94 @@ def haversine_km(a, b):
     return 2 * R * math.asin(math.sqrt(h))
 
 def tool_distance(city_a: str, city_b: str):
-    a = CITY_COORDS.get((city_a or "").lower())
-    b = CITY_COORDS.get((city_b or "").lower())
+    a = gazetteer.resolve(city_a or "")
+    b = gazetteer.resolve(city_b or "")
     if not a or not b:
-        return {"from": city_a, "to": city_b, "error": "unknown city (update CITY_COORDS)"}
-    km = round(haversine_km(a, b), 1)
-    return {"from": city_a.title(), "to": city_b.title(), "km": km}
+        return {"from": city_a, "to": city_b, "error": "unknown place: pass \"lat,lon\" or use the nearby tool"}
+    km = round(haversine_km((a.lat, a.lon), (b.lat, b.lon)), 1)
+    return {"from": a.name, "to": b.name, "km": km}
+
+def tool_nearby(city: str = None, lat: float = None, lon: float = None, radius_km: float = 50, limit: int = 10):
+    """Known places within radius_km of a place or coordinates (or, if none, the closest few)."""
+    if lat is None or lon is None:
+        point = gazetteer.parse_lat_lon(city or "")
+        if point is None:
+            place = gazetteer.resolve(city or "")
+            if place is None:
+                return {"center": city, "error": "unknown place: pass lat and lon"}
+            point = (place.lat, place.lon)
+        lat, lon = point
+    try:
+        lat, lon, radius_km, limit = float(lat), float(lon), float(radius_km), max(1, min(int(limit), 50))
+    except (TypeError, ValueError):
+        return {"center": city, "error": "lat, lon and radius_km must be numbers"}
+    gaz = gazetteer.get()
+    hits = gaz.within(lat, lon, radius_km, limit=limit)
+    out = {"center": {"lat": lat, "lon": lon}, "radius_km": radius_km}
+    if not hits:
+        hits = gaz.nearest(lat, lon, k=min(limit, 3))
+        out["note"] = f"nothing within {radius_km:g} km; closest places instead"
+    out["places"] = [{"name": p.name, "country": p.country, "km": km, "lat": p.lat, "lon": p.lon} for p, km in hits]
+    return out
+
+def _resolve_all(cities):
+    """Places for a list (or comma-separated string) of names, without repeats; unknown names are reported."""
+    if isinstance(cities, str):
+        cities = gazetteer.split_names(cities)
+    places, unknown = {}, []
+    for city in cities or []:
+        place = gazetteer.resolve(city) if (city or "").strip() else None
+        if place is None:
+            unknown.append(city)
+        else:
+            places.setdefault(place, None)
+    return list(places), unknown
+
+def matrix_result(places):
+    # whole km keep a 10-city matrix to a few hundred characters of observation
+    matrix = routing.distance_matrix([p.lat for p in places], [p.lon for p in places])
+    return {"cities": [p.name for p in places], "km": routing.rounded_rows(matrix)}
+
+def route_result(places, round_trip=False):
+    matrix = routing.distance_matrix([p.lat for p in places], [p.lon for p in places])
+    order, km, greedy_km = routing.solve_route(matrix, round_trip=round_trip)
+    stops = order + order[:1] if round_trip and len(order) > 1 else order
+    return {"order": [places[i].name for i in order],
+            "legs": [{"from": places[a].name, "to": places[b].name, "km": round(float(matrix[a][b]))}
+                     for a, b in zip(stops, stops[1:])],
+            "total_km": round(km), "round_trip": bool(round_trip), "saved_km": round(greedy_km - km)}
+
+def tool_distance_matrix(cities):
+    """All pairwise distances (km) between the cities in one observation."""
+    places, unknown = _resolve_all(cities)
+    out = matrix_result(places)
+    if unknown:
+        out["unknown"] = unknown
+    return out
+
+def tool_route_order(cities, round_trip=False):
+    """Short visiting order for the cities, starting at the first one, with the km of every leg."""
+    places, unknown = _resolve_all(cities)
+    out = route_result(places, round_trip=round_trip)
+    if unknown:
+        out["unknown"] = unknown
+    return out
+
+def _translate_payload(text: str, target_lang: str):
+    return {"q": text or "", "source": "auto", "target": (target_lang or "en"), "format": "text"}
 
 def tool_translate(text: str, target_lang: str):
-    base = TRANSLATE_BASE_URL.rstrip("/")
-    url = f"{base}/translate"
-    payload = {"q": text or "", "source": "auto", "target": (target_lang or "en"), "format": "text"}
-    r = _http_post(url, json_data=payload, headers={"Accept": "application/json"})
+    url = f"{TRANSLATE_BASE_URL.rstrip('/')}/translate"
+    r = _http_post(url, json_data=_translate_payload(text, target_lang), headers={"Accept": "application/json"})
     r.raise_for_status()
-    data = r.json()
-    translated = data.get("translatedText")
+    translated = r.json().get("translatedText")
+    return {"text": text, "target_lang": target_lang, "translated": translated, "source": "LibreTranslate-compatible"}
+
+async def atool_translate(text: str, target_lang: str):
+    url = f"{TRANSLATE_BASE_URL.rstrip('/')}/translate"
+    r = await _ahttp_post(url, json_data=_translate_payload(text, target_lang), headers={"Accept": "application/json"})
+    r.raise_for_status()
+    translated = r.json().get("translatedText")
     return {"text": text, "target_lang": target_lang, "translated": translated, "source": "LibreTranslate-compatible"}
 
 def parse_days_and_budget(query: str):
@@ -127,9 +357,21 @@ def parse_days_and_budget(query: str):
     return {"days": days, "budget": budget}
 
 TOOL_REGISTRY = {
-    "weather": {"fn": tool_weather, "args": {"city": "str"}},
+    "weather": {"fn": tool_weather, "args": {"city": "str", "day": "int|str", "days": "int"}},
+    "weather_batch": {"fn": tool_weather_batch, "args": {"cities": "list[str]", "day": "int|str", "days": "int"}},
     "wikipedia": {"fn": tool_wikipedia, "args": {"topic": "str"}},
     "distance": {"fn": tool_distance, "args": {"city_a": "str", "city_b": "str"}},
+    "nearby": {"fn": tool_nearby, "args": {"city": "str", "lat": "float", "lon": "float", "radius_km": "float"}},
+    "distance_matrix": {"fn": tool_distance_matrix, "args": {"cities": "list[str]"}},
+    "route_order": {"fn": tool_route_order, "args": {"cities": "list[str]", "round_trip": "bool"}},
     "translate": {"fn": tool_translate, "args": {"text": "str", "target_lang": "str"}},
     "parse_meta": {"fn": parse_days_and_budget, "args": {"query": "str"}},  # helper, no external calls
 }
+
+# Coroutine versions of the network tools; the others are plain CPU work and are reused as-is
+ASYNC_TOOLS = {
+    "weather": atool_weather,
+    "weather_batch": atool_weather_batch,
+    "wikipedia": atool_wikipedia,
+    "translate": atool_translate,
+}